@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Materia, Tarefa, Prova, MaterialDeApoio
+from .models import Lembrete, Materia, Tarefa, Prova, MaterialDeApoio, MetadadosLink, Trabalho
 
 # 1. Definição do Material Inline (para aparecer dentro da Prova)
 class MaterialDeApoioInline(admin.TabularInline):
@@ -44,4 +44,25 @@ class TarefaAdmin(admin.ModelAdmin):
 class MateriaAdmin(admin.ModelAdmin):
     list_display = ('nome', 'nomenclatura', 'usuario')
     search_fields = ('nome', 'nomenclatura')
-    list_filter = ('usuario',)
\ No newline at end of file
+    list_filter = ('usuario',)
+
+# 5. Fila de trabalhos de fundo (consumida por `manage.py run_workers`)
+@admin.register(Trabalho)
+class TrabalhoAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'chave', 'status', 'tentativas', 'disponivel_em', 'atualizado_em')
+    list_filter = ('status', 'tipo')
+    search_fields = ('chave', 'erro')
+
+# 6. Metadados dos links (preenchidos por `manage.py atualizar_links`)
+@admin.register(MetadadosLink)
+class MetadadosLinkAdmin(admin.ModelAdmin):
+    list_display = ('url', 'titulo', 'tipo_conteudo', 'status_http', 'falhas', 'expira_em')
+    list_filter = ('tipo_conteudo',)
+    search_fields = ('url', 'titulo', 'erro')
+
+# 7. Lembretes por e-mail (agendados e enviados por `manage.py enviar_lembretes`)
+@admin.register(Lembrete)
+class LembreteAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'tipo', 'objeto_id', 'antecedencia', 'enviar_em', 'status', 'tentativas')
+    list_filter = ('status', 'tipo')
+    search_fields = ('usuario__username', 'erro')
@@ -0,0 +1,261 @@
+# Em agenda/arquivos.py
+
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+from .models import ConteudoArquivo, MaterialDeApoio, Trabalho
+
+# Arquivos de material de apoio: o upload é gravado em disco em blocos enquanto o hash SHA-256
+# é calculado, e o conteúdo fica guardado uma vez só em materiais_provas/<hash[:2]>/<hash>.
+# Vários materiais (de vários alunos) com o mesmo PDF apontam para o mesmo arquivo, que só é
+# apagado quando o último deles é removido. O download confere o dono do material, responde
+# pedidos Range (206) e lê o arquivo em blocos, sem carregá-lo inteiro na memória.
+
+PASTA_CONTEUDO = 'materiais_provas'
+PASTA_MINIATURAS = 'miniaturas'
+TAMANHO_BLOCO = 256 * 1024
+TAMANHO_MAXIMO = getattr(settings, 'AGENDA_MATERIAL_TAMANHO_MAXIMO', 50 * 1024 * 1024)
+
+# Extensão aceita -> tipo do material
+TIPOS_POR_EXTENSAO = {
+    '.pdf': 'PDF',
+    '.txt': 'TXT',
+    '.md': 'TXT',
+    '.png': 'OUTRO',
+    '.jpg': 'OUTRO',
+    '.jpeg': 'OUTRO',
+    '.docx': 'OUTRO',
+    '.pptx': 'OUTRO',
+    '.xlsx': 'OUTRO',
+    '.odt': 'OUTRO',
+    '.odp': 'OUTRO',
+    '.zip': 'OUTRO',
+}
+
+
+def armazenamento():
+    return MaterialDeApoio._meta.get_field('arquivo').storage
+
+
+# --- Upload ---
+
+class UploadComHashHandler(TemporaryFileUploadHandler):
+    """
+    Grava cada arquivo enviado num temporário em disco, bloco a bloco (nunca inteiro na memória),
+    e calcula o SHA-256 no caminho. O arquivo resultante ganha o atributo `sha256`.
+    Passando de TAMANHO_MAXIMO, o temporário é apagado e o resto do corpo nem é lido
+    (request.upload_excedido fica True). Precisa ser instalado antes de request.POST/FILES
+    serem lidos (ver views.material_create).
+    """
+    chunk_size = TAMANHO_BLOCO
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hash = hashlib.sha256()
+        self.tamanho = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.tamanho += len(raw_data)
+        if self.tamanho > TAMANHO_MAXIMO:
+            self.file.close()  # o temporário é apagado ao fechar
+            self.request.upload_excedido = True
+            raise StopUpload(connection_reset=True)
+        self.hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        arquivo = super().file_complete(file_size)
+        arquivo.sha256 = self.hash.hexdigest()
+        return arquivo
+
+
+def sha256_do_arquivo(arquivo):
+    # Arquivos que não vieram pelo UploadComHashHandler (admin, testes) são lidos em blocos aqui
+    sha256 = getattr(arquivo, 'sha256', None)
+    if sha256:
+        return sha256
+    hash_ = hashlib.sha256()
+    for bloco in arquivo.chunks(TAMANHO_BLOCO):
+        hash_.update(bloco)
+    arquivo.seek(0)
+    return hash_.hexdigest()
+
+
+def caminho_do_conteudo(sha256):
+    return f'{PASTA_CONTEUDO}/{sha256[:2]}/{sha256}'
+
+
+def caminho_da_miniatura(sha256):
+    return f'{PASTA_MINIATURAS}/{sha256[:2]}/{sha256}.png'
+
+
+def guardar_arquivo(material, arquivo):
+    """
+    Associa `arquivo` (enviado) ao material, gravando o conteúdo só se ele ainda não existir.
+    Não salva o material.
+    """
+    sha256 = sha256_do_arquivo(arquivo)
+    caminho = caminho_do_conteudo(sha256)
+    storage = armazenamento()
+    if not storage.exists(caminho):
+        # Temporários do upload são movidos (não copiados) para o destino pelo FileSystemStorage
+        salvo = storage.save(caminho, arquivo)
+        if salvo != caminho:
+            # Outro upload do mesmo conteúdo gravou primeiro: fica o dele
+            storage.delete(salvo)
+
+    extensao = os.path.splitext(arquivo.name)[1].lower()
+    material.arquivo.name = caminho
+    material.sha256 = sha256
+    material.tamanho = arquivo.size
+    material.nome_original = os.path.basename(arquivo.name)[:255]
+    material.tipo = TIPOS_POR_EXTENSAO.get(extensao, 'OUTRO')
+    material.link_url = None
+    return material
+
+
+def liberar_conteudo(sha256):
+    """
+    Apaga o conteúdo, a miniatura e o texto extraído se nenhum material aponta mais para eles
+    (chamado depois do commit).
+    """
+    if not sha256 or MaterialDeApoio.objects.filter(sha256=sha256).exists():
+        return
+    ConteudoArquivo.objects.filter(sha256=sha256).delete()
+    Trabalho.objects.filter(chave=sha256).delete()
+    storage = armazenamento()
+    for caminho in (caminho_do_conteudo(sha256), caminho_da_miniatura(sha256)):
+        if storage.exists(caminho):
+            storage.delete(caminho)
+
+
+def agendar_liberacao(sha256):
+    if sha256:
+        transaction.on_commit(lambda: liberar_conteudo(sha256))
+
+
+# --- Download ---
+
+class IntervaloInvalido(Exception):
+    pass
+
+
+RE_INTERVALO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def intervalo_pedido(cabecalho, tamanho):
+    """
+    (início, fim) inclusivos do cabeçalho Range, ou None para responder o arquivo inteiro
+    (sem Range, sintaxe desconhecida ou vários intervalos, que não são suportados).
+    Levanta IntervaloInvalido quando o intervalo cai fora do arquivo (416).
+    """
+    correspondencia = RE_INTERVALO.match((cabecalho or '').strip())
+    if not correspondencia:
+        return None
+    inicio, fim = correspondencia.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # bytes=-N: os últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0 or tamanho == 0:
+            raise IntervaloInvalido
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or fim < inicio:
+        raise IntervaloInvalido
+    return inicio, fim
+
+
+class FatiaArquivo:
+    """Leitura de `tamanho` bytes de um arquivo a partir de `inicio`, para o FileResponse."""
+
+    def __init__(self, arquivo, inicio, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+        arquivo.seek(inicio)
+
+    def read(self, quantidade=-1):
+        if self.restante <= 0:
+            return b''
+        if quantidade is None or quantidade < 0 or quantidade > self.restante:
+            quantidade = self.restante
+        dados = self.arquivo.read(quantidade)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def etag_material(material):
+    # O conteúdo é endereçado pelo hash: mesmo hash, mesmos bytes (ETag forte)
+    return f'"{material.sha256}"' if material.sha256 else None
+
+
+def resposta_arquivo(request, material):
+    """Resposta de download do arquivo do material (já com o dono conferido pela view)."""
+    storage = armazenamento()
+    nome = material.nome_original or os.path.basename(material.arquivo.name)
+    etag = etag_material(material)
+    if etag:
+        condicional = get_conditional_response(request, etag=etag)
+        if condicional is not None:
+            return condicional
+
+    tamanho = material.tamanho if material.tamanho is not None else storage.size(material.arquivo.name)
+    intervalo = None
+    # If-Range: só responde o pedaço se o cliente ainda tem a mesma versão do arquivo
+    if not request.headers.get('If-Range') or request.headers.get('If-Range') == etag:
+        try:
+            intervalo = intervalo_pedido(request.headers.get('Range'), tamanho)
+        except IntervaloInvalido:
+            resposta = HttpResponse(status=416)
+            resposta['Content-Range'] = f'bytes */{tamanho}'
+            return resposta
+
+    sendfile = getattr(settings, 'AGENDA_SENDFILE_PREFIXO', None)
+    if sendfile:
+        # Em produção o nginx lê e envia o arquivo (inclusive Range) a partir de uma location
+        # interna; o worker só confere o dono e devolve o cabeçalho
+        resposta = HttpResponse(content_type=mimetypes.guess_type(nome)[0] or 'application/octet-stream')
+        resposta['X-Accel-Redirect'] = f"{sendfile.rstrip('/')}/{material.arquivo.name}"
+        resposta['Content-Disposition'] = content_disposition_header(False, nome)
+    else:
+        arquivo = storage.open(material.arquivo.name, 'rb')
+        if intervalo is None:
+            resposta = FileResponse(arquivo, filename=nome)
+        else:
+            inicio, fim = intervalo
+            resposta = FileResponse(FatiaArquivo(arquivo, inicio, fim - inicio + 1), filename=nome, status=206)
+            resposta['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+            resposta['Content-Length'] = fim - inicio + 1
+        resposta.block_size = TAMANHO_BLOCO
+
+    resposta['Accept-Ranges'] = 'bytes'
+    resposta['Cache-Control'] = 'private, max-age=3600'
+    if etag:
+        resposta['ETag'] = etag
+    return resposta
+
+
+def resposta_miniatura(request, material):
+    """PNG da primeira página gerado pelo worker (pequeno: sem Range)."""
+    etag = f'"m{material.sha256}"'
+    condicional = get_conditional_response(request, etag=etag)
+    if condicional is not None:
+        return condicional
+    resposta = FileResponse(armazenamento().open(material.miniatura, 'rb'), content_type='image/png')
+    resposta['Cache-Control'] = 'private, max-age=86400'
+    resposta['ETag'] = etag
+    return resposta
@@ -0,0 +1,92 @@
+# Em agenda/benchmark.py
+
+import statistics
+from time import perf_counter
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from .busca import reindexar_usuario
+from .instrumentacao import percentil
+from .models import Materia, Tarefa, Prova, MaterialDeApoio, HorarioAula
+
+
+def texto_sintetico(caracteres):
+    """Texto de `caracteres` caracteres para os campos longos (descrição, observações, anotações)."""
+    frase = 'Revisar capítulo, refazer exercícios e anotar as dúvidas para a monitoria. '
+    return (frase * (caracteres // len(frase) + 1))[:caracteres] or None
+
+
+def gerar_massa(usuario, materias=3, tarefas=100, provas=100, materiais=2, horarios=0, texto=0):
+    """
+    Cria dados sintéticos em massa para um usuário (quantidades por matéria / por prova).
+    `texto` é o tamanho dos campos longos (0 deixa-os vazios, como antes).
+    Usa bulk_create, então nenhum signal de save é disparado; o índice de busca é refeito no final.
+    """
+    agora = timezone.now()
+    texto = texto_sintetico(texto)
+    lista_materias = Materia.objects.bulk_create([
+        Materia(usuario=usuario, nome=f'Matéria {i}', nomenclatura=f'BM{i}', notas_materia=texto)
+        for i in range(materias)
+    ])
+
+    Tarefa.objects.bulk_create([
+        Tarefa(
+            materia=materia,
+            titulo=f'Tarefa {t}',
+            descricao=texto,
+            data_inicio=agora + timedelta(hours=t),
+            data_fim=agora + timedelta(hours=t + 24),
+            status='ACE'[t % 3],
+            prioridade='BMA'[t % 3],
+        )
+        for materia in lista_materias for t in range(tarefas)
+    ], batch_size=500)
+
+    lista_provas = Prova.objects.bulk_create([
+        Prova(materia=materia, titulo=f'Prova {p}', data_prova=(agora + timedelta(days=p)).date(),
+              observacoes=texto)
+        for materia in lista_materias for p in range(provas)
+    ], batch_size=500)
+
+    MaterialDeApoio.objects.bulk_create([
+        MaterialDeApoio(prova=prova, titulo=f'Material {m}', link_url='https://exemplo.com/material')
+        for prova in lista_provas for m in range(materiais)
+    ], batch_size=500)
+
+    dias = [sigla for sigla, _ in HorarioAula.DIAS_SEMANA]
+    HorarioAula.objects.bulk_create([
+        HorarioAula(
+            materia=materia,
+            dia_semana=dias[(i + h) % len(dias)],
+            hora_inicio=time(8 + (2 * h) % 14),
+            local=f'Sala {100 + i}',
+        )
+        for i, materia in enumerate(lista_materias) for h in range(horarios)
+    ], batch_size=500)
+
+    reindexar_usuario(usuario.pk)
+    return lista_materias
+
+
+def cronometrar(funcao, repeticoes=5):
+    """Executa `funcao` algumas vezes e devolve os tempos em milissegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = perf_counter()
+        funcao()
+        tempos.append((perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def resumo(tempos):
+    return {
+        'min_ms': round(min(tempos), 2),
+        'mediana_ms': round(statistics.median(tempos), 2),
+        'max_ms': round(max(tempos), 2),
+    }
+
+
+def percentis(tempos, pontos=(50, 95, 99)):
+    ordenados = sorted(tempos)
+    return {f'p{p}_ms': round(percentil(ordenados, p), 2) for p in pontos}
@@ -0,0 +1,255 @@
+# Em agenda/busca.py
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import F, Q
+from django.urls import reverse
+
+from .cache import invalidar_usuario
+from .models import ConteudoArquivo, Materia, Tarefa, Prova, MaterialDeApoio
+
+TABELA_BUSCA = 'agenda_busca'
+LIMITE_RESULTADOS = 50
+# Documentos de cada faixa que recebem nota do bm25(); acima disso, só os de rowid maior
+CANDIDATOS_FAIXA = 500
+# Pesos do bm25() por coluna (dono, titulo, conteudo): o título vale mais que o conteúdo
+PESOS_BM25 = (0.0, 10.0, 1.0)
+
+# tipo -> código usado no rowid (rowid = pk * 4 + código), para atualizar/remover sem consultar
+CODIGOS = {'materia': 0, 'tarefa': 1, 'prova': 2, 'material': 3}
+MODELOS = {'materia': Materia, 'tarefa': Tarefa, 'prova': Prova, 'material': MaterialDeApoio}
+TIPO_DO_MODELO = {modelo: tipo for tipo, modelo in MODELOS.items()}
+ROTULOS = {'materia': 'Matéria', 'tarefa': 'Tarefa', 'prova': 'Prova', 'material': 'Material'}
+
+# 'dono' guarda o token u<id> do usuário: filtrar por ele usa o próprio índice invertido
+SQL_CRIAR = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        dono, titulo, conteudo, tipo UNINDEXED, objeto_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+"""
+
+# Documentos de cada tipo, direto das tabelas (usado na migration e na reconstrução do índice)
+SQL_DOCUMENTOS = {
+    'materia': """
+        SELECT m.id * 4 + 0, 'u' || m.usuario_id, m.nome,
+               COALESCE(m.nomenclatura, '') || ' ' || COALESCE(m.notas_materia, ''), 'materia', m.id
+        FROM agenda_materia m WHERE {filtro}
+    """,
+    'tarefa': """
+        SELECT t.id * 4 + 1, 'u' || m.usuario_id, t.titulo, COALESCE(t.descricao, ''), 'tarefa', t.id
+        FROM agenda_tarefa t JOIN agenda_materia m ON m.id = t.materia_id WHERE {filtro}
+    """,
+    'prova': """
+        SELECT p.id * 4 + 2, 'u' || m.usuario_id, p.titulo, COALESCE(p.observacoes, ''), 'prova', p.id
+        FROM agenda_prova p JOIN agenda_materia m ON m.id = p.materia_id WHERE {filtro}
+    """,
+    'material': """
+        SELECT a.id * 4 + 3, 'u' || m.usuario_id, a.titulo, COALESCE(c.texto, ''), 'material', a.id
+        FROM agenda_materialdeapoio a JOIN agenda_prova p ON p.id = a.prova_id
+        JOIN agenda_materia m ON m.id = p.materia_id
+        LEFT JOIN agenda_conteudoarquivo c ON c.sha256 = a.sha256 AND a.sha256 != '' WHERE {filtro}
+    """,
+}
+
+_fts_ativa = set()
+
+
+def fts_disponivel():
+    """True se o banco é SQLite e a tabela FTS5 foi criada pela migration."""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias in _fts_ativa:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [TABELA_BUSCA])
+        existe = cursor.fetchone() is not None
+    if existe:
+        _fts_ativa.add(connection.alias)
+    return existe
+
+
+def reconstruir_indice(cursor, usuario_id=None, documentos=SQL_DOCUMENTOS):
+    """Reindexa todos os documentos (ou só os de um usuário) com INSERT ... SELECT."""
+    if usuario_id is None:
+        cursor.execute(f"DELETE FROM {TABELA_BUSCA}")
+        filtro, parametros = '1 = 1', []
+    else:
+        cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE dono = %s", [f'u{usuario_id}'])
+        filtro, parametros = 'm.usuario_id = %s', [usuario_id]
+    for sql in documentos.values():
+        cursor.execute(
+            f"INSERT INTO {TABELA_BUSCA} (rowid, dono, titulo, conteudo, tipo, objeto_id) "
+            + sql.format(filtro=filtro),
+            parametros,
+        )
+
+
+def reindexar_usuario(usuario_id):
+    if fts_disponivel():
+        with connection.cursor() as cursor:
+            reconstruir_indice(cursor, usuario_id)
+
+
+# --- Atualização incremental (signals e operações em massa) ---
+
+def documento(tipo, objeto):
+    """(título, conteúdo) indexados de um objeto."""
+    if tipo == 'materia':
+        return objeto.nome, f'{objeto.nomenclatura or ""} {objeto.notas_materia or ""}'
+    if tipo == 'tarefa':
+        return objeto.titulo, objeto.descricao or ''
+    if tipo == 'prova':
+        return objeto.titulo, objeto.observacoes or ''
+    return objeto.titulo, texto_extraido(objeto)
+
+
+def texto_extraido(material):
+    """Texto que o worker extraiu do arquivo do material (agenda.trabalhos), ou ''."""
+    if not hasattr(material, 'texto_extraido'):
+        sha256 = material.__dict__.get('sha256')
+        material.texto_extraido = sha256 and ConteudoArquivo.objects.filter(
+            sha256=sha256).values_list('texto', flat=True).first() or ''
+    return material.texto_extraido
+
+
+def reindexar_materiais_do_conteudo(sha256, texto):
+    """Regrava no índice os materiais (de todos os usuários) que apontam para o conteúdo."""
+    por_usuario = {}
+    for material in MaterialDeApoio.objects.filter(sha256=sha256).annotate(dono=F('prova__materia__usuario_id')):
+        material.texto_extraido = texto
+        por_usuario.setdefault(material.dono, []).append(material)
+    for usuario_id, materiais in por_usuario.items():
+        indexar('material', materiais, usuario_id)
+        invalidar_usuario(usuario_id)
+
+
+def indexar(tipo, objetos, usuario_id):
+    """Grava (ou regrava) os documentos dos objetos do usuário no índice."""
+    if not objetos or usuario_id is None or not fts_disponivel():
+        return
+    linhas = [
+        (objeto.pk * 4 + CODIGOS[tipo], f'u{usuario_id}', *documento(tipo, objeto), tipo, objeto.pk)
+        for objeto in objetos
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [(linha[0],) for linha in linhas])
+        cursor.executemany(
+            f"INSERT INTO {TABELA_BUSCA} (rowid, dono, titulo, conteudo, tipo, objeto_id) VALUES (%s, %s, %s, %s, %s, %s)",
+            linhas,
+        )
+
+
+def remover(tipo, ids):
+    if not ids or not fts_disponivel():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [(pk * 4 + CODIGOS[tipo],) for pk in ids])
+
+
+# --- Consulta ---
+
+def palavras_da_busca(termo):
+    return re.findall(r'\w+', termo or '')[:10]
+
+
+def url_resultado(tipo, objeto_id, prova_id=None):
+    if tipo == 'materia':
+        return reverse('materia_update', args=[objeto_id])
+    if tipo == 'tarefa':
+        return reverse('tarefa_update', args=[objeto_id])
+    if tipo == 'prova':
+        return reverse('prova_update', args=[objeto_id])
+    return reverse('material_list', args=[prova_id])
+
+
+def buscar(usuario, termo, limite=LIMITE_RESULTADOS):
+    """
+    Busca em matérias, tarefas, provas e materiais do usuário, sem diferenciar acentos; a última
+    palavra casa por prefixo ('calc' encontra 'Cálculo'). Resultados com a busca no título vêm
+    primeiro.
+    """
+    palavras = palavras_da_busca(termo)
+    if not palavras:
+        return []
+    if fts_disponivel():
+        resultados = _buscar_fts(usuario.pk, palavras, limite)
+    else:
+        resultados = _buscar_like(usuario.pk, palavras, limite)
+
+    # Materiais apontam para a lista da prova: busca os prova_id de uma vez
+    ids_materiais = [r['objeto_id'] for r in resultados if r['tipo'] == 'material']
+    provas = dict(MaterialDeApoio.objects.filter(pk__in=ids_materiais).values_list('pk', 'prova_id'))
+    for resultado in resultados:
+        resultado['rotulo'] = ROTULOS[resultado['tipo']]
+        resultado['url'] = url_resultado(resultado['tipo'], resultado['objeto_id'], provas.get(resultado['objeto_id']))
+    return resultados
+
+
+def _buscar_fts(usuario_id, palavras, limite):
+    # Só a última palavra (a que ainda está sendo digitada) vira prefixo: prefixos longos de
+    # termos comuns obrigam o FTS5 a juntar muitas listas, palavras completas são uma busca direta
+    termos = ['"{}"'.format(palavra) for palavra in palavras]
+    termos[-1] += '*'
+    expressao = ' AND '.join(termos)
+    dono = f'dono : "u{usuario_id}"'
+
+    # Relevância em duas faixas: tudo no título primeiro, depois o restante. Dentro de cada faixa
+    # a ordem é a do bm25() (título com peso maior, documentos curtos antes). A nota só é
+    # calculada para até CANDIDATOS_FAIXA documentos da faixa (a subconsulta para no LIMIT sem
+    # ordenar): um termo comum não obriga a pontuar e ordenar o índice inteiro do usuário.
+    faixas = [
+        f'{dono} AND titulo : ({expressao})',
+        f'{dono} AND {{titulo conteudo}} : ({expressao}) NOT titulo : ({expressao})',
+    ]
+    pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+    resultados = []
+    with connection.cursor() as cursor:
+        for consulta in faixas:
+            restante = limite - len(resultados)
+            if restante <= 0:
+                break
+            cursor.execute(
+                f"""
+                SELECT tipo, objeto_id, titulo, snippet({TABELA_BUSCA}, 2, '', '', '…', 12)
+                FROM {TABELA_BUSCA}
+                WHERE {TABELA_BUSCA} MATCH %s AND rowid IN (
+                    SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s LIMIT %s
+                )
+                ORDER BY bm25({TABELA_BUSCA}, {pesos}), rowid DESC
+                LIMIT %s
+                """,
+                [consulta, consulta, CANDIDATOS_FAIXA, restante],
+            )
+            resultados.extend(
+                {'tipo': tipo, 'objeto_id': objeto_id, 'titulo': titulo, 'trecho': trecho}
+                for tipo, objeto_id, titulo, trecho in cursor.fetchall()
+            )
+    return resultados
+
+
+# Campos pesquisados no fallback (outros bancos): tipo -> (filtro do dono, título, demais campos)
+CAMPOS_LIKE = {
+    'materia': ('usuario_id', 'nome', ['nomenclatura', 'notas_materia']),
+    'tarefa': ('materia__usuario_id', 'titulo', ['descricao']),
+    'prova': ('materia__usuario_id', 'titulo', ['observacoes']),
+    'material': ('prova__materia__usuario_id', 'titulo', []),
+}
+
+
+def _buscar_like(usuario_id, palavras, limite):
+    """Fallback sem índice: icontains palavra por palavra; resultados com a busca no título primeiro."""
+    encontrados = []
+    for tipo, (dono, titulo, outros) in CAMPOS_LIKE.items():
+        filtro = Q()
+        for palavra in palavras:
+            filtro &= reduce(or_, [Q(**{f'{campo}__icontains': palavra}) for campo in [titulo, *outros]])
+        linhas = MODELOS[tipo].objects.filter(filtro, **{dono: usuario_id}).values_list('pk', titulo)[:limite]
+        for pk, texto in linhas:
+            fora_do_titulo = not all(palavra.lower() in texto.lower() for palavra in palavras)
+            encontrados.append((fora_do_titulo, {'tipo': tipo, 'objeto_id': pk, 'titulo': texto, 'trecho': ''}))
+    encontrados.sort(key=lambda item: item[0])
+    return [resultado for _, resultado in encontrados[:limite]]
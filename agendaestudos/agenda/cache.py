@@ -0,0 +1,93 @@
+# Em agenda/cache.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import MarcaAlteracao
+
+# Tempo de vida dos dados e fragmentos cacheados do painel (segundos)
+TEMPO_CACHE = getattr(settings, 'AGENDA_CACHE_TIMEOUT', 600)
+
+
+def chave_versao(usuario_id):
+    return f'agenda:versao:{usuario_id}'
+
+
+def versao_usuario(usuario_id):
+    """
+    Versão atual dos dados do usuário. Toda chave de cache por usuário inclui essa versão,
+    então incrementá-la invalida de uma vez tudo o que foi cacheado antes.
+    """
+    chave = chave_versao(usuario_id)
+    versao = cache.get(chave)
+    if versao is None:
+        # Começa pelo relógio (ms) para nunca reaproveitar uma versão antiga
+        # caso a chave tenha sido descartada num backend persistente
+        cache.add(chave, int(time.time() * 1000), None)
+        versao = cache.get(chave)
+    return versao
+
+
+async def aversao_usuario(usuario_id):
+    """Versão assíncrona de versao_usuario (views de agenda.views_async)."""
+    chave = chave_versao(usuario_id)
+    versao = await cache.aget(chave)
+    if versao is None:
+        await cache.aadd(chave, int(time.time() * 1000), None)
+        versao = await cache.aget(chave)
+    return versao
+
+
+def invalidar_usuario(usuario_id):
+    """
+    Incrementa a versão do usuário e avança a marca d'água persistente (MarcaAlteracao);
+    chamada pelos signals a cada escrita nos modelos dele e pelas operações em massa.
+    """
+    if usuario_id is None:
+        return
+    try:
+        cache.incr(chave_versao(usuario_id))
+    except ValueError:
+        versao_usuario(usuario_id)
+    avancar_marca(usuario_id)
+
+
+def avancar_marca(usuario_id, momento=None):
+    # Upsert numa única consulta (INSERT ... ON CONFLICT DO UPDATE)
+    MarcaAlteracao.objects.bulk_create(
+        [MarcaAlteracao(usuario_id=usuario_id, alterado_em=momento or timezone.now())],
+        update_conflicts=True,
+        unique_fields=['usuario'],
+        update_fields=['alterado_em'],
+    )
+
+
+def marca_usuario(usuario_id):
+    """Momento da última alteração nos dados do usuário (criada na primeira leitura, se faltar)."""
+    marca = MarcaAlteracao.objects.filter(usuario_id=usuario_id).values_list('alterado_em', flat=True).first()
+    if marca is None:
+        marca = timezone.now()
+        MarcaAlteracao.objects.bulk_create([MarcaAlteracao(usuario_id=usuario_id, alterado_em=marca)], ignore_conflicts=True)
+        marca = MarcaAlteracao.objects.values_list('alterado_em', flat=True).get(usuario_id=usuario_id)
+    return marca
+
+
+async def amarca_usuario(usuario_id):
+    """Versão assíncrona de marca_usuario."""
+    marca = await MarcaAlteracao.objects.filter(usuario_id=usuario_id).values_list('alterado_em', flat=True).afirst()
+    if marca is None:
+        await MarcaAlteracao.objects.abulk_create(
+            [MarcaAlteracao(usuario_id=usuario_id, alterado_em=timezone.now())], ignore_conflicts=True
+        )
+        marca = await MarcaAlteracao.objects.values_list('alterado_em', flat=True).aget(usuario_id=usuario_id)
+    return marca
+
+
+def chave_usuario(prefixo, usuario_id, *partes, versao=None):
+    """Chave de cache versionada: agenda:prefixo:usuario:versao[:partes...]"""
+    if versao is None:
+        versao = versao_usuario(usuario_id)
+    return ':'.join(str(p) for p in ('agenda', prefixo, usuario_id, versao, *partes))
@@ -0,0 +1,179 @@
+# Em agenda/calendario.py
+
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+from .horarios import ORDINAL_DIA
+from .importacao import DIAS_ICS
+from .models import Tarefa, Prova, HorarioAula
+
+# HorarioAula só guarda o início; duas aulas de 50 minutos
+DURACAO_AULA = 'PT1H40M'
+PRODID = '-//Agenda de Estudos//Assinatura//PT-BR'
+DOMINIO_UID = 'agendaestudos'
+
+BYDAY_POR_DIA = {sigla: dia for dia, sigla in DIAS_ICS.items()}
+
+
+def escapar_texto(valor):
+    """Escapa um valor TEXT do iCalendar (RFC 5545 3.3.11)."""
+    return (valor or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def dobrar_linha(linha):
+    """Quebra linhas com mais de 75 octetos (RFC 5545 3.1) sem partir caracteres UTF-8."""
+    partes = []
+    atual, tamanho, limite = [], 0, 75
+    for caractere in linha:
+        octetos = len(caractere.encode('utf-8'))
+        if tamanho + octetos > limite:
+            partes.append(''.join(atual))
+            atual, tamanho, limite = [' '], 1, 75
+        atual.append(caractere)
+        tamanho += octetos
+    partes.append(''.join(atual))
+    return '\r\n'.join(partes) + '\r\n'
+
+
+def utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _formatar_offset(offset):
+    minutos = int(offset.total_seconds() // 60)
+    sinal = '-' if minutos < 0 else '+'
+    return f'{sinal}{abs(minutos) // 60:02d}{abs(minutos) % 60:02d}'
+
+
+def _transicoes(fuso, inicio, fim):
+    """[(instante UTC, offset anterior, offset novo)] das mudanças de offset de `fuso` entre inicio e fim (UTC)."""
+    transicoes = []
+    antes, offset_antes = inicio, inicio.astimezone(fuso).utcoffset()
+    while antes < fim:
+        depois = min(antes + timedelta(days=1), fim)
+        offset_depois = depois.astimezone(fuso).utcoffset()
+        if offset_depois != offset_antes:
+            # Busca binária (em minutos) pelo primeiro instante com o offset novo
+            baixo, alto = 0, 24 * 60
+            while alto - baixo > 1:
+                meio = (baixo + alto) // 2
+                if (antes + timedelta(minutes=meio)).astimezone(fuso).utcoffset() == offset_antes:
+                    baixo = meio
+                else:
+                    alto = meio
+            transicoes.append((antes + timedelta(minutes=alto), offset_antes, offset_depois))
+            offset_antes = offset_depois
+        antes = depois
+    return transicoes
+
+
+def vtimezone(nome, ancora, anos=2):
+    """
+    Linhas do VTIMEZONE de `nome` (RFC 5545 3.6.5), exigido para cada TZID usado. Sem regras:
+    uma observância por mudança de offset de um ano antes a `anos` depois da `ancora`, o que cobre
+    fusos sem horário de verão (um único STANDARD) e as aulas do semestre nos demais.
+    """
+    fuso = ZoneInfo(nome)
+    inicio = datetime.combine(ancora - timedelta(days=365), time.min, dt_timezone.utc)
+    fim = datetime.combine(ancora + timedelta(days=365 * anos), time.min, dt_timezone.utc)
+    local = inicio.astimezone(fuso)
+    observancias = [(local.replace(tzinfo=None), local.utcoffset(), local.utcoffset(), local)]
+    for instante, antes, depois in _transicoes(fuso, inicio, fim):
+        # DTSTART é a hora local do início da observância, ainda no offset anterior
+        observancias.append(((instante + antes).replace(tzinfo=None), antes, depois, instante.astimezone(fuso)))
+
+    linhas = ['BEGIN:VTIMEZONE', f'TZID:{nome}']
+    for comeco, antes, depois, exemplo in observancias:
+        tipo = 'DAYLIGHT' if exemplo.dst() else 'STANDARD'
+        linhas += [
+            f'BEGIN:{tipo}',
+            f'DTSTART:{comeco:%Y%m%dT%H%M%S}',
+            f'TZOFFSETFROM:{_formatar_offset(antes)}',
+            f'TZOFFSETTO:{_formatar_offset(depois)}',
+            f'TZNAME:{exemplo.tzname()}' if exemplo.tzname() else '',
+            f'END:{tipo}',
+        ]
+    linhas.append('END:VTIMEZONE')
+    return [linha for linha in linhas if linha]
+
+
+def etag_feed(usuario_id, marca):
+    """ETag do feed: muda só quando a marca d'água do usuário avança."""
+    return hashlib.sha1(f'{usuario_id}:{marca.isoformat()}'.encode()).hexdigest()
+
+
+def _evento(uid, dtstamp, *propriedades):
+    linhas = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{dtstamp}', *propriedades, 'END:VEVENT']
+    return ''.join(dobrar_linha(linha) for linha in linhas if linha)
+
+
+def gerar_ics(usuario_id, marca):
+    """
+    Gera o calendário do usuário aos poucos (um VEVENT por vez).
+    O conteúdo depende só dos dados e da marca d'água, então a mesma marca produz o mesmo arquivo.
+    """
+    dtstamp = utc(marca)
+    # Aulas como uma regra semanal cada, ancoradas na semana da marca d'água (estável entre requisições)
+    semana = timezone.localtime(marca).date()
+    semana -= timedelta(days=semana.weekday())
+
+    yield ''.join(dobrar_linha(linha) for linha in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Agenda de Estudos',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+        *vtimezone(settings.TIME_ZONE, semana),
+    ])
+
+    tarefas = Tarefa.objects.filter(materia__usuario_id=usuario_id).values(
+        'pk', 'titulo', 'descricao', 'data_inicio', 'data_fim', 'status', 'link_anexo', 'materia__nome',
+    )
+    status_display = dict(Tarefa.STATUS_CHOICES)
+    for tarefa in tarefas.order_by('pk').iterator(chunk_size=500):
+        yield _evento(
+            f'tarefa-{tarefa["pk"]}@{DOMINIO_UID}', dtstamp,
+            f'DTSTART:{utc(tarefa["data_inicio"])}',
+            f'DTEND:{utc(max(tarefa["data_fim"], tarefa["data_inicio"]))}',
+            f'SUMMARY:{escapar_texto(tarefa["titulo"])}',
+            f'DESCRIPTION:{escapar_texto(tarefa["descricao"])}' if tarefa['descricao'] else '',
+            f'CATEGORIES:{escapar_texto(tarefa["materia__nome"])}',
+            f'URL:{tarefa["link_anexo"]}' if tarefa['link_anexo'] else '',
+            f'X-AGENDA-STATUS:{status_display.get(tarefa["status"], tarefa["status"])}',
+        )
+
+    provas = Prova.objects.filter(materia__usuario_id=usuario_id, data_prova__isnull=False).values(
+        'pk', 'titulo', 'data_prova', 'observacoes', 'materia__nome',
+    )
+    for prova in provas.order_by('pk').iterator(chunk_size=500):
+        yield _evento(
+            f'prova-{prova["pk"]}@{DOMINIO_UID}', dtstamp,
+            f'DTSTART;VALUE=DATE:{prova["data_prova"]:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{prova["data_prova"] + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{escapar_texto(prova["titulo"])}',
+            f'DESCRIPTION:{escapar_texto(prova["observacoes"])}' if prova['observacoes'] else '',
+            f'CATEGORIES:{escapar_texto(prova["materia__nome"])}',
+        )
+
+    horarios = HorarioAula.objects.filter(materia__usuario_id=usuario_id).values(
+        'pk', 'dia_semana', 'hora_inicio', 'local', 'materia__nome',
+    )
+    for horario in horarios.order_by('pk').iterator(chunk_size=500):
+        inicio = datetime.combine(semana + timedelta(days=ORDINAL_DIA[horario['dia_semana']]), horario['hora_inicio'])
+        yield _evento(
+            f'aula-{horario["pk"]}@{DOMINIO_UID}', dtstamp,
+            f'DTSTART;TZID={settings.TIME_ZONE}:{inicio:%Y%m%dT%H%M%S}',
+            f'DURATION:{DURACAO_AULA}',
+            f'RRULE:FREQ=WEEKLY;BYDAY={BYDAY_POR_DIA[horario["dia_semana"]]}',
+            f'SUMMARY:{escapar_texto("Aula: " + horario["materia__nome"])}',
+            f'LOCATION:{escapar_texto(horario["local"])}' if horario['local'] else '',
+            f'CATEGORIES:{escapar_texto(horario["materia__nome"])}',
+        )
+
+    yield dobrar_linha('END:VCALENDAR')
@@ -0,0 +1,81 @@
+# Em agenda/condicional.py
+
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import amarca_usuario, marca_usuario
+
+
+def inicio_do_balde(agora, balde):
+    """Início do intervalo de tempo atual (minuto ou dia, no fuso local)."""
+    local = timezone.localtime(agora)
+    if balde == 'minuto':
+        return local.replace(second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _validadores(view, request, usuario_id, marca, balde):
+    """(ETag, Last-Modified) da página a partir da marca d'água do usuário."""
+    ultima_alteracao = marca
+    partes = [view.__name__, usuario_id, marca.isoformat(), request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+    if balde:
+        inicio = inicio_do_balde(timezone.now(), balde)
+        ultima_alteracao = max(marca, inicio)
+        partes.append(inicio.isoformat())
+    etag = hashlib.sha1(':'.join(str(p) for p in partes).encode()).hexdigest()
+    return etag, ultima_alteracao
+
+
+def _condicionar(view, etag, ultima_alteracao):
+    return condition(
+        etag_func=lambda *a, **k: etag,
+        last_modified_func=lambda *a, **k: ultima_alteracao,
+    )(view)
+
+
+def _marcar_privada(response):
+    patch_vary_headers(response, ['Cookie'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def resposta_condicional(balde=None):
+    """
+    Aplica condition() às páginas do usuário logado: ETag e Last-Modified saem da marca d'água
+    (MarcaAlteracao), então recarregar/voltar sem alterações responde 304 sem montar a página.
+
+    `balde` ('minuto' ou 'dia') entra na ETag quando o HTML depende de "agora" (prazos,
+    provas passadas). O cookie CSRF também entra, porque os formulários da página embutem o token.
+    Funciona também com views assíncronas (agenda.views_async).
+    """
+    def decorador(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _view_async(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                    return await view(request, *args, **kwargs)
+                usuario = await request.auser()
+                marca = await amarca_usuario(usuario.pk)
+                etag, ultima_alteracao = _validadores(view, request, usuario.pk, marca, balde)
+                response = await _condicionar(view, etag, ultima_alteracao)(request, *args, **kwargs)
+                return _marcar_privada(response)
+            return _view_async
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            # Mensagens pendentes só aparecem se a página for renderizada de novo
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+            marca = marca_usuario(request.user.pk)
+            etag, ultima_alteracao = _validadores(view, request, request.user.pk, marca, balde)
+            response = _condicionar(view, etag, ultima_alteracao)(request, *args, **kwargs)
+            return _marcar_privada(response)
+        return _view
+    return decorador
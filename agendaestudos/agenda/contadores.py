@@ -0,0 +1,100 @@
+# Em agenda/contadores.py
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Materia, MateriaStats, Tarefa, Prova, MaterialDeApoio
+
+CAMPOS_STATS = ['total_tarefas', 'tarefas_concluidas', 'total_provas', 'total_materiais']
+
+# Contadores disponíveis para Materia: nome -> (modelo, caminho até a matéria, filtro)
+CONTADORES_MATERIA = {
+    'total_tarefas': (Tarefa, 'materia', None),
+    'tarefas_concluidas': (Tarefa, 'materia', Q(status='C')),
+    'tarefas_pendentes': (Tarefa, 'materia', Q(status__in=['A', 'E'])),
+    'total_provas': (Prova, 'materia', None),
+    'total_materiais': (MaterialDeApoio, 'prova__materia', None),
+}
+
+
+def subconsulta_contador(modelo, caminho, filtro=None):
+    """
+    Subconsulta correlacionada que conta as linhas de `modelo` ligadas à matéria externa.
+    Cada relação é contada isoladamente, sem o produto cartesiano de vários JOINs.
+    """
+    linhas = modelo.objects.filter(**{caminho: OuterRef('pk')})
+    if filtro is not None:
+        linhas = linhas.filter(filtro)
+    linhas = linhas.order_by().values(caminho).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(linhas, output_field=IntegerField()), Value(0))
+
+
+def anotar_contadores(materias, *nomes):
+    """
+    Anota um queryset de Materia com os contadores pedidos (todos, se nenhum for informado).
+    Ex: anotar_contadores(Materia.objects.filter(usuario=user), 'total_tarefas', 'total_provas')
+    """
+    nomes = nomes or tuple(CONTADORES_MATERIA)
+    return materias.annotate(**{
+        nome: subconsulta_contador(*CONTADORES_MATERIA[nome]) for nome in nomes
+    })
+
+
+def recalcular_materia_stats(materias=None):
+    """
+    Recalcula do zero a linha de MateriaStats das matérias informadas (ids ou queryset).
+    Sem argumento, recalcula todas. Devolve quantas linhas foram gravadas.
+    """
+    queryset = Materia.objects.all()
+    if materias is not None:
+        queryset = queryset.filter(pk__in=materias)
+
+    linhas = [
+        MateriaStats(materia_id=materia['pk'], **{campo: materia[campo] for campo in CAMPOS_STATS})
+        for materia in anotar_contadores(queryset.order_by(), *CAMPOS_STATS).values('pk', *CAMPOS_STATS)
+    ]
+    MateriaStats.objects.bulk_create(
+        linhas, batch_size=500,
+        update_conflicts=True, unique_fields=['materia'], update_fields=CAMPOS_STATS,
+    )
+    return len(linhas)
+
+
+def materias_com_contadores(materias):
+    """
+    Avalia um queryset de Materia lendo os contadores de MateriaStats (um JOIN, O(matérias)).
+    Os valores são copiados para atributos da própria matéria (total_tarefas, tarefas_pendentes...),
+    e matérias sem linha de estatísticas são recalculadas na hora.
+    """
+    materias = list(materias.select_related('stats'))
+    _completar_stats(materias)
+    _copiar_contadores(materias)
+    return materias
+
+
+async def amaterias_com_contadores(materias):
+    """Versão assíncrona de materias_com_contadores."""
+    materias = [materia async for materia in materias.select_related('stats')]
+    if any(not hasattr(materia, 'stats') for materia in materias):
+        # Raro (matéria anterior à tabela de estatísticas): o recálculo continua síncrono
+        await sync_to_async(_completar_stats)(materias)
+    _copiar_contadores(materias)
+    return materias
+
+
+def _completar_stats(materias):
+    faltando = [materia.pk for materia in materias if not hasattr(materia, 'stats')]
+    if faltando:
+        recalcular_materia_stats(faltando)
+        stats = MateriaStats.objects.in_bulk(faltando)
+        for materia in materias:
+            if materia.pk in stats:
+                materia.stats = stats[materia.pk]
+
+
+def _copiar_contadores(materias):
+    for materia in materias:
+        for campo in CAMPOS_STATS:
+            setattr(materia, campo, getattr(materia.stats, campo))
+        materia.tarefas_pendentes = materia.stats.tarefas_pendentes
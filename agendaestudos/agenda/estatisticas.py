@@ -0,0 +1,226 @@
+# Em agenda/estatisticas.py
+
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .cache import TEMPO_CACHE, aversao_usuario, chave_usuario, versao_usuario
+from .contadores import CAMPOS_STATS, amaterias_com_contadores, materias_com_contadores
+from .horarios import NOMES_DIAS, aquadro_semanal, proxima_aula, quadro_semanal
+from .instrumentacao import contar_consultas
+from .models import Materia, Tarefa, Prova
+from .tempo import agora as agora_da_requisicao
+
+logger = logging.getLogger(__name__)
+
+class PainelEstatisticas:
+    """
+    Motor de estatísticas do dashboard.
+    Cada seção faz no máximo uma consulta, e o número de consultas gasto por seção
+    fica registrado em `consultas` para acompanhar o custo de cada widget.
+    """
+
+    def __init__(self, usuario, agora=None):
+        self.usuario = usuario
+        self.agora = timezone.localtime(agora or agora_da_requisicao())
+        self.hoje = self.agora.date()
+        self.consultas = {}
+
+    @contextmanager
+    def secao(self, nome):
+        with contar_consultas() as contador:
+            yield
+        self.consultas[nome] = self.consultas.get(nome, 0) + contador.total
+
+    # --- Consultas de cada seção (as mesmas nas versões síncrona e assíncrona) ---
+
+    def _agregado_tarefas(self):
+        return Tarefa.objects.filter(materia__usuario=self.usuario), {
+            'total_tarefas': Count('pk'),
+            'tarefas_concluidas': Count('pk', filter=Q(status='C')),
+        }
+
+    def _agregado_provas(self):
+        return Prova.objects.filter(materia__usuario=self.usuario), {
+            'total_provas': Count('pk'),
+            'provas_futuras': Count('pk', filter=Q(data_prova__gte=self.hoje)),
+        }
+
+    def tarefas_pendentes(self, **filtros):
+        return Tarefa.objects.filter(
+            materia__usuario=self.usuario, status__in=['A', 'E'], **filtros
+        ).para_lista().order_by('data_fim')[:5]
+
+    def provas_proximas(self):
+        return Prova.objects.filter(
+            materia__usuario=self.usuario, data_prova__gte=self.hoje
+        ).para_lista().order_by('data_prova')[:5]
+
+    def _materias(self):
+        # O card de distribuição só mostra nome, sigla e contadores (e o painel vai para o cache)
+        return Materia.objects.filter(usuario=self.usuario).only(
+            'nome', 'nomenclatura', *(f'stats__{campo}' for campo in CAMPOS_STATS)
+        )
+
+    @staticmethod
+    def _com_porcentagem(dados):
+        total = dados['total_tarefas']
+        dados['porcentagem_concluida'] = round((dados['tarefas_concluidas'] / total) * 100) if total > 0 else 0
+        return dados
+
+    def _horarios_de_hoje(self, quadro):
+        ordinal = self.hoje.weekday()
+        return {
+            'aulas_hoje': quadro.aulas_do_dia(ordinal),
+            'proxima_aula': quadro.proxima_de_hoje(ordinal, self.agora.time()),
+            'dia_semana_display': NOMES_DIAS[ordinal],
+        }
+
+    @staticmethod
+    def _ordenar_materias(materias):
+        materias.sort(key=lambda materia: materia.tarefas_pendentes, reverse=True)
+        # O total de matérias sai da própria lista, sem um segundo count()
+        return {'materias': materias, 'all_materias': len(materias)}
+
+    # --- Seções ---
+
+    def contadores_tarefas(self):
+        tarefas, agregados = self._agregado_tarefas()
+        with self.secao('contadores_tarefas'):
+            dados = tarefas.aggregate(**agregados)
+        return self._com_porcentagem(dados)
+
+    def contadores_provas(self):
+        provas, agregados = self._agregado_provas()
+        with self.secao('contadores_provas'):
+            return provas.aggregate(**agregados)
+
+    def listas(self):
+        with self.secao('tarefas_urgentes'):
+            tarefas_urgentes = list(self.tarefas_pendentes(prioridade='A'))
+        with self.secao('tarefas_proximas'):
+            tarefas_proximas = list(self.tarefas_pendentes())
+        with self.secao('proximas_provas'):
+            proximas_provas = list(self.provas_proximas())
+        return {
+            'tarefas_urgentes': tarefas_urgentes,
+            'tarefas_proximas': tarefas_proximas,
+            'proximas_provas': proximas_provas,
+        }
+
+    def distribuicao_materias(self):
+        with self.secao('materias'):
+            materias = materias_com_contadores(self._materias())
+        return self._ordenar_materias(materias)
+
+    def quadro_horarios(self):
+        # Uma consulta só quando o quadro semanal não está no cache
+        with self.secao('aulas_hoje'):
+            quadro = quadro_semanal(self.usuario.pk)
+        return self._horarios_de_hoje(quadro)
+
+    def calcular(self):
+        dados = {'hoje': self.hoje}
+        dados.update(self.contadores_tarefas())
+        dados.update(self.contadores_provas())
+        dados.update(self.listas())
+        dados.update(self.distribuicao_materias())
+        dados.update(self.quadro_horarios())
+        dados['consultas_por_secao'] = dict(self.consultas)
+        logger.debug('Consultas do dashboard por seção: %s', self.consultas)
+        return dados
+
+    # --- Versão assíncrona (agenda.views_async) ---
+    # As seções são independentes e aguardadas juntas com asyncio.gather. O ORM assíncrono
+    # do Django ainda roda cada consulta numa thread da requisição (sync_to_async), então
+    # dentro de uma requisição elas não se sobrepõem no banco; o ganho é o servidor ASGI
+    # atender outras requisições enquanto esta espera. As consultas por seção não são
+    # contadas aqui: execute_wrapper vale só para a conexão da thread atual.
+
+    async def acontadores_tarefas(self):
+        tarefas, agregados = self._agregado_tarefas()
+        return self._com_porcentagem(await tarefas.aaggregate(**agregados))
+
+    async def acontadores_provas(self):
+        provas, agregados = self._agregado_provas()
+        return await provas.aaggregate(**agregados)
+
+    async def alistas(self):
+        tarefas_urgentes, tarefas_proximas, proximas_provas = await asyncio.gather(
+            _alista(self.tarefas_pendentes(prioridade='A')),
+            _alista(self.tarefas_pendentes()),
+            _alista(self.provas_proximas()),
+        )
+        return {
+            'tarefas_urgentes': tarefas_urgentes,
+            'tarefas_proximas': tarefas_proximas,
+            'proximas_provas': proximas_provas,
+        }
+
+    async def adistribuicao_materias(self):
+        materias = await amaterias_com_contadores(self._materias())
+        return self._ordenar_materias(materias)
+
+    async def aquadro_horarios(self):
+        return self._horarios_de_hoje(await aquadro_semanal(self.usuario.pk))
+
+    async def acalcular(self):
+        dados = {'hoje': self.hoje}
+        for parte in await asyncio.gather(
+            self.acontadores_tarefas(),
+            self.acontadores_provas(),
+            self.alistas(),
+            self.adistribuicao_materias(),
+            self.aquadro_horarios(),
+        ):
+            dados.update(parte)
+        dados['consultas_por_secao'] = {}
+        return dados
+
+
+async def _alista(queryset):
+    return [objeto async for objeto in queryset]
+
+
+def painel_em_cache(usuario, agora=None):
+    """
+    Dados do painel guardados no cache sob a versão atual do usuário (e o dia, pois
+    "provas futuras" e "aulas de hoje" dependem da data). Enquanto nenhuma escrita do
+    usuário mudar a versão, recarregar o dashboard não consulta nenhuma tabela da agenda.
+    """
+    painel = PainelEstatisticas(usuario, agora)
+    versao = versao_usuario(usuario.pk)
+    chave = chave_usuario('painel', usuario.pk, painel.hoje.isoformat(), versao=versao)
+    dados = cache.get(chave)
+    if dados is None:
+        dados = painel.calcular()
+        cache.set(chave, dados, TEMPO_CACHE)
+    else:
+        dados = dict(dados, consultas_por_secao={})
+    return _finalizar_painel(dados, painel, versao)
+
+
+async def apainel_em_cache(usuario, agora=None):
+    """Versão assíncrona de painel_em_cache (mesma chave de cache)."""
+    painel = PainelEstatisticas(usuario, agora)
+    versao = await aversao_usuario(usuario.pk)
+    chave = chave_usuario('painel', usuario.pk, painel.hoje.isoformat(), versao=versao)
+    dados = await cache.aget(chave)
+    if dados is None:
+        dados = await painel.acalcular()
+        await cache.aset(chave, dados, TEMPO_CACHE)
+    else:
+        dados = dict(dados, consultas_por_secao={})
+    return _finalizar_painel(dados, painel, versao)
+
+
+def _finalizar_painel(dados, painel, versao):
+    # A próxima aula depende da hora atual, então é sempre refeita (bisect, sem consultas)
+    dados['proxima_aula'] = proxima_aula(dados['aulas_hoje'], painel.agora.time())
+    dados['versao_cache'] = versao
+    dados['tempo_cache'] = TEMPO_CACHE
+    return dados
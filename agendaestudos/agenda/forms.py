@@ -1,8 +1,13 @@
+import os
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 from django.forms import inlineformset_factory
 from .models import Materia, Tarefa, Prova, MaterialDeApoio, HorarioAula 
+from .operacoes import ACOES_LOTE
+from .importacao import TIPOS_IMPORTACAO
+from .arquivos import TAMANHO_MAXIMO, TIPOS_POR_EXTENSAO
 
 
 # --- NOVO: CustomLoginForm para simetria na tela de login ---
@@ -28,6 +33,8 @@ class CustomUserCreationForm(UserCreationForm):
         
         self.fields['username'].label = "Nome de Usuário"
         self.fields['username'].help_text = None
+        self.fields['email'].label = "E-mail (opcional)"
+        self.fields['email'].help_text = "Para receber lembretes de prazos e provas."
 
         self.fields['password1'].label = "Senha"
         self.fields['password2'].label = "Confirmação de Senha"
@@ -39,7 +46,7 @@ class CustomUserCreationForm(UserCreationForm):
 
     class Meta(UserCreationForm.Meta):
         model = User
-        fields = ("username",)
+        fields = ("username", "email")
 
 
 # --- MateriaForm (RESTAURADO PARA O MÍNIMO) ---
@@ -90,6 +97,75 @@ class TarefaForm(forms.ModelForm):
         model = Tarefa
         fields = ['materia', 'titulo', 'descricao', 'data_inicio', 'data_fim', 'status', 'prioridade', 'link_anexo']
         
+# --- Operações em lote sobre tarefas (checkboxes da lista) ---
+class IdsField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return [int(v) for v in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Seleção de tarefas inválida.")
+
+
+class TarefaLoteForm(forms.Form):
+    ids = IdsField(error_messages={'required': "Selecione ao menos uma tarefa."})
+    acao = forms.ChoiceField(choices=ACOES_LOTE, label='Ação')
+    prioridade = forms.ChoiceField(choices=[('', 'Prioridade...')] + Tarefa.PRIORIDADE_CHOICES, required=False)
+    materia = forms.ModelChoiceField(queryset=Materia.objects.none(), required=False, empty_label='Matéria...')
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+        if user:
+            # Renderizado na listagem de tarefas: só o que o rótulo (__str__) usa
+            self.fields['materia'].queryset = Materia.objects.filter(usuario=user).only('nome', 'nomenclatura')
+
+        self.fields['acao'].widget.attrs.update({'class': 'form-select form-select-sm'})
+        self.fields['prioridade'].widget.attrs.update({'class': 'form-select form-select-sm'})
+        self.fields['materia'].widget.attrs.update({'class': 'form-select form-select-sm'})
+
+    def clean(self):
+        cleaned_data = super().clean()
+        acao = cleaned_data.get('acao')
+        if acao == 'prioridade' and not cleaned_data.get('prioridade'):
+            raise forms.ValidationError("Escolha a nova prioridade.")
+        if acao == 'mover' and not cleaned_data.get('materia'):
+            raise forms.ValidationError("Escolha a matéria de destino.")
+        return cleaned_data
+
+# --- Importação em massa (CSV / iCalendar) ---
+class ImportacaoForm(forms.Form):
+    arquivo = forms.FileField(label='Arquivo (.csv ou .ics)')
+    tipo = forms.ChoiceField(
+        choices=TIPOS_IMPORTACAO, label='Tipo padrão',
+        help_text='Usado nas linhas do CSV sem a coluna "tipo".',
+    )
+    materia = forms.ModelChoiceField(
+        queryset=Materia.objects.none(), required=False, label='Matéria padrão',
+        empty_label='(usar a coluna "materia")',
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+        if user:
+            self.fields['materia'].queryset = Materia.objects.filter(usuario=user)
+
+        self.fields['arquivo'].widget.attrs.update({'class': 'form-control', 'accept': '.csv,.ics,.ical'})
+        self.fields['tipo'].widget.attrs.update({'class': 'form-select'})
+        self.fields['materia'].widget.attrs.update({'class': 'form-select'})
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(('.csv', '.ics', '.ical')):
+            raise forms.ValidationError("Envie um arquivo .csv ou .ics.")
+        return arquivo
+
 # --- ProvaForm ---
 class ProvaForm(forms.ModelForm):
     data_prova = forms.DateField(
@@ -115,10 +191,17 @@ class ProvaForm(forms.ModelForm):
 
 
 # --- Formulário de Material de Apoio ---
+ERRO_TAMANHO_MAXIMO = f"O arquivo passa do limite de {TAMANHO_MAXIMO // (1024 * 1024)} MB."
+
+
 class MaterialDeApoioForm(forms.ModelForm):
+    # O arquivo não é um campo do modelo aqui: agenda.arquivos.guardar_arquivo() decide onde
+    # o conteúdo fica (um só por hash) e preenche arquivo/sha256/tamanho/tipo
+    arquivo = forms.FileField(required=False, label='Ou envie um arquivo')
+
     class Meta:
         model = MaterialDeApoio
-        fields = ['titulo', 'link_url']  # <-- apenas título e link
+        fields = ['titulo', 'link_url']
         widgets = {
             'titulo': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -134,14 +217,39 @@ class MaterialDeApoioForm(forms.ModelForm):
             'link_url': 'Link (YouTube, Drive, etc.)',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['link_url'].required = False
+        self.fields['arquivo'].widget.attrs.update({
+            'class': 'form-control', 'accept': ','.join(TIPOS_POR_EXTENSAO),
+        })
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data.get('arquivo')
+        if not arquivo:
+            return arquivo
+        extensao = os.path.splitext(arquivo.name)[1].lower()
+        if extensao not in TIPOS_POR_EXTENSAO:
+            raise forms.ValidationError(
+                "Tipo de arquivo não aceito. Envie: " + ', '.join(sorted(TIPOS_POR_EXTENSAO)) + "."
+            )
+        if arquivo.size > TAMANHO_MAXIMO:
+            raise forms.ValidationError(ERRO_TAMANHO_MAXIMO)
+        return arquivo
+
     def clean(self):
         cleaned_data = super().clean()
         link_url = cleaned_data.get('link_url')
+        arquivo = cleaned_data.get('arquivo')
 
-        if not link_url:
-            raise forms.ValidationError("Por favor, insira um link válido para o material de apoio.")
+        if self.errors:
+            return cleaned_data
+        if link_url and arquivo:
+            raise forms.ValidationError("Informe um link ou um arquivo, não os dois.")
+        if not link_url and not arquivo:
+            raise forms.ValidationError("Por favor, insira um link válido ou envie um arquivo para o material de apoio.")
         return cleaned_data
-        
+
 # --- FORMSET BASE ---
 MaterialDeApoioFormSet = inlineformset_factory(
     Prova, 
@@ -0,0 +1,108 @@
+# Em agenda/horarios.py
+
+from bisect import bisect_left
+from operator import attrgetter
+
+from django.core.cache import cache
+
+from .models import CAMPOS_MATERIA_RESUMO, HorarioAula
+
+# Ordinal do dia = datetime.weekday() (0 = segunda), na mesma ordem de HorarioAula.DIAS_SEMANA
+SIGLAS_DIAS = tuple(sigla for sigla, _ in HorarioAula.DIAS_SEMANA)
+NOMES_DIAS = tuple(nome for _, nome in HorarioAula.DIAS_SEMANA)
+ORDINAL_DIA = {sigla: ordinal for ordinal, sigla in enumerate(SIGLAS_DIAS)}
+
+# Só muda quando horários ou matérias mudam (ver signals.invalidar_cache_usuario)
+TEMPO_CACHE_QUADRO = 60 * 60 * 24
+
+hora_da_aula = attrgetter('hora_inicio')
+
+
+def proxima_aula(aulas_do_dia, hora_atual):
+    """Próxima aula (ainda não ocorrida); sem nenhuma futura, mostra a última aula do dia."""
+    if not aulas_do_dia:
+        return None
+    indice = bisect_left(aulas_do_dia, hora_atual, key=hora_da_aula)
+    return aulas_do_dia[min(indice, len(aulas_do_dia) - 1)]
+
+
+class QuadroSemanal:
+    """
+    Horários de aula de um usuário separados por dia da semana (ordinal 0-6),
+    cada dia ordenado por hora_inicio. As buscas por hora são bisect, sem consultas.
+    """
+
+    def __init__(self, aulas):
+        self.dias = tuple([] for _ in SIGLAS_DIAS)
+        for aula in sorted(aulas, key=hora_da_aula):
+            self.dias[ORDINAL_DIA[aula.dia_semana]].append(aula)
+
+    @staticmethod
+    def _aulas_do_usuario(usuario_id):
+        return HorarioAula.objects.filter(materia__usuario_id=usuario_id).select_related('materia').only(
+            'dia_semana', 'hora_inicio', 'local', *CAMPOS_MATERIA_RESUMO
+        ).order_by()
+
+    @classmethod
+    def do_usuario(cls, usuario_id):
+        return cls(cls._aulas_do_usuario(usuario_id))
+
+    @classmethod
+    async def ado_usuario(cls, usuario_id):
+        return cls([aula async for aula in cls._aulas_do_usuario(usuario_id)])
+
+    def __len__(self):
+        return sum(len(aulas) for aulas in self.dias)
+
+    def aulas_do_dia(self, ordinal):
+        return self.dias[ordinal]
+
+    def restantes_do_dia(self, ordinal, hora_atual):
+        aulas = self.dias[ordinal]
+        return aulas[bisect_left(aulas, hora_atual, key=hora_da_aula):]
+
+    def proxima_de_hoje(self, ordinal, hora_atual):
+        return proxima_aula(self.dias[ordinal], hora_atual)
+
+    def proxima_na_semana(self, agora):
+        """(ordinal do dia, aula) da próxima aula a partir de `agora`, dando a volta na semana."""
+        hoje = agora.weekday()
+        restantes = self.restantes_do_dia(hoje, agora.time())
+        if restantes:
+            return hoje, restantes[0]
+        for passo in range(1, len(SIGLAS_DIAS) + 1):
+            dia = (hoje + passo) % len(SIGLAS_DIAS)
+            if self.dias[dia]:
+                return dia, self.dias[dia][0]
+        return None, None
+
+    def semana(self):
+        """[(ordinal, nome do dia, aulas)] de segunda a domingo."""
+        return [(ordinal, NOMES_DIAS[ordinal], aulas) for ordinal, aulas in enumerate(self.dias)]
+
+
+def chave_quadro(usuario_id):
+    return f'agenda:quadro:{usuario_id}'
+
+
+def quadro_semanal(usuario_id):
+    """QuadroSemanal do usuário, montado com uma consulta e guardado no cache até mudar."""
+    quadro = cache.get(chave_quadro(usuario_id))
+    if quadro is None:
+        quadro = QuadroSemanal.do_usuario(usuario_id)
+        cache.set(chave_quadro(usuario_id), quadro, TEMPO_CACHE_QUADRO)
+    return quadro
+
+
+async def aquadro_semanal(usuario_id):
+    """Versão assíncrona de quadro_semanal."""
+    quadro = await cache.aget(chave_quadro(usuario_id))
+    if quadro is None:
+        quadro = await QuadroSemanal.ado_usuario(usuario_id)
+        await cache.aset(chave_quadro(usuario_id), quadro, TEMPO_CACHE_QUADRO)
+    return quadro
+
+
+def invalidar_quadro(usuario_id):
+    if usuario_id is not None:
+        cache.delete(chave_quadro(usuario_id))
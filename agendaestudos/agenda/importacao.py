@@ -0,0 +1,299 @@
+# Em agenda/importacao.py
+
+import csv
+import io
+from datetime import datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from .busca import indexar
+from .cache import invalidar_usuario
+from .contadores import recalcular_materia_stats
+from .horarios import invalidar_quadro
+from .models import Materia, Tarefa, Prova, HorarioAula
+
+TAMANHO_LOTE = 500
+MAX_ERROS_LISTADOS = 200
+
+TIPOS_IMPORTACAO = [
+    ('tarefa', 'Tarefas'),
+    ('prova', 'Provas'),
+    ('horario', 'Horários de Aula'),
+]
+
+# RRULE BYDAY -> sigla de HorarioAula.DIAS_SEMANA
+DIAS_ICS = {'MO': 'SEG', 'TU': 'TER', 'WE': 'QUA', 'TH': 'QUI', 'FR': 'SEX', 'SA': 'SAB', 'SU': 'DOM'}
+
+
+class ErroLinha(Exception):
+    pass
+
+
+class ErroArquivo(Exception):
+    """O arquivo inteiro não pode ser lido (codificação ou CSV malformado); nada é gravado."""
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.criados = {tipo: 0 for tipo, _ in TIPOS_IMPORTACAO}
+        self.total_linhas = 0
+        self.total_erros = 0
+        self.erros = []  # (linha, mensagem), limitado a MAX_ERROS_LISTADOS
+
+    def registrar_erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAX_ERROS_LISTADOS:
+            self.erros.append((linha, mensagem))
+
+    @property
+    def total_criados(self):
+        return sum(self.criados.values())
+
+
+# --- Leitura incremental dos arquivos ---
+
+def linhas_csv(arquivo):
+    """Gera (número da linha, dict) lendo o CSV aos poucos; aceita ',' ou ';' como separador."""
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    primeira = texto.readline()
+    separador = ';' if primeira.count(';') > primeira.count(',') else ','
+    cabecalho = [coluna.strip().lower() for coluna in next(csv.reader([primeira], delimiter=separador))]
+    for numero, valores in enumerate(csv.reader(texto, delimiter=separador), start=2):
+        if any(v.strip() for v in valores):
+            yield numero, {coluna: valor.strip() for coluna, valor in zip(cabecalho, valores)}
+
+
+def _linhas_desdobradas(arquivo):
+    """Linhas lógicas do iCalendar (RFC 5545 3.1: continuação começa com espaço ou tab)."""
+    atual, inicio, numero = None, 0, 0
+    for numero, bruta in enumerate(io.TextIOWrapper(arquivo, encoding='utf-8-sig'), start=1):
+        bruta = bruta.rstrip('\r\n')
+        if bruta[:1] in (' ', '\t') and atual is not None:
+            atual += bruta[1:]
+            continue
+        if atual is not None:
+            yield inicio, atual
+        atual, inicio = bruta, numero
+    if atual is not None:
+        yield inicio, atual
+
+
+def _texto_ics(valor):
+    return valor.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def eventos_ics(arquivo):
+    """Gera (linha do BEGIN:VEVENT, {propriedade: (parâmetros, valor)}) um evento por vez."""
+    evento, inicio = None, 0
+    for numero, linha in _linhas_desdobradas(arquivo):
+        nome, _, valor = linha.partition(':')
+        nome, *parametros = nome.split(';')
+        nome = nome.upper()
+        if nome == 'BEGIN' and valor.upper() == 'VEVENT':
+            evento, inicio = {}, numero
+        elif nome == 'END' and valor.upper() == 'VEVENT' and evento is not None:
+            yield inicio, evento
+            evento = None
+        elif evento is not None:
+            evento[nome] = (dict(p.split('=', 1) for p in parametros if '=' in p), valor)
+
+
+def data_hora_ics(parametros, valor):
+    """Converte DTSTART/DTEND: data (VALUE=DATE), UTC (sufixo Z), TZID ou horário local."""
+    valor = valor.strip()
+    if parametros.get('VALUE') == 'DATE' or len(valor) == 8:
+        return datetime.strptime(valor, '%Y%m%d').date()
+    momento = datetime.strptime(valor.rstrip('Z'), '%Y%m%dT%H%M%S')
+    if valor.endswith('Z'):
+        return momento.replace(tzinfo=ZoneInfo('UTC'))
+    try:
+        fuso = ZoneInfo(parametros['TZID']) if 'TZID' in parametros else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        fuso = timezone.get_current_timezone()
+    return timezone.make_aware(momento, fuso)
+
+
+def linhas_de_eventos_ics(arquivo):
+    """Traduz cada VEVENT para o mesmo formato de linha do CSV."""
+    for numero, evento in eventos_ics(arquivo):
+        def valor(nome):
+            return _texto_ics(evento.get(nome, ({}, ''))[1]).strip()
+
+        try:
+            inicio = data_hora_ics(*evento['DTSTART']) if 'DTSTART' in evento else None
+            fim = data_hora_ics(*evento['DTEND']) if 'DTEND' in evento else None
+        except ValueError:
+            yield numero, {'_erro': 'Data inválida em DTSTART/DTEND.'}
+            continue
+
+        linha = {
+            'titulo': valor('SUMMARY'),
+            'descricao': valor('DESCRIPTION'),
+            'materia': valor('CATEGORIES').split(',')[0].strip(),
+            'link': valor('URL'),
+            'local': valor('LOCATION'),
+        }
+        regra = dict(p.split('=', 1) for p in valor('RRULE').split(';') if '=' in p)
+        if regra.get('FREQ') == 'WEEKLY' and isinstance(inicio, datetime):
+            dias = [d[-2:] for d in regra.get('BYDAY', '').split(',') if d] or [
+                list(DIAS_ICS)[timezone.localtime(inicio).weekday()]
+            ]
+            for dia in dias:
+                yield numero, dict(linha, tipo='horario', dia_semana=DIAS_ICS.get(dia, dia),
+                                   hora_inicio=timezone.localtime(inicio).time().isoformat())
+        elif inicio is not None and not isinstance(inicio, datetime):
+            yield numero, dict(linha, tipo='prova', data_prova=inicio.isoformat(), observacoes=linha['descricao'])
+        else:
+            yield numero, dict(linha, tipo='tarefa', data_inicio=inicio, data_fim=fim or inicio)
+
+
+# --- Conversão de uma linha em objeto ---
+
+def _data_hora(valor, campo):
+    if isinstance(valor, datetime):
+        return valor
+    momento = parse_datetime(valor or '')
+    if momento is None:
+        data = parse_date(valor or '')
+        if data is None:
+            raise ErroLinha(f'{campo}: data/hora inválida ({valor!r}).')
+        momento = datetime.combine(data, time.min)
+    return timezone.make_aware(momento) if timezone.is_naive(momento) else momento
+
+
+def _escolha(valor, opcoes, campo, padrao):
+    if not valor:
+        return padrao
+    for codigo, nome in opcoes:
+        if valor.upper() == codigo.upper() or valor.lower() == nome.lower():
+            return codigo
+    raise ErroLinha(f'{campo}: valor inválido ({valor!r}).')
+
+
+def construir_objeto(tipo, linha, materia_id):
+    if tipo == 'tarefa':
+        return Tarefa(
+            materia_id=materia_id,
+            titulo=linha.get('titulo', ''),
+            descricao=linha.get('descricao') or None,
+            data_inicio=_data_hora(linha.get('data_inicio'), 'data_inicio'),
+            data_fim=_data_hora(linha.get('data_fim'), 'data_fim'),
+            status=_escolha(linha.get('status'), Tarefa.STATUS_CHOICES, 'status', 'A'),
+            prioridade=_escolha(linha.get('prioridade'), Tarefa.PRIORIDADE_CHOICES, 'prioridade', 'M'),
+            link_anexo=linha.get('link') or None,
+        )
+    if tipo == 'prova':
+        data_prova = None
+        if linha.get('data_prova'):
+            data_prova = parse_date(linha['data_prova'])
+            if data_prova is None:
+                raise ErroLinha(f"data_prova: data inválida ({linha['data_prova']!r}).")
+        return Prova(
+            materia_id=materia_id,
+            titulo=linha.get('titulo', ''),
+            data_prova=data_prova,
+            observacoes=linha.get('observacoes') or linha.get('descricao') or None,
+            link_anexos=linha.get('link') or None,
+        )
+    if tipo == 'horario':
+        hora = parse_time(linha.get('hora_inicio') or '')
+        if hora is None:
+            raise ErroLinha(f"hora_inicio: horário inválido ({linha.get('hora_inicio')!r}).")
+        return HorarioAula(
+            materia_id=materia_id,
+            dia_semana=_escolha(linha.get('dia_semana'), HorarioAula.DIAS_SEMANA, 'dia_semana', None),
+            hora_inicio=hora,
+            local=linha.get('local') or None,
+        )
+    raise ErroLinha(f'tipo: valor inválido ({tipo!r}).')
+
+
+# --- Pipeline ---
+
+def indice_materias(usuario):
+    """Resolve as matérias do usuário uma vez: nome e sigla (sem diferenciar maiúsculas) -> id."""
+    indice = {}
+    for pk, nome, sigla in Materia.objects.filter(usuario=usuario).values_list('pk', 'nome', 'nomenclatura'):
+        indice.setdefault(nome.strip().lower(), pk)
+        if sigla:
+            indice.setdefault(sigla.strip().lower(), pk)
+    return indice
+
+
+def importar_linhas(usuario, linhas, tipo_padrao='tarefa', materia_padrao=None):
+    """
+    Valida e grava as linhas em lotes de TAMANHO_LOTE com bulk_create, dentro de uma transação.
+    Linhas inválidas são puladas e relatadas; só um lote por tipo fica em memória.
+    """
+    resultado = ResultadoImportacao()
+    materias = indice_materias(usuario)
+    lotes = {tipo: [] for tipo, _ in TIPOS_IMPORTACAO}
+    modelos = {'tarefa': Tarefa, 'prova': Prova, 'horario': HorarioAula}
+    afetadas = set()
+
+    def gravar(tipo):
+        if lotes[tipo]:
+            modelos[tipo].objects.bulk_create(lotes[tipo])
+            if tipo != 'horario':
+                indexar(tipo, lotes[tipo], usuario.pk)
+            resultado.criados[tipo] += len(lotes[tipo])
+            lotes[tipo] = []
+
+    with transaction.atomic():
+        for numero, linha in linhas:
+            resultado.total_linhas += 1
+            try:
+                if '_erro' in linha:
+                    raise ErroLinha(linha['_erro'])
+                tipo = (linha.get('tipo') or tipo_padrao or '').lower()
+                nome_materia = (linha.get('materia') or '').strip().lower()
+                materia_id = materias.get(nome_materia) if nome_materia else materia_padrao
+                if materia_id is None:
+                    raise ErroLinha(f"matéria não encontrada ({linha.get('materia') or 'vazia'}).")
+
+                objeto = construir_objeto(tipo, linha, materia_id)
+                objeto.full_clean(exclude=['materia'], validate_unique=False, validate_constraints=False)
+            except ErroLinha as erro:
+                resultado.registrar_erro(numero, str(erro))
+                continue
+            except ValidationError as erro:
+                mensagens = '; '.join(f"{campo}: {' '.join(m)}" for campo, m in erro.message_dict.items())
+                resultado.registrar_erro(numero, mensagens)
+                continue
+
+            lotes[tipo].append(objeto)
+            afetadas.add(materia_id)
+            if len(lotes[tipo]) >= TAMANHO_LOTE:
+                gravar(tipo)
+
+        for tipo in lotes:
+            gravar(tipo)
+
+        # bulk_create não dispara signals: estatísticas e cache são atualizados uma vez
+        # (o índice de busca foi atualizado a cada lote)
+        if afetadas:
+            recalcular_materia_stats(afetadas)
+
+    if resultado.total_criados:
+        invalidar_usuario(usuario.pk)
+    if resultado.criados['horario']:
+        invalidar_quadro(usuario.pk)
+    return resultado
+
+
+def importar_arquivo(usuario, arquivo, nome_arquivo, tipo_padrao='tarefa', materia_padrao=None):
+    if nome_arquivo.lower().endswith(('.ics', '.ical')):
+        linhas = linhas_de_eventos_ics(arquivo)
+    else:
+        linhas = linhas_csv(arquivo)
+    # Os erros de leitura aparecem no meio da transação de importar_linhas, que é desfeita
+    try:
+        return importar_linhas(usuario, linhas, tipo_padrao, materia_padrao)
+    except UnicodeDecodeError:
+        raise ErroArquivo('O arquivo precisa estar em UTF-8 (no Excel, salve como "CSV UTF-8").') from None
+    except csv.Error as erro:
+        raise ErroArquivo(f'CSV malformado: {erro}.') from None
@@ -0,0 +1,181 @@
+# Em agenda/instrumentacao.py
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection
+from django.template.base import Template
+
+
+class ContadorConsultas:
+    """
+    Acumula quantas consultas SQL foram executadas enquanto o contador estava ativo.
+    Funciona com DEBUG desligado, pois usa execute_wrapper em vez de connection.queries.
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def contar_consultas():
+    contador = ContadorConsultas()
+    with connection.execute_wrapper(contador):
+        yield contador
+
+
+# --- Instrumentação por requisição (usada por agenda.middleware.InstrumentacaoMiddleware) ---
+
+_NUMEROS = re.compile(r'\b\d+(\.\d+)?\b')
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_LISTAS_IN = re.compile(r'IN \((?:[^()]*)\)', re.IGNORECASE)
+_ESPACOS = re.compile(r'\s+')
+
+# Medição da requisição em andamento (se houver), lida pelos wrappers de consultas e de templates
+medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+def impressao_digital(sql):
+    """Normaliza o SQL (literais, listas IN, espaços) para agrupar consultas repetidas."""
+    sql = _TEXTOS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    sql = _LISTAS_IN.sub('IN (...)', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+
+class MedicaoRequisicao:
+    """Consultas, tempo de SQL, duplicadas e tempo de template de uma requisição."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.impressoes = Counter()
+        self._profundidade_template = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.impressoes[impressao_digital(sql)] += 1
+
+    @property
+    def duplicadas(self):
+        return sum(total - 1 for total in self.impressoes.values() if total > 1)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """
+    Wrapper fixo das conexões (ver instalar_medicao_consultas): repassa a consulta para a
+    medição da requisição em andamento, se houver. Como a medição vem do ContextVar, conta
+    também as consultas das views assíncronas, que rodam nas threads do sync_to_async.
+    """
+    medicao = medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    return medicao(execute, sql, params, many, context)
+
+
+def instalar_medicao_consultas(connection, **kwargs):
+    """Receiver de connection_created: cada conexão aberta (em qualquer thread) ganha o wrapper."""
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+_render_original = Template.render
+_requisicoes_medidas = 0
+_lock_templates = threading.Lock()
+
+
+def _render_medido(self, context):
+    medicao = medicao_atual.get()
+    if medicao is None:
+        return _render_original(self, context)
+    # Includes chamam render de novo: só o template mais externo é cronometrado
+    medicao._profundidade_template += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        medicao._profundidade_template -= 1
+        if medicao._profundidade_template == 0:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+
+@contextmanager
+def medindo(medicao):
+    """
+    Ativa a medição durante o bloco. Template.render só fica envolvido enquanto houver alguma
+    requisição sendo medida: a primeira instala o wrapper e a última devolve o original.
+    """
+    global _requisicoes_medidas
+    with _lock_templates:
+        if _requisicoes_medidas == 0:
+            Template.render = _render_medido
+        _requisicoes_medidas += 1
+    token = medicao_atual.set(medicao)
+    try:
+        yield medicao
+    finally:
+        medicao_atual.reset(token)
+        with _lock_templates:
+            _requisicoes_medidas -= 1
+            if _requisicoes_medidas == 0:
+                Template.render = _render_original
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0
+    indice = max(0, min(len(valores_ordenados) - 1, math.ceil(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class ResumoPorRota:
+    """Janela deslizante das últimas N requisições por nome de URL, com percentis."""
+
+    def __init__(self, janela=500):
+        self.janela = janela
+        self._amostras = defaultdict(lambda: deque(maxlen=self.janela))
+        self._lock = threading.Lock()
+
+    def registrar(self, rota, total_ms, sql_ms, template_ms, consultas, duplicadas):
+        with self._lock:
+            self._amostras[rota].append((total_ms, sql_ms, template_ms, consultas, duplicadas))
+
+    def limpar(self):
+        with self._lock:
+            self._amostras.clear()
+
+    def resumo(self):
+        with self._lock:
+            amostras = {rota: list(valores) for rota, valores in self._amostras.items()}
+
+        resultado = {}
+        for rota, valores in sorted(amostras.items()):
+            colunas = list(zip(*valores))
+            tempos, sql, template, consultas, duplicadas = (sorted(c) for c in colunas)
+            resultado[rota] = {
+                'requisicoes': len(valores),
+                'tempo_ms': {f'p{p}': round(percentil(tempos, p), 2) for p in (50, 95, 99)},
+                'sql_ms': {f'p{p}': round(percentil(sql, p), 2) for p in (50, 95)},
+                'template_ms': {f'p{p}': round(percentil(template, p), 2) for p in (50, 95)},
+                'consultas': {'p50': percentil(consultas, 50), 'max': consultas[-1]},
+                'duplicadas': {'p50': percentil(duplicadas, 50), 'max': duplicadas[-1]},
+            }
+        return resultado
+
+
+resumo_rotas = ResumoPorRota()
@@ -0,0 +1,242 @@
+# Em agenda/lembretes.py
+
+import re
+import uuid
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Lembrete, MarcaVarredura, Prova, Tarefa
+
+# Lembretes por e-mail de prazos (Tarefa.data_fim) e provas (Prova.data_prova), enviados pelo
+# comando enviar_lembretes. Cada ciclo varre só a faixa de tempo nova desde o ciclo anterior
+# (marca d'água em MarcaVarredura), em baldes de BALDE, com consultas de intervalo nos índices
+# de data_fim/data_prova: uma tarefa vence em `t` e a antecedência é `a`, então o lembrete entra
+# no ciclo em que `t - a` passa. Os lembretes ficam gravados (Lembrete, com restrição única)
+# antes do envio, e o envio junta os lembretes de cada aluno num e-mail, todos por uma conexão.
+
+ANTECEDENCIAS = (timedelta(hours=24), timedelta(hours=1))
+HORA_PROVA = time(8, 0)
+BALDE = timedelta(hours=1)
+# Parado por mais tempo que isso, o comando não recupera os lembretes que perdeu
+ATRASO_MAXIMO = timedelta(hours=6)
+MAX_TENTATIVAS = 3
+ESPERA_FALHA = timedelta(minutes=5)
+TEMPO_LIMITE_ENVIO = timedelta(minutes=10)
+CHAVE_VARREDURA = 'lembretes'
+
+
+def antecedencias_configuradas():
+    return tuple(getattr(settings, 'AGENDA_LEMBRETES_ANTECEDENCIAS', ANTECEDENCIAS))
+
+
+def momento_da_prova(data):
+    # Provas só têm a data: o "horário" delas é HORA_PROVA no fuso local
+    hora = getattr(settings, 'AGENDA_LEMBRETES_HORA_PROVA', HORA_PROVA)
+    return timezone.make_aware(datetime.combine(data, hora))
+
+
+RE_ANTECEDENCIA = re.compile(r'^(\d+)\s*([mhd])$')
+UNIDADES = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def ler_antecedencia(texto):
+    """'24h', '90m', '2d' -> timedelta."""
+    correspondencia = RE_ANTECEDENCIA.match(texto.strip().lower())
+    if not correspondencia or int(correspondencia.group(1)) == 0:
+        raise ValueError(f'Antecedência inválida: {texto!r} (use, por exemplo, 24h, 90m ou 2d).')
+    return timedelta(**{UNIDADES[correspondencia.group(2)]: int(correspondencia.group(1))})
+
+
+def descrever_antecedencia(antecedencia):
+    minutos = int(antecedencia.total_seconds() // 60)
+    # "24 horas" em vez de "1 dia": dias só a partir de 2
+    for tamanho, singular, plural in ((1440, 'dia', 'dias'), (60, 'hora', 'horas'), (1, 'minuto', 'minutos')):
+        if minutos % tamanho == 0 and (tamanho != 1440 or minutos >= 2880):
+            quantidade = minutos // tamanho
+            return f'{quantidade} {singular if quantidade == 1 else plural}'
+
+
+# --- Varredura ---
+
+def tarefas_entre(inicio, fim):
+    # Intervalo no índice tarefa_fim_idx; só alunos com e-mail
+    return (
+        Tarefa.objects.filter(data_fim__gt=inicio, data_fim__lte=fim).exclude(status='C')
+        .exclude(materia__usuario__email='').values_list('pk', 'materia__usuario_id', 'data_fim')
+    )
+
+
+def provas_entre(inicio, fim):
+    # Intervalo de datas no índice prova_data_idx (o horário é conferido em eventos_entre)
+    return (
+        Prova.objects.filter(data_prova__range=(timezone.localdate(inicio), timezone.localdate(fim)))
+        .exclude(materia__usuario__email='').values_list('pk', 'materia__usuario_id', 'data_prova')
+    )
+
+
+def eventos_entre(inicio, fim):
+    """(tipo, objeto_id, usuario_id, momento) de tarefas abertas e provas em (inicio, fim]."""
+    for pk, usuario_id, momento in tarefas_entre(inicio, fim):
+        yield Lembrete.TAREFA, pk, usuario_id, momento
+    for pk, usuario_id, data in provas_entre(inicio, fim):
+        momento = momento_da_prova(data)
+        if inicio < momento <= fim:
+            yield Lembrete.PROVA, pk, usuario_id, momento
+
+
+def agendar_lembretes(agora=None, antecedencias=None):
+    """
+    Grava os lembretes cujo horário de envio caiu entre a marca d'água e `agora` e avança a
+    marca. Devolve quantos candidatos encontrou (os que já existiam são ignorados pelo banco).
+    """
+    agora = agora or timezone.now()
+    antecedencias = antecedencias or antecedencias_configuradas()
+    marca = MarcaVarredura.objects.filter(chave=CHAVE_VARREDURA).values_list('ate', flat=True).first()
+    # Na primeira execução não há o que recuperar: começa agora
+    inicio = agora if marca is None else max(marca, agora - ATRASO_MAXIMO)
+    if marca is None:
+        MarcaVarredura.objects.create(chave=CHAVE_VARREDURA, ate=agora)
+
+    encontrados = 0
+    while inicio < agora:
+        fim = min(inicio + BALDE, agora)
+        novos = [
+            Lembrete(
+                usuario_id=usuario_id, tipo=tipo, objeto_id=pk, antecedencia=antecedencia,
+                momento_evento=momento, enviar_em=momento - antecedencia,
+            )
+            for antecedencia in antecedencias
+            for tipo, pk, usuario_id, momento in eventos_entre(inicio + antecedencia, fim + antecedencia)
+            if momento > agora
+        ]
+        with transaction.atomic():
+            Lembrete.objects.bulk_create(novos, ignore_conflicts=True)
+            MarcaVarredura.objects.filter(chave=CHAVE_VARREDURA).update(ate=fim)
+        encontrados += len(novos)
+        inicio = fim
+    return encontrados
+
+
+# --- Envio ---
+
+def _eventos_dos_lembretes(lembretes):
+    ids = defaultdict(set)
+    for lembrete in lembretes:
+        ids[lembrete.tipo].add(lembrete.objeto_id)
+    return {
+        Lembrete.TAREFA: Tarefa.objects.select_related('materia')
+        .only('titulo', 'data_fim', 'status', 'materia__nome').in_bulk(ids[Lembrete.TAREFA]),
+        Lembrete.PROVA: Prova.objects.select_related('materia')
+        .only('titulo', 'data_prova', 'materia__nome').in_bulk(ids[Lembrete.PROVA]),
+    }
+
+
+def _ainda_vale(lembrete, evento, agora):
+    """O evento ainda existe, não mudou de horário, não passou e (tarefa) não foi concluída."""
+    if evento is None:
+        return False
+    if lembrete.tipo == Lembrete.TAREFA:
+        momento = evento.data_fim
+        if evento.status == 'C':
+            return False
+    else:
+        momento = momento_da_prova(evento.data_prova) if evento.data_prova else None
+    return momento == lembrete.momento_evento and momento > agora
+
+
+def _linha(lembrete, evento):
+    quando = descrever_antecedencia(lembrete.antecedencia)
+    if lembrete.tipo == Lembrete.TAREFA:
+        prazo = timezone.localtime(evento.data_fim).strftime('%d/%m/%Y %H:%M')
+        return f'- Tarefa "{evento.titulo}" ({evento.materia.nome}): prazo em {quando}, {prazo}.'
+    return f'- Prova "{evento.titulo}" ({evento.materia.nome}): em {quando}, {evento.data_prova:%d/%m/%Y}.'
+
+
+def montar_mensagem(usuario, itens):
+    """Um e-mail com todos os lembretes do aluno neste ciclo."""
+    if len(itens) == 1:
+        lembrete, evento = itens[0]
+        tipo = 'prazo de' if lembrete.tipo == Lembrete.TAREFA else 'prova'
+        assunto = f'Lembrete: {tipo} "{evento.titulo}" em {descrever_antecedencia(lembrete.antecedencia)}'
+    else:
+        assunto = f'{len(itens)} lembretes da sua agenda de estudos'
+    corpo = '\n'.join([
+        f'Olá, {usuario.first_name or usuario.username}!', '',
+        *(_linha(lembrete, evento) for lembrete, evento in itens), '',
+        'Agenda de Estudos',
+    ])
+    return EmailMessage(assunto, corpo, to=[usuario.email])
+
+
+def enviar_pendentes(agora=None, limite=500, conexao=None):
+    """
+    Envia os lembretes vencidos: reserva um lote (UPDATE com um identificador de lote), descarta
+    os que não valem mais e manda um e-mail por aluno, todos pela mesma conexão do backend de
+    e-mail. Devolve (enviados, descartados, falhas) em número de lembretes.
+    """
+    agora = agora or timezone.now()
+    # Um envio interrompido (processo morto) não é repetido: melhor perder um lembrete que
+    # mandar o mesmo duas vezes
+    Lembrete.objects.filter(status=Lembrete.ENVIANDO, atualizado_em__lt=agora - TEMPO_LIMITE_ENVIO).update(
+        status=Lembrete.FALHOU, erro='Envio interrompido.',
+    )
+
+    lote = uuid.uuid4().hex
+    pks = Lembrete.objects.filter(status=Lembrete.PENDENTE, enviar_em__lte=agora).order_by('enviar_em', 'pk')
+    Lembrete.objects.filter(pk__in=list(pks.values_list('pk', flat=True)[:limite]), status=Lembrete.PENDENTE).update(
+        status=Lembrete.ENVIANDO, lote=lote, atualizado_em=agora,
+    )
+    lembretes = list(Lembrete.objects.filter(lote=lote).select_related('usuario').order_by('momento_evento', 'pk'))
+    if not lembretes:
+        return 0, 0, 0
+
+    eventos = _eventos_dos_lembretes(lembretes)
+    por_usuario, descartados = defaultdict(list), []
+    for lembrete in lembretes:
+        evento = eventos[lembrete.tipo].get(lembrete.objeto_id)
+        if _ainda_vale(lembrete, evento, agora) and lembrete.usuario.email:
+            por_usuario[lembrete.usuario].append((lembrete, evento))
+        else:
+            descartados.append(lembrete.pk)
+    Lembrete.objects.filter(pk__in=descartados).update(status=Lembrete.DESCARTADO)
+
+    enviados, falhas = [], {}
+    conexao = conexao or get_connection()
+    try:
+        with conexao:
+            for usuario, itens in por_usuario.items():
+                pks_usuario = [lembrete.pk for lembrete, _ in itens]
+                try:
+                    conexao.send_messages([montar_mensagem(usuario, itens)])
+                except Exception as erro:
+                    falhas.update(dict.fromkeys(pks_usuario, erro))
+                else:
+                    enviados.extend(pks_usuario)
+    except Exception as erro:
+        # Não abriu (ou perdeu) a conexão: o que não foi enviado volta para a fila
+        for itens in por_usuario.values():
+            for lembrete, _ in itens:
+                if lembrete.pk not in falhas and lembrete.pk not in enviados:
+                    falhas[lembrete.pk] = erro
+
+    Lembrete.objects.filter(pk__in=enviados).update(status=Lembrete.ENVIADO, enviado_em=agora, erro='')
+    _registrar_falhas(falhas, agora)
+    return len(enviados), len(descartados), len(falhas)
+
+
+def _registrar_falhas(falhas, agora):
+    # Volta para a fila com espera, até MAX_TENTATIVAS
+    for pk, erro in falhas.items():
+        mensagem = f'{type(erro).__name__}: {erro}'[:300]
+        Lembrete.objects.filter(pk=pk, tentativas__gte=MAX_TENTATIVAS - 1).update(
+            status=Lembrete.FALHOU, tentativas=F('tentativas') + 1, erro=mensagem,
+        )
+        Lembrete.objects.filter(pk=pk, tentativas__lt=MAX_TENTATIVAS - 1).update(
+            status=Lembrete.PENDENTE, tentativas=F('tentativas') + 1, erro=mensagem, enviar_em=agora + ESPERA_FALHA,
+        )
@@ -0,0 +1,389 @@
+# Em agenda/links.py
+
+import asyncio
+import base64
+import ipaddress
+import re
+import socket
+import ssl
+from dataclasses import dataclass
+from datetime import timedelta
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidar_usuario
+from .models import Materia, MaterialDeApoio, MetadadosLink, Prova, Tarefa
+
+# Metadados (título, ícone, tipo de conteúdo) dos links que o aluno cadastra. As páginas só leem
+# a tabela MetadadosLink (anexar_metadados: uma consulta por página, nenhuma requisição externa);
+# quem busca é o comando atualizar_links, em lotes: as URLs sem metadados ou vencidas são
+# consultadas com asyncio, no máximo CONCORRENCIA conexões abertas ao mesmo tempo e TEMPO_LIMITE
+# por link. Falhas ficam guardadas também (cache negativo), com validade que cresce a cada falha
+# seguida, para um link quebrado não ser consultado de novo a cada lote. O ícone da página também
+# é baixado pelo worker (só image/*, até LIMITE_ICONE) e guardado como data URI: as páginas não
+# apontam para endereços de terceiros.
+
+VALIDADE = timedelta(days=7)
+VALIDADE_FALHA = timedelta(hours=1)
+CONCORRENCIA = 8
+TEMPO_LIMITE = 5.0
+LIMITE_CORPO = 64 * 1024
+LIMITE_ICONE = 8 * 1024
+MAX_REDIRECIONAMENTOS = 4
+AGENTE = 'AgendaEstudos/1.0 (pre-visualizacao de links)'
+TIPOS_HTML = ('text/html', 'application/xhtml+xml')
+RE_TIPO_IMAGEM = re.compile(r'image/[\w.+-]+')
+
+# Modelo -> (campo com o link, caminho até o id do dono)
+CAMPOS_LINK = {
+    Materia: ('link_plano_ensino', 'usuario'),
+    Tarefa: ('link_anexo', 'materia__usuario'),
+    Prova: ('link_anexos', 'materia__usuario'),
+    MaterialDeApoio: ('link_url', 'prova__materia__usuario'),
+}
+
+
+# --- Leitura (páginas) ---
+
+def url_do_objeto(objeto):
+    return getattr(objeto, CAMPOS_LINK[type(objeto)][0]) or None
+
+
+def _distribuir(objetos, metadados):
+    for objeto in objetos:
+        objeto.metadados_link = metadados.get(url_do_objeto(objeto))
+    return objetos
+
+
+def anexar_metadados(objetos):
+    """
+    Põe em cada objeto o atributo `metadados_link` (MetadadosLink ou None), com uma consulta
+    para todos. Só lê o que atualizar_links já gravou: a página nunca espera por HTTP.
+    """
+    objetos = list(objetos)
+    urls = {url for url in map(url_do_objeto, objetos) if url}
+    metadados = {m.url: m for m in MetadadosLink.objects.filter(url__in=urls)} if urls else {}
+    return _distribuir(objetos, metadados)
+
+
+async def aanexar_metadados(objetos):
+    """Versão assíncrona de anexar_metadados."""
+    objetos = list(objetos)
+    urls = {url for url in map(url_do_objeto, objetos) if url}
+    metadados = {}
+    if urls:
+        metadados = {m.url: m async for m in MetadadosLink.objects.filter(url__in=urls)}
+    return _distribuir(objetos, metadados)
+
+
+# --- Fila (URLs sem metadados válidos) ---
+
+def links_pendentes(limite, agora=None):
+    """Até `limite` URLs cadastradas que nunca foram buscadas ou cujos metadados venceram."""
+    agora = agora or timezone.now()
+    validos = MetadadosLink.objects.filter(expira_em__gt=agora).values('url')
+    pendentes = {}
+    for modelo, (campo, _) in CAMPOS_LINK.items():
+        restante = limite - len(pendentes)
+        if restante <= 0:
+            break
+        consulta = (
+            modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            .exclude(**{f'{campo}__in': validos})
+            .order_by(campo).values_list(campo, flat=True).distinct()
+        )
+        pendentes.update(dict.fromkeys(consulta[:restante]))
+    return list(pendentes)[:limite]
+
+
+def apagar_orfaos(agora=None):
+    """Apaga metadados vencidos de links que nenhum objeto usa mais."""
+    orfaos = MetadadosLink.objects.filter(expira_em__lte=agora or timezone.now())
+    for modelo, (campo, _) in CAMPOS_LINK.items():
+        orfaos = orfaos.exclude(url__in=modelo.objects.filter(**{f'{campo}__isnull': False}).values(campo))
+    return orfaos.delete()[0]
+
+
+def usuarios_dos_links(urls):
+    usuarios = set()
+    for modelo, (campo, dono) in CAMPOS_LINK.items():
+        usuarios.update(modelo.objects.filter(**{f'{campo}__in': urls}).values_list(dono, flat=True).distinct())
+    return usuarios
+
+
+# --- Busca (assíncrona, só rede: nada de banco aqui) ---
+
+@dataclass
+class Resultado:
+    url: str
+    status_http: int = None
+    tipo_conteudo: str = ''
+    titulo: str = ''
+    favicon: str = ''
+    erro: str = ''
+
+
+class LinkRecusado(Exception):
+    """Esquema não suportado ou endereço da rede interna."""
+
+
+class RespostaInvalida(Exception):
+    pass
+
+
+class _CabecalhoHtml(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.titulo = None
+        self.titulo_og = ''
+        self.icone = ''
+        self._partes = None
+
+    def handle_starttag(self, tag, attrs):
+        atributos = {nome: valor or '' for nome, valor in attrs}
+        if tag == 'title' and self.titulo is None:
+            self._partes = []
+        elif tag == 'meta' and atributos.get('property', '').lower() == 'og:title':
+            self.titulo_og = self.titulo_og or atributos.get('content', '')
+        elif tag == 'link' and 'icon' in atributos.get('rel', '').lower().split():
+            self.icone = self.icone or atributos.get('href', '')
+
+    def handle_data(self, data):
+        if self._partes is not None:
+            self._partes.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._partes is not None:
+            self.titulo = ''.join(self._partes)
+            self._partes = None
+
+
+RE_CHARSET_META = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def _charset(tipo_conteudo, corpo):
+    correspondencia = re.search(r'charset=["\']?([\w-]+)', tipo_conteudo, re.IGNORECASE)
+    if correspondencia:
+        return correspondencia.group(1)
+    correspondencia = RE_CHARSET_META.search(corpo[:2048])
+    return correspondencia.group(1).decode('ascii') if correspondencia else 'utf-8'
+
+
+def ler_cabecalho_html(corpo, tipo_conteudo=''):
+    """(título, href do ícone) de um pedaço de HTML; os dois podem vir vazios."""
+    try:
+        texto = corpo.decode(_charset(tipo_conteudo, corpo), errors='replace')
+    except LookupError:
+        texto = corpo.decode('utf-8', errors='replace')
+    leitor = _CabecalhoHtml()
+    leitor.feed(texto)
+    titulo = leitor.titulo
+    if titulo is None and leitor._partes:
+        # <title> sem fechamento: a página foi cortada em LIMITE_CORPO
+        titulo = ''.join(leitor._partes)
+    titulo = ' '.join((titulo or leitor.titulo_og).split())
+    return titulo, leitor.icone.strip()
+
+
+def _rede_local_permitida():
+    # Só para desenvolvimento e testes: em produção o worker não acessa a rede interna (SSRF)
+    return getattr(settings, 'AGENDA_LINKS_PERMITIR_REDE_LOCAL', False)
+
+
+async def _resolver(host, porta):
+    infos = await asyncio.get_running_loop().getaddrinfo(host, porta, type=socket.SOCK_STREAM)
+    for *_, endereco in infos:
+        if _rede_local_permitida() or ipaddress.ip_address(endereco[0]).is_global:
+            return endereco[0]
+    raise LinkRecusado('Endereço não permitido.')
+
+
+async def _ler_corpo(leitor, cabecalhos, limite=LIMITE_CORPO):
+    partes, total = [], 0
+    if 'chunked' in cabecalhos.get('transfer-encoding', '').lower():
+        while total < limite:
+            tamanho = int((await leitor.readline()).split(b';')[0].strip() or b'0', 16)
+            if tamanho == 0:
+                break
+            # O tamanho vem do servidor: nunca lê (nem guarda) além do limite
+            restante = limite - total
+            partes.append(await leitor.readexactly(min(tamanho, restante)))
+            if tamanho >= restante:
+                break
+            await leitor.readline()
+            total += tamanho
+    else:
+        while total < limite:
+            bloco = await leitor.read(limite - total)
+            if not bloco:
+                break
+            partes.append(bloco)
+            total += len(bloco)
+    return b''.join(partes)[:limite]
+
+
+async def _requisitar(url, imagem=False):
+    """
+    GET simples (HTTP/1.1, sem keep-alive): (status, cabeçalhos, corpo). O corpo só é lido para
+    HTML (o começo, até LIMITE_CORPO) ou, com `imagem`, para image/* (até LIMITE_ICONE + 1 byte,
+    para quem chama saber que passou do limite).
+    """
+    partes = urlsplit(url)
+    if partes.scheme not in ('http', 'https') or not partes.hostname:
+        raise LinkRecusado('Esquema não suportado.')
+    porta = partes.port or (443 if partes.scheme == 'https' else 80)
+    endereco = await _resolver(partes.hostname, porta)
+    contexto = ssl.create_default_context() if partes.scheme == 'https' else None
+    leitor, escritor = await asyncio.open_connection(
+        endereco, porta, ssl=contexto, server_hostname=partes.hostname if contexto else None,
+    )
+    try:
+        caminho = quote(partes.path or '/', safe="/%:@!$&'()*+,;=~-._")
+        if partes.query:
+            caminho += '?' + quote(partes.query, safe="/%:@!$&'()*+,;=~-._?")
+        host = partes.netloc.rpartition('@')[2].encode('idna').decode('ascii')
+        escritor.write((
+            f'GET {caminho} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {AGENTE}\r\n'
+            f'Accept: {"image/*" if imagem else "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"}\r\n'
+            'Accept-Encoding: identity\r\nConnection: close\r\n\r\n'
+        ).encode('ascii'))
+        await escritor.drain()
+
+        linha = (await leitor.readline()).decode('latin-1').split()
+        if len(linha) < 2 or not linha[0].startswith('HTTP/') or not linha[1].isdigit():
+            raise RespostaInvalida('Resposta HTTP inválida.')
+        status = int(linha[1])
+        cabecalhos = {}
+        while (cabecalho := await leitor.readline()) not in (b'\r\n', b'\n', b''):
+            nome, _, valor = cabecalho.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        corpo = b''
+        if status == 200 and imagem and _tipo(cabecalhos).startswith('image/'):
+            corpo = await _ler_corpo(leitor, cabecalhos, LIMITE_ICONE + 1)
+        elif status == 200 and not imagem and _tipo(cabecalhos) in TIPOS_HTML:
+            # Título e ícone ficam no <head>: o começo da página basta
+            corpo = await _ler_corpo(leitor, cabecalhos)
+        return status, cabecalhos, corpo
+    finally:
+        escritor.close()
+
+
+def _tipo(cabecalhos):
+    return cabecalhos.get('content-type', '').split(';')[0].strip().lower()[:100]
+
+
+async def _seguir(url, imagem=False):
+    """(url final, status, cabeçalhos, corpo), seguindo até MAX_REDIRECIONAMENTOS redirecionamentos."""
+    atual = url
+    for _ in range(MAX_REDIRECIONAMENTOS + 1):
+        status, cabecalhos, corpo = await _requisitar(atual, imagem)
+        if status in (301, 302, 303, 307, 308) and cabecalhos.get('location'):
+            atual = urljoin(atual, cabecalhos['location'])
+            continue
+        return atual, status, cabecalhos, corpo
+    return atual, status, None, b''
+
+
+async def baixar_icone(url):
+    """Ícone como data URI, ou '' se não for imagem, passar de LIMITE_ICONE ou falhar."""
+    try:
+        _, status, cabecalhos, corpo = await _seguir(url, imagem=True)
+    except (LinkRecusado, RespostaInvalida, OSError, ValueError, UnicodeError, asyncio.IncompleteReadError):
+        return ''
+    tipo = _tipo(cabecalhos or {})
+    if status != 200 or not corpo or len(corpo) > LIMITE_ICONE or not RE_TIPO_IMAGEM.fullmatch(tipo):
+        return ''
+    return f'data:{tipo};base64,{base64.b64encode(corpo).decode("ascii")}'
+
+
+async def buscar_metadados(url):
+    """Resultado de um link, seguindo até MAX_REDIRECIONAMENTOS redirecionamentos."""
+    atual, status, cabecalhos, corpo = await _seguir(url)
+    if cabecalhos is None:
+        return Resultado(url, status, erro='Redirecionamentos demais.')
+
+    resultado = Resultado(url, status, _tipo(cabecalhos))
+    if status >= 400:
+        resultado.erro = f'HTTP {status}'
+    elif corpo:
+        titulo, icone = ler_cabecalho_html(corpo, cabecalhos.get('content-type', ''))
+        resultado.titulo = titulo[:300]
+        icone = urljoin(atual, icone) if icone else ''
+        if urlsplit(icone).scheme in ('http', 'https'):
+            resultado.favicon = await baixar_icone(icone)
+    return resultado
+
+
+async def buscar_todos(urls, concorrencia=CONCORRENCIA, tempo_limite=TEMPO_LIMITE):
+    """Busca os links em paralelo, com no máximo `concorrencia` conexões abertas ao mesmo tempo."""
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def buscar_um(url):
+        async with semaforo:
+            try:
+                return await asyncio.wait_for(buscar_metadados(url), tempo_limite)
+            except TimeoutError:
+                return Resultado(url, erro='Tempo esgotado.')
+            except (LinkRecusado, RespostaInvalida) as erro:
+                return Resultado(url, erro=str(erro))
+            except (OSError, ValueError, UnicodeError, asyncio.IncompleteReadError) as erro:
+                return Resultado(url, erro=f'{type(erro).__name__}: {erro}'[:300])
+
+    return await asyncio.gather(*(buscar_um(url) for url in urls))
+
+
+# --- Gravação ---
+
+CAMPOS_VISIVEIS = ('titulo', 'favicon', 'tipo_conteudo')
+
+
+def gravar_metadados(resultados, agora=None):
+    """
+    Grava os resultados de um lote e invalida o cache (ETags) dos donos dos links cuja
+    aparência mudou. Uma falha não apaga o título de uma busca anterior que deu certo.
+    """
+    agora = agora or timezone.now()
+    anteriores = {
+        m.url: m for m in MetadadosLink.objects.filter(url__in=[r.url for r in resultados])
+        .only('url', 'falhas', *CAMPOS_VISIVEIS)
+    }
+    sucessos, falhas, alterados = [], [], []
+    for resultado in resultados:
+        anterior = anteriores.get(resultado.url)
+        if resultado.erro:
+            seguidas = (anterior.falhas if anterior else 0) + 1
+            falhas.append(MetadadosLink(
+                url=resultado.url, status_http=resultado.status_http, tipo_conteudo=resultado.tipo_conteudo,
+                erro=resultado.erro[:300], falhas=seguidas, buscado_em=agora,
+                expira_em=agora + min(VALIDADE_FALHA * 2 ** (seguidas - 1), VALIDADE),
+            ))
+            continue
+        metadados = MetadadosLink(
+            url=resultado.url, titulo=resultado.titulo, favicon=resultado.favicon,
+            tipo_conteudo=resultado.tipo_conteudo, status_http=resultado.status_http, erro='', falhas=0,
+            buscado_em=agora, expira_em=agora + VALIDADE,
+        )
+        sucessos.append(metadados)
+        if anterior is None or any(getattr(anterior, c) != getattr(metadados, c) for c in CAMPOS_VISIVEIS):
+            alterados.append(resultado.url)
+
+    with transaction.atomic():
+        if sucessos:
+            MetadadosLink.objects.bulk_create(
+                sucessos, update_conflicts=True, unique_fields=['url'],
+                update_fields=[*CAMPOS_VISIVEIS, 'status_http', 'erro', 'falhas', 'buscado_em', 'expira_em'],
+            )
+        if falhas:
+            MetadadosLink.objects.bulk_create(
+                falhas, update_conflicts=True, unique_fields=['url'],
+                update_fields=['status_http', 'erro', 'falhas', 'buscado_em', 'expira_em'],
+            )
+        if alterados:
+            for usuario_id in usuarios_dos_links(alterados):
+                invalidar_usuario(usuario_id)
+    return len(sucessos), len(falhas)
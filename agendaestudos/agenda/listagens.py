@@ -0,0 +1,98 @@
+# Em agenda/listagens.py
+
+from django.db.models import Count, Prefetch
+
+from .forms import TarefaLoteForm
+from .models import Materia, Tarefa, Prova, MaterialDeApoio
+
+# Consultas e contexto das páginas de listagem, compartilhados por views.py e views_async.py:
+# as duas versões de cada página só diferem em como avaliam os querysets (paginar_por_chave x
+# apaginar_por_chave, anexar_metadados x aanexar_metadados).
+
+
+def materias_do_usuario(usuario):
+    return Materia.objects.filter(usuario=usuario).order_by('nome')
+
+
+def anotar_percentual_concluido(materias):
+    for materia in materias:
+        if materia.total_tarefas > 0:
+            materia.percentual_concluido = round((materia.tarefas_concluidas / materia.total_tarefas) * 100)
+        else:
+            materia.percentual_concluido = 0
+    return materias
+
+
+def materias_do_filtro(usuario):
+    """Matérias do <select> de filtro das listas."""
+    return Materia.objects.filter(usuario=usuario).only('nome', 'nomenclatura')
+
+
+def materia_escolhida(parametros):
+    """Id da matéria escolhida no filtro (?materia=), ou None."""
+    return int(parametros['materia']) if parametros.get('materia') else None
+
+
+# --- Tarefas ---
+
+def filtros_tarefas(parametros):
+    return {
+        'materia': materia_escolhida(parametros),
+        'status': parametros.get('status'),
+        'prioridade': parametros.get('prioridade'),
+    }
+
+
+def tarefas_filtradas(usuario, filtros):
+    tarefas = Tarefa.objects.filter(materia__usuario=usuario).para_lista()
+    if filtros['materia']:
+        tarefas = tarefas.filter(materia__id=filtros['materia'])
+    if filtros['status']:
+        tarefas = tarefas.filter(status=filtros['status'])
+    if filtros['prioridade']:
+        tarefas = tarefas.filter(prioridade=filtros['prioridade'])
+    return tarefas
+
+
+def contexto_tarefas(usuario, pagina, materias, filtros):
+    return {
+        'tarefas': pagina,
+        'pagina': pagina,
+        'form_lote': TarefaLoteForm(user=usuario),
+        'all_materias': materias,
+        'status_choices': Tarefa.STATUS_CHOICES,
+        'prioridade_choices': Tarefa.PRIORIDADE_CHOICES,
+        'current_filters': filtros,
+    }
+
+
+# --- Provas e materiais ---
+
+def provas_filtradas(usuario, materia_id):
+    # Matéria via JOIN e materiais em uma única consulta extra (sem N+1 no template)
+    provas = Prova.objects.filter(materia__usuario=usuario).para_lista().prefetch_related(
+        Prefetch('materiais', queryset=MaterialDeApoio.objects.order_by('pk'))
+    ).annotate(total_materiais=Count('materiais')).order_by('data_prova')
+    if materia_id:
+        provas = provas.filter(materia__id=materia_id)
+    return provas
+
+
+def links_das_provas(pagina):
+    """Provas e materiais da página, para anexar os metadados dos links numa consulta só."""
+    return [*pagina, *(material for prova in pagina for material in prova.materiais.all())]
+
+
+def contexto_provas(pagina, materias, materia_id):
+    return {
+        'provas': pagina,
+        'pagina': pagina,
+        'all_materias': materias,
+        'current_materia': materia_id,
+    }
+
+
+def materiais_da_prova(usuario, prova_pk):
+    # Já filtra pelo dono: pode ser consultado junto com a prova
+    # Miniaturas já geradas pelo run_workers vêm na mesma consulta; nada é processado aqui
+    return MaterialDeApoio.objects.filter(prova_id=prova_pk, prova__materia__usuario=usuario).com_conteudo()
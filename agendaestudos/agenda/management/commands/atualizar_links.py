@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from agenda.links import (
+    CONCORRENCIA, TEMPO_LIMITE, apagar_orfaos, buscar_todos, gravar_metadados, links_pendentes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Busca título, ícone e tipo de conteúdo dos links cadastrados (materiais, tarefas, provas, '
+        'plano de ensino) que ainda não têm metadados ou cujos metadados venceram. As requisições '
+        'de cada lote rodam em paralelo (asyncio); o banco só é usado entre um lote e outro.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA,
+                            help='Conexões abertas ao mesmo tempo.')
+        parser.add_argument('--tempo-limite', type=float, default=TEMPO_LIMITE,
+                            help='Segundos por link (conexão, redirecionamentos e leitura).')
+        parser.add_argument('--lote', type=int, default=200, help='Links por lote.')
+        parser.add_argument('--intervalo', type=float, default=60.0,
+                            help='Segundos entre consultas quando não há links pendentes.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Processa os links pendentes agora e termina (cron, testes).')
+
+    def handle(self, *args, **opcoes):
+        total_ok = total_falhas = 0
+        try:
+            while True:
+                close_old_connections()
+                urls = links_pendentes(opcoes['lote'])
+                if not urls:
+                    apagar_orfaos()
+                    if opcoes['uma_vez']:
+                        break
+                    time.sleep(opcoes['intervalo'])
+                    continue
+                resultados = asyncio.run(buscar_todos(
+                    urls, concorrencia=max(1, opcoes['concorrencia']), tempo_limite=opcoes['tempo_limite'],
+                ))
+                for resultado in resultados:
+                    if resultado.erro:
+                        self.stderr.write(f'falha  {resultado.url}: {resultado.erro}')
+                ok, falhas = gravar_metadados(resultados)
+                total_ok += ok
+                total_falhas += falhas
+        except KeyboardInterrupt:
+            self.stdout.write('Interrompido.')
+
+        self.stdout.write(f'{total_ok} link(s) atualizado(s), {total_falhas} falha(s).')
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from agenda.benchmark import percentis
+from agenda.models import Prova
+
+# (rota síncrona, rota assíncrona) das páginas de leitura
+ROTAS_COMPARADAS = [
+    ('home', 'home_async'),
+    ('agenda', 'agenda_async'),
+    ('materia_list', 'materia_list_async'),
+    ('tarefa_list', 'tarefa_list_async'),
+    ('prova_list', 'prova_list_async'),
+    ('material_list', 'material_list_async'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara vazão e latência das páginas de leitura sob carga concorrente: views síncronas '
+        'pelo handler WSGI (um thread por requisição) e views assíncronas pelo handler ASGI '
+        '(um event loop). Roda em processo, pelos clients de teste, sem o servidor HTTP.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', default='bench-0', help='Usuário criado por seed_benchmark_data.')
+        parser.add_argument('--concorrencia', type=int, default=16, help='Requisições simultâneas.')
+        parser.add_argument('--requisicoes', type=int, default=200, help='Requisições por rota e modo.')
+        parser.add_argument('--host', default='localhost', help='Precisa estar em ALLOWED_HOSTS.')
+        parser.add_argument('--sem-cache', action='store_true', help='Limpa o cache antes de cada rota.')
+        parser.add_argument('--saida', help='Grava o resultado em JSON neste arquivo.')
+
+    def handle(self, *args, **opcoes):
+        try:
+            usuario = User.objects.get(username=opcoes['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {opcoes['usuario']} não existe; rode seed_benchmark_data antes.")
+        prova = Prova.objects.filter(materia__usuario=usuario).first()
+        if prova is None:
+            raise CommandError('O usuário precisa ter ao menos uma prova.')
+
+        # Uma sessão só, compartilhada pelos clients dos dois modos
+        client = Client(SERVER_NAME=opcoes['host'])
+        client.force_login(usuario)
+        self.sessao = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.host = opcoes['host']
+
+        resultados = {}
+        for rota_wsgi, rota_asgi in ROTAS_COMPARADAS:
+            kwargs = {'prova_pk': prova.pk} if rota_wsgi == 'material_list' else {}
+            resultados[rota_wsgi] = {}
+            for modo, rota, medir in (('wsgi', rota_wsgi, self.medir_wsgi), ('asgi', rota_asgi, self.medir_asgi)):
+                if opcoes['sem_cache']:
+                    cache.clear()
+                url = reverse(rota, kwargs=kwargs)
+                tempos, duracao, status = medir(url, opcoes['requisicoes'], opcoes['concorrencia'])
+                if status != {200}:
+                    raise CommandError(f'{url} respondeu {sorted(status)} no modo {modo}.')
+                resultados[rota_wsgi][modo] = {
+                    'url': url,
+                    'vazao_rps': round(len(tempos) / duracao, 1),
+                    **percentis(tempos),
+                }
+            self.relatar(rota_wsgi, resultados[rota_wsgi])
+
+        if opcoes['saida']:
+            Path(opcoes['saida']).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+    # --- WSGI: views síncronas, uma thread por requisição em andamento ---
+
+    def medir_wsgi(self, url, total, concorrencia):
+        locais = threading.local()
+
+        def requisitar(_):
+            if not hasattr(locais, 'client'):
+                locais.client = Client(SERVER_NAME=self.host)
+                locais.client.cookies[settings.SESSION_COOKIE_NAME] = self.sessao
+            inicio = perf_counter()
+            resposta = locais.client.get(url)
+            return (perf_counter() - inicio) * 1000, resposta.status_code
+
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            list(executor.map(requisitar, range(concorrencia)))  # aquecimento: um client por thread
+            inicio = perf_counter()
+            medidas = list(executor.map(requisitar, range(total)))
+            duracao = perf_counter() - inicio
+        return [tempo for tempo, _ in medidas], duracao, {status for _, status in medidas}
+
+    # --- ASGI: views assíncronas, requisições concorrentes no mesmo event loop ---
+
+    def medir_asgi(self, url, total, concorrencia):
+        # O AsyncClient sempre envia Host: testserver (como nos testes, onde o runner o libera)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            return asyncio.run(self._medir_asgi(url, total, concorrencia))
+
+    async def _medir_asgi(self, url, total, concorrencia):
+        client = AsyncClient()
+        client.cookies[settings.SESSION_COOKIE_NAME] = self.sessao
+        limite = asyncio.Semaphore(concorrencia)
+
+        async def requisitar():
+            async with limite:
+                inicio = perf_counter()
+                resposta = await client.get(url)
+                return (perf_counter() - inicio) * 1000, resposta.status_code
+
+        await asyncio.gather(*(requisitar() for _ in range(concorrencia)))  # aquecimento
+        inicio = perf_counter()
+        medidas = await asyncio.gather(*(requisitar() for _ in range(total)))
+        duracao = perf_counter() - inicio
+        return [tempo for tempo, _ in medidas], duracao, {status for _, status in medidas}
+
+    def relatar(self, nome, modos):
+        for modo, dados in modos.items():
+            self.stdout.write(
+                f"{nome:<16} {modo}  {dados['vazao_rps']:>7} req/s  p50={dados['p50_ms']:>8}ms "
+                f"p95={dados['p95_ms']:>8}ms p99={dados['p99_ms']:>8}ms"
+            )
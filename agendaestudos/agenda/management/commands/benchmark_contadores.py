@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from agenda.benchmark import gerar_massa, cronometrar, resumo
+from agenda.contadores import anotar_contadores
+from agenda.models import Materia
+
+
+def contadores_com_join(materias):
+    # Forma antiga: vários Count() sobre JOINs, que multiplicam tarefas x provas x materiais
+    return materias.annotate(
+        total_tarefas=Count('tarefas'),
+        tarefas_concluidas=Count('tarefas', filter=Q(tarefas__status='C')),
+        total_provas=Count('provas'),
+        total_materiais=Count('provas__materiais'),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compara os contadores de Matéria via JOIN + Count com as subconsultas correlacionadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[50, 100, 200, 400],
+                            help='Quantidade de tarefas e de provas por matéria em cada rodada.')
+        parser.add_argument('--materias', type=int, default=2)
+        parser.add_argument('--materiais', type=int, default=2, help='Materiais por prova.')
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **opcoes):
+        self.stdout.write(f"{'n':>6} {'join (ms)':>12} {'subconsulta (ms)':>18} {'total_tarefas join/sub':>24}")
+        for n in opcoes['tamanhos']:
+            # Os dados sintéticos nunca ficam no banco: a transação é sempre desfeita
+            with transaction.atomic():
+                usuario = User.objects.create_user(username=f'benchmark-contadores-{n}')
+                gerar_massa(usuario, materias=opcoes['materias'], tarefas=n, provas=n,
+                            materiais=opcoes['materiais'])
+                materias = Materia.objects.filter(usuario=usuario).order_by('pk')
+
+                tempos_join = cronometrar(lambda: list(contadores_com_join(materias)), opcoes['repeticoes'])
+                tempos_sub = cronometrar(lambda: list(anotar_contadores(materias)), opcoes['repeticoes'])
+                total_join = contadores_com_join(materias)[0].total_tarefas
+                total_sub = anotar_contadores(materias)[0].total_tarefas
+
+                self.stdout.write(
+                    f"{n:>6} {resumo(tempos_join)['mediana_ms']:>12} {resumo(tempos_sub)['mediana_ms']:>18} "
+                    f"{f'{total_join}/{total_sub}':>24}"
+                )
+                transaction.set_rollback(True)
@@ -0,0 +1,157 @@
+import json
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from agenda.benchmark import percentis
+from agenda.models import Materia, Tarefa
+
+MANAGE = Path(__file__).resolve().parents[3] / 'manage.py'
+PERFIS = {
+    'padrao': 'agendaestudos.settings',
+    'producao': 'agendaestudos.settings_producao',
+}
+
+
+def banco_travado(erro):
+    return 'locked' in str(erro) or 'busy' in str(erro)
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga com escritores concorrentes no SQLite: vários processos gravam e leem '
+        'tarefas ao mesmo tempo num banco temporário, com cada perfil de settings, e contam os '
+        'erros "database is locked". Não toca no banco configurado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=8)
+        parser.add_argument('--operacoes', type=int, default=100, help='Escritas (e leituras) por processo.')
+        parser.add_argument('--perfil', choices=sorted(PERFIS), action='append',
+                            help='Perfil a medir (repetível). Padrão: todos.')
+        parser.add_argument('--saida', help='Grava o resultado em JSON neste arquivo.')
+        # Uso interno: cada processo de carga roda este mesmo comando
+        parser.add_argument('--trabalhador', type=int, help='(interno) índice do processo de carga.')
+        parser.add_argument('--pasta', help='(interno) pasta de sincronização.')
+
+    def handle(self, *args, **opcoes):
+        if opcoes['trabalhador'] is not None:
+            return self.trabalhar(opcoes['trabalhador'], opcoes['operacoes'], Path(opcoes['pasta']))
+
+        resultados = {}
+        for perfil in opcoes['perfil'] or sorted(PERFIS):
+            resultados[perfil] = self.medir_perfil(perfil, opcoes['processos'], opcoes['operacoes'])
+            dados = resultados[perfil]
+            self.stdout.write(
+                f"{perfil:<9} {dados['concluidas']:>6} ok  {dados['travadas']:>5} \"database is locked\"  "
+                f"{dados['vazao_ops']:>7} op/s  p50={dados['p50_ms']}ms p95={dados['p95_ms']}ms p99={dados['p99_ms']}ms"
+            )
+
+        if opcoes['saida']:
+            Path(opcoes['saida']).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        if resultados.get('producao', {}).get('travadas'):
+            raise CommandError('O perfil de produção ainda teve erros "database is locked".')
+
+    # --- Coordenação ---
+
+    def medir_perfil(self, perfil, processos, operacoes):
+        with tempfile.TemporaryDirectory() as pasta:
+            pasta = Path(pasta)
+            ambiente = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': PERFIS[perfil],
+                'AGENDA_DB_PATH': str(pasta / 'carga.sqlite3'),
+                'AGENDA_CACHE': 'arquivo',
+                'AGENDA_CACHE_DIR': str(pasta / 'cache'),
+                'DJANGO_SECRET_KEY': os.environ.get('DJANGO_SECRET_KEY') or secrets.token_urlsafe(50),
+            }
+            subprocess.run([sys.executable, str(MANAGE), 'migrate', '--verbosity', '0'], env=ambiente, check=True)
+
+            trabalhadores = [
+                subprocess.Popen(
+                    [sys.executable, str(MANAGE), 'benchmark_escritas', '--trabalhador', str(indice),
+                     '--operacoes', str(operacoes), '--pasta', str(pasta)],
+                    env=ambiente, stdout=subprocess.PIPE, text=True,
+                )
+                for indice in range(processos)
+            ]
+            # Todos começam juntos, depois de subir o Django e criar o próprio usuário
+            while len(list(pasta.glob('pronto-*'))) < processos:
+                if any(processo.poll() not in (None, 0) for processo in trabalhadores):
+                    raise CommandError(f'Um processo de carga falhou ao iniciar (perfil {perfil}).')
+                time.sleep(0.01)
+            inicio = perf_counter()
+            (pasta / 'iniciar').touch()
+            saidas = [json.loads(processo.communicate()[0].strip().splitlines()[-1]) for processo in trabalhadores]
+            duracao = perf_counter() - inicio
+
+        tempos = [tempo for saida in saidas for tempo in saida['tempos']]
+        return {
+            'processos': processos,
+            'concluidas': len(tempos),
+            'travadas': sum(saida['travadas'] for saida in saidas),
+            'vazao_ops': round(len(tempos) / duracao, 1),
+            **percentis(tempos),
+        }
+
+    # --- Processo de carga ---
+
+    def trabalhar(self, indice, operacoes, pasta):
+        materia = self.com_retentativas(lambda: self.preparar(indice))
+        (pasta / f'pronto-{indice}').touch()
+        while not (pasta / 'iniciar').exists():
+            time.sleep(0.005)
+
+        tempos, travadas = [], 0
+        for numero in range(operacoes):
+            for operacao in (self.escrever, self.ler):
+                inicio = perf_counter()
+                try:
+                    operacao(materia, numero)
+                except OperationalError as erro:
+                    if not banco_travado(erro):
+                        raise
+                    travadas += 1
+                else:
+                    tempos.append((perf_counter() - inicio) * 1000)
+        connection.close()
+        self.stdout.write(json.dumps({'tempos': tempos, 'travadas': travadas}))
+
+    def preparar(self, indice):
+        usuario = User.objects.create_user(username=f'carga-{indice}')
+        return Materia.objects.create(usuario=usuario, nome=f'Carga {indice}')
+
+    def com_retentativas(self, funcao, tentativas=50):
+        for _ in range(tentativas - 1):
+            try:
+                return funcao()
+            except OperationalError as erro:
+                if not banco_travado(erro):
+                    raise
+                time.sleep(0.05)
+        return funcao()
+
+    def escrever(self, materia, numero):
+        # Como um formulário: lê para validar e grava na mesma transação (signals atualizam
+        # MateriaStats, a marca d'água e o índice de busca)
+        agora = timezone.now()
+        with transaction.atomic():
+            Tarefa.objects.filter(materia=materia, titulo=f'Carga {numero}').exists()
+            Tarefa.objects.create(
+                materia=materia, titulo=f'Carga {numero}',
+                data_inicio=agora, data_fim=agora + timedelta(days=1),
+            )
+
+    def ler(self, materia, numero):
+        list(Tarefa.objects.select_related('materia').order_by('-pk')[:200])
@@ -0,0 +1,73 @@
+import gc
+import json
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from agenda.benchmark import cronometrar, gerar_massa, resumo
+from agenda.models import CAMPOS_MATERIA_RESUMO, Tarefa, TarefaQuerySet
+
+
+def medir_memoria(funcao):
+    """(pico em KiB durante a chamada, KiB ainda retidos pelo resultado)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = funcao()
+        retido, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del resultado
+    return round(pico / 1024, 1), round(retido / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a memória Python (tracemalloc) para carregar as tarefas de um usuário como a '
+        'listagem fazia (instâncias completas), com a projeção de Tarefa.objects.para_lista() '
+        'e com values(). Os dados sintéticos ficam numa transação desfeita no final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarefas', type=int, default=10000, help='Total de tarefas do usuário.')
+        parser.add_argument('--materias', type=int, default=10)
+        parser.add_argument('--texto', type=int, default=2000,
+                            help='Caracteres de descrição da tarefa e das anotações da matéria.')
+        parser.add_argument('--repeticoes', type=int, default=3)
+        parser.add_argument('--saida', help='Grava o resultado em JSON neste arquivo.')
+
+    def handle(self, *args, **opcoes):
+        por_materia = max(1, opcoes['tarefas'] // opcoes['materias'])
+        with transaction.atomic():
+            usuario = User.objects.create_user(username='benchmark-memoria')
+            gerar_massa(usuario, materias=opcoes['materias'], tarefas=por_materia, provas=0,
+                        materiais=0, texto=opcoes['texto'])
+            tarefas = Tarefa.objects.filter(materia__usuario=usuario).order_by('data_inicio', 'pk')
+
+            formas = {
+                'completa': lambda: list(tarefas.select_related('materia')),
+                'para_lista': lambda: list(tarefas.para_lista()),
+                'values': lambda: list(tarefas.values(
+                    'pk', *TarefaQuerySet.CAMPOS_LISTA, *CAMPOS_MATERIA_RESUMO[1:],
+                )),
+            }
+            resultados = {}
+            for nome, funcao in formas.items():
+                # O tempo é medido sem o tracemalloc, que deixa cada alocação bem mais lenta
+                tempos = cronometrar(funcao, opcoes['repeticoes'])
+                pico, retido = medir_memoria(funcao)
+                resultados[nome] = {'pico_kib': pico, 'retido_kib': retido, 'tempo_ms': resumo(tempos)['mediana_ms']}
+            transaction.set_rollback(True)
+
+        total = por_materia * opcoes['materias']
+        self.stdout.write(f"{total} tarefas, {opcoes['texto']} caracteres de texto por linha")
+        self.stdout.write(f"{'forma':<12} {'pico (KiB)':>12} {'retido (KiB)':>14} {'tempo (ms)':>12}")
+        for nome, dados in resultados.items():
+            self.stdout.write(
+                f"{nome:<12} {dados['pico_kib']:>12} {dados['retido_kib']:>14} {dados['tempo_ms']:>12}"
+            )
+        if opcoes['saida']:
+            Path(opcoes['saida']).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
@@ -0,0 +1,140 @@
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from agenda import urls as agenda_urls
+from agenda.benchmark import cronometrar, percentis
+from agenda.instrumentacao import contar_consultas
+from agenda.models import Materia, Tarefa, Prova, MaterialDeApoio
+
+BASELINE_PADRAO = Path(__file__).resolve().parents[2] / 'benchmark_baseline.json'
+
+# Rotas que alteram dados num GET (ou encerram a sessão) ficam de fora, assim como o download
+# de arquivo e a miniatura (os materiais sintéticos são links, e as rotas responderiam 404)
+ROTAS_IGNORADAS = {'logout', 'tarefa_concluir', 'material_arquivo', 'material_miniatura'}
+
+
+def argumentos_da_rota(nome, padrao, objetos):
+    """Escolhe os kwargs da URL a partir dos objetos do usuário do benchmark."""
+    kwargs = {}
+    for argumento in padrao.pattern.converters:
+        if argumento == 'prova_pk':
+            kwargs[argumento] = objetos['prova'].pk
+        elif nome.startswith('material_'):
+            kwargs[argumento] = objetos['material'].pk
+        elif nome.startswith('materia_'):
+            kwargs[argumento] = objetos['materia'].pk
+        elif nome.startswith('prova_'):
+            kwargs[argumento] = objetos['prova'].pk
+        elif nome.startswith('tarefa_'):
+            kwargs[argumento] = objetos['tarefa'].pk
+        else:
+            return None
+    return kwargs
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência (p50/p95/p99) e número de consultas de cada URL de agenda/urls.py '
+        'pelo test client e compara com o baseline versionado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', default='bench-0', help='Usuário criado por seed_benchmark_data.')
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--host', default='localhost', help='Precisa estar em ALLOWED_HOSTS.')
+        parser.add_argument('--sem-cache', action='store_true', help='Limpa o cache antes de cada requisição.')
+        parser.add_argument('--saida', help='Grava o resultado em JSON neste arquivo.')
+        parser.add_argument('--baseline', default=str(BASELINE_PADRAO))
+        parser.add_argument('--tolerancia', type=float, default=0.5,
+                            help='Aumento relativo de p95 aceito antes de acusar regressão (0.5 = +50%%).')
+        parser.add_argument('--atualizar-baseline', action='store_true')
+
+    def handle(self, *args, **opcoes):
+        try:
+            usuario = User.objects.get(username=opcoes['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {opcoes['usuario']} não existe; rode seed_benchmark_data antes.")
+
+        objetos = {
+            'materia': Materia.objects.filter(usuario=usuario).first(),
+            'tarefa': Tarefa.objects.filter(materia__usuario=usuario).first(),
+            'prova': Prova.objects.filter(materia__usuario=usuario).first(),
+            'material': MaterialDeApoio.objects.filter(prova__materia__usuario=usuario).first(),
+        }
+        if None in objetos.values():
+            raise CommandError('O usuário precisa ter ao menos uma matéria, tarefa, prova e material.')
+
+        client = Client(SERVER_NAME=opcoes['host'])
+        client.force_login(usuario)
+
+        resultados = {}
+        for padrao in agenda_urls.urlpatterns:
+            if not isinstance(padrao, URLPattern) or not padrao.name or padrao.name in ROTAS_IGNORADAS:
+                continue
+            kwargs = argumentos_da_rota(padrao.name, padrao, objetos)
+            if kwargs is None:
+                continue
+            url = reverse(padrao.name, kwargs=kwargs)
+
+            consultas = []
+            status = []
+
+            def requisitar():
+                if opcoes['sem_cache']:
+                    cache.clear()
+                with contar_consultas() as contador:
+                    resposta = client.get(url)
+                    if resposta.streaming:
+                        b''.join(resposta.streaming_content)
+                consultas.append(contador.total)
+                status.append(resposta.status_code)
+
+            requisitar()  # aquecimento (compilação de templates, caches frios)
+            consultas.clear()
+            status.clear()
+            tempos = cronometrar(requisitar, opcoes['repeticoes'])
+            resultados[padrao.name] = {
+                'url': url,
+                'status': max(set(status), key=status.count),
+                **percentis(tempos),
+                'consultas': max(consultas),
+            }
+            self.stdout.write(
+                f"{padrao.name:<24} p50={resultados[padrao.name]['p50_ms']:>8}ms "
+                f"p95={resultados[padrao.name]['p95_ms']:>8}ms consultas={max(consultas)}"
+            )
+
+        if opcoes['saida']:
+            Path(opcoes['saida']).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+        caminho_baseline = Path(opcoes['baseline'])
+        if opcoes['atualizar_baseline']:
+            caminho_baseline.write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline gravado em {caminho_baseline}.'))
+            return
+        if not caminho_baseline.exists():
+            self.stdout.write(self.style.WARNING('Sem baseline para comparar (use --atualizar-baseline).'))
+            return
+
+        regressoes = self.comparar(json.loads(caminho_baseline.read_text()), resultados, opcoes['tolerancia'])
+        if regressoes:
+            raise CommandError('Regressões em relação ao baseline:\n' + '\n'.join(regressoes))
+        self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação ao baseline.'))
+
+    def comparar(self, baseline, resultados, tolerancia):
+        regressoes = []
+        for nome, atual in resultados.items():
+            anterior = baseline.get(nome)
+            if anterior is None:
+                continue
+            if atual['consultas'] > anterior['consultas']:
+                regressoes.append(f"{nome}: {anterior['consultas']} -> {atual['consultas']} consultas")
+            if atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+                regressoes.append(f"{nome}: p95 {anterior['p95_ms']}ms -> {atual['p95_ms']}ms")
+        return regressoes
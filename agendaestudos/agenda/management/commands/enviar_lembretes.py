@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from agenda.lembretes import (
+    agendar_lembretes, antecedencias_configuradas, descrever_antecedencia, enviar_pendentes, ler_antecedencia,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Agenda e envia por e-mail os lembretes de prazos de tarefas e de provas, com as '
+        'antecedências configuradas (padrão: 24h e 1h antes). Roda em laço; cada ciclo varre só '
+        'o intervalo de tempo novo desde o ciclo anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antecedencias',
+                            help='Antecedências separadas por vírgula, ex: 24h,1h,30m '
+                                 '(padrão: AGENDA_LEMBRETES_ANTECEDENCIAS).')
+        parser.add_argument('--intervalo', type=float, default=60.0, help='Segundos entre ciclos.')
+        parser.add_argument('--lote', type=int, default=500, help='Lembretes enviados por ciclo, no máximo.')
+        parser.add_argument('--uma-vez', action='store_true', help='Roda um ciclo e termina (cron, testes).')
+
+    def handle(self, *args, **opcoes):
+        try:
+            antecedencias = tuple(
+                ler_antecedencia(texto) for texto in opcoes['antecedencias'].split(',')
+            ) if opcoes['antecedencias'] else antecedencias_configuradas()
+        except ValueError as erro:
+            raise CommandError(erro)
+        self.stdout.write('Antecedências: ' + ', '.join(map(descrever_antecedencia, antecedencias)))
+
+        try:
+            while True:
+                close_old_connections()
+                agora = timezone.now()
+                agendar_lembretes(agora, antecedencias)
+                enviados, descartados, falhas = enviar_pendentes(agora, opcoes['lote'])
+                if enviados or descartados or falhas:
+                    self.stdout.write(
+                        f'{enviados} lembrete(s) enviado(s), {descartados} descartado(s), {falhas} falha(s).'
+                    )
+                if opcoes['uma_vez']:
+                    break
+                time.sleep(opcoes['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Interrompido.')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from agenda.contadores import recalcular_materia_stats
+from agenda.models import Materia
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela MateriaStats a partir das tarefas, provas e materiais (corrige divergências).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Recalcula apenas as matérias deste username.')
+
+    def handle(self, *args, **opcoes):
+        materias = None
+        if opcoes['usuario']:
+            materias = Materia.objects.filter(usuario__username=opcoes['usuario']).values('pk')
+        total = recalcular_materia_stats(materias)
+        self.stdout.write(self.style.SUCCESS(f'{total} linha(s) de MateriaStats recalculada(s).'))
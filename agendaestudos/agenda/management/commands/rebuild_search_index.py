@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from agenda.busca import TABELA_BUSCA, fts_disponivel, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca (FTS5) a partir de matérias, tarefas, provas e materiais.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Reindexa apenas os dados deste username.')
+
+    def handle(self, *args, **opcoes):
+        if not fts_disponivel():
+            raise CommandError('Índice FTS5 indisponível neste banco; a busca usa o fallback com icontains.')
+
+        usuario_id = None
+        if opcoes['usuario']:
+            usuario_id = User.objects.filter(username=opcoes['usuario']).values_list('pk', flat=True).first()
+            if usuario_id is None:
+                raise CommandError(f"Usuário {opcoes['usuario']} não existe.")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            reconstruir_indice(cursor, usuario_id)
+            cursor.execute(f"INSERT INTO {TABELA_BUSCA} ({TABELA_BUSCA}) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS('Índice de busca reconstruído.'))
@@ -0,0 +1,100 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from agenda.pdf import pdftoppm_disponivel
+from agenda.trabalhos import TIPOS, concluir, falhar, reservar
+
+
+class Command(BaseCommand):
+    help = (
+        'Consome a fila de trabalhos de fundo (tabela Trabalho): extrai texto e miniatura dos PDFs '
+        'enviados como material. A parte pesada roda num pool de processos; o banco só é usado '
+        'por este processo. Pode haver mais de um run_workers ao mesmo tempo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Processos do pool (trabalhos executando em paralelo).')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre consultas à fila quando ela está vazia.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Processa o que está disponível agora e termina (cron, testes).')
+
+    def handle(self, *args, **opcoes):
+        self.processos = max(1, opcoes['processos'])
+        self.contagem = {'concluidos': 0, 'falhas': 0}
+        if not pdftoppm_disponivel():
+            self.stderr.write(
+                'Aviso: pdftoppm (poppler-utils) não encontrado no PATH; os PDFs terão texto '
+                'extraído, mas nenhuma miniatura.'
+            )
+        pool = ProcessPoolExecutor(max_workers=self.processos)
+        em_andamento = {}
+        try:
+            while True:
+                close_old_connections()
+                for trabalho in reservar(self.processos - len(em_andamento)):
+                    em_andamento[self.submeter(pool, trabalho)] = trabalho
+
+                if not em_andamento:
+                    if opcoes['uma_vez']:
+                        break
+                    time.sleep(opcoes['intervalo'])
+                    continue
+
+                feitos, _ = wait(em_andamento, timeout=opcoes['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in feitos:
+                    if self.finalizar(em_andamento.pop(futuro), futuro):
+                        # Um processo do pool morreu (ex: falta de memória num PDF enorme): os
+                        # trabalhos em andamento voltam para a fila e o pool é recriado
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        for outro in em_andamento.values():
+                            self.registrar_falha(outro, BrokenProcessPool('Pool reiniciado.'))
+                        em_andamento.clear()
+                        pool = ProcessPoolExecutor(max_workers=self.processos)
+                        break
+        except KeyboardInterrupt:
+            # Os que estavam executando são retomados por outro worker depois do TEMPO_LIMITE
+            self.stdout.write('Interrompido.')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        self.stdout.write(
+            f"{self.contagem['concluidos']} trabalho(s) concluído(s), {self.contagem['falhas']} falha(s)."
+        )
+
+    def submeter(self, pool, trabalho):
+        try:
+            tipo = TIPOS[trabalho.tipo]
+            return pool.submit(tipo.executar, *tipo.argumentos(trabalho.chave))
+        except Exception as erro:
+            # Falha antes de chegar ao pool (tipo desconhecido, arquivo sumiu...): segue o mesmo caminho
+            futuro = Future()
+            futuro.set_exception(erro)
+            return futuro
+
+    def finalizar(self, trabalho, futuro):
+        """Grava o resultado ou a falha; devolve True se o pool quebrou."""
+        try:
+            resultado = futuro.result()
+            TIPOS[trabalho.tipo].gravar(trabalho.chave, resultado)
+        except BrokenProcessPool as erro:
+            self.registrar_falha(trabalho, erro)
+            return True
+        except Exception as erro:
+            self.registrar_falha(trabalho, erro)
+        else:
+            concluir(trabalho)
+            self.contagem['concluidos'] += 1
+            self.stdout.write(f'ok     {trabalho.tipo} {trabalho.chave[:16]}')
+        return False
+
+    def registrar_falha(self, trabalho, erro):
+        falhar(trabalho, erro)
+        self.contagem['falhas'] += 1
+        self.stderr.write(f'falha  {trabalho.tipo} {trabalho.chave[:16]} (tentativa {trabalho.tentativas}): {erro}')
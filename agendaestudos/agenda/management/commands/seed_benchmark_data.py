@@ -0,0 +1,56 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from agenda.benchmark import gerar_massa
+from agenda.cache import invalidar_usuario
+from agenda.contadores import recalcular_materia_stats
+from agenda.models import Materia
+
+
+class Command(BaseCommand):
+    help = 'Cria usuários sintéticos (bench-0, bench-1, ...) com matérias, tarefas, provas, materiais e horários.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=3)
+        parser.add_argument('--materias', type=int, default=6, help='Matérias por usuário.')
+        parser.add_argument('--tarefas', type=int, default=100, help='Tarefas por matéria.')
+        parser.add_argument('--provas', type=int, default=10, help='Provas por matéria.')
+        parser.add_argument('--materiais', type=int, default=3, help='Materiais por prova.')
+        parser.add_argument('--horarios', type=int, default=2, help='Horários de aula por matéria.')
+        parser.add_argument('--texto', type=int, default=0,
+                            help='Caracteres de descrição/observações/anotações (0 = vazios).')
+        parser.add_argument('--prefixo', default='bench')
+        parser.add_argument('--senha', default='benchmark')
+        parser.add_argument('--limpar', action='store_true', help='Remove antes os usuários com o mesmo prefixo.')
+
+    @transaction.atomic
+    def handle(self, *args, **opcoes):
+        prefixo = opcoes['prefixo']
+        if opcoes['limpar']:
+            removidos, _ = User.objects.filter(username__startswith=f'{prefixo}-').delete()
+            self.stdout.write(f'{removidos} objeto(s) removido(s).')
+
+        # Um único hash para todos: make_password é lento de propósito
+        senha = make_password(opcoes['senha'])
+        usuarios = User.objects.bulk_create([
+            User(username=f'{prefixo}-{i}', password=senha) for i in range(opcoes['usuarios'])
+        ])
+        for usuario in usuarios:
+            gerar_massa(
+                usuario,
+                materias=opcoes['materias'],
+                tarefas=opcoes['tarefas'],
+                provas=opcoes['provas'],
+                materiais=opcoes['materiais'],
+                horarios=opcoes['horarios'],
+                texto=opcoes['texto'],
+            )
+            invalidar_usuario(usuario.pk)
+
+        # bulk_create não dispara os signals: as estatísticas são montadas de uma vez
+        recalcular_materia_stats(Materia.objects.filter(usuario__in=usuarios).values('pk'))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(usuarios)} usuário(s) '{prefixo}-N' criados (senha: {opcoes['senha']})."
+        ))
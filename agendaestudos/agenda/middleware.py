@@ -0,0 +1,95 @@
+# Em agenda/middleware.py
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .instrumentacao import MedicaoRequisicao, instalar_medicao_consultas, medindo, resumo_rotas
+from .tempo import agora_fixo
+
+
+class AgoraRequisicaoMiddleware:
+    """
+    Fixa o "agora" da requisição (agenda.tempo.agora) antes da view: prazos, tempo restante
+    e filtros de template usam o mesmo instante em todas as linhas da página.
+    Funciona nas views síncronas e nas assíncronas sem adaptação.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self._acall(request)
+        with agora_fixo():
+            return self.get_response(request)
+
+    async def _acall(self, request):
+        with agora_fixo():
+            return await self.get_response(request)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição (consultas SQL, tempo de SQL, consultas duplicadas, tempo de
+    template e tempo total da view), devolve os números no cabeçalho Server-Timing e
+    acumula percentis por nome de URL em agenda.instrumentacao.resumo_rotas.
+    Desligado por padrão: ative com AGENDA_INSTRUMENTACAO = True.
+    Funciona nas views síncronas e nas assíncronas, como o AgoraRequisicaoMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'AGENDA_INSTRUMENTACAO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+        # Conexões abertas daqui em diante (também as das threads do sync_to_async) e as já abertas
+        connection_created.connect(instalar_medicao_consultas, dispatch_uid='agenda_instrumentacao')
+        for conexao in connections.all(initialized_only=True):
+            instalar_medicao_consultas(conexao)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self._acall(request)
+        inicio = time.perf_counter()
+        with medindo(MedicaoRequisicao()) as medicao:
+            response = self.get_response(request)
+        return self.registrar(request, response, medicao, inicio)
+
+    async def _acall(self, request):
+        inicio = time.perf_counter()
+        with medindo(MedicaoRequisicao()) as medicao:
+            response = await self.get_response(request)
+        return self.registrar(request, response, medicao, inicio)
+
+    def registrar(self, request, response, medicao, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        sql_ms = medicao.tempo_sql * 1000
+        template_ms = medicao.tempo_template * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={sql_ms:.2f};desc="{medicao.consultas} consultas"',
+            f'dup;desc="{medicao.duplicadas} duplicadas"',
+            f'tpl;dur={template_ms:.2f};desc="template"',
+            f'view;dur={total_ms:.2f};desc="view"',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            resumo_rotas.registrar(
+                match.url_name, total_ms, sql_ms, template_ms, medicao.consultas, medicao.duplicadas
+            )
+        return response
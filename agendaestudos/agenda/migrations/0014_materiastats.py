@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def popular_stats(apps, schema_editor):
+    Materia = apps.get_model('agenda', 'Materia')
+    Tarefa = apps.get_model('agenda', 'Tarefa')
+    Prova = apps.get_model('agenda', 'Prova')
+    MaterialDeApoio = apps.get_model('agenda', 'MaterialDeApoio')
+    MateriaStats = apps.get_model('agenda', 'MateriaStats')
+
+    def por_materia(queryset, campo):
+        return dict(queryset.order_by().values_list(campo).annotate(total=Count('pk')))
+
+    total_tarefas = por_materia(Tarefa.objects.all(), 'materia')
+    concluidas = por_materia(Tarefa.objects.filter(status='C'), 'materia')
+    total_provas = por_materia(Prova.objects.all(), 'materia')
+    total_materiais = por_materia(MaterialDeApoio.objects.all(), 'prova__materia')
+
+    MateriaStats.objects.bulk_create([
+        MateriaStats(
+            materia_id=pk,
+            total_tarefas=total_tarefas.get(pk, 0),
+            tarefas_concluidas=concluidas.get(pk, 0),
+            total_provas=total_provas.get(pk, 0),
+            total_materiais=total_materiais.get(pk, 0),
+        )
+        for pk in Materia.objects.values_list('pk', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0013_materia_link_plano_ensino'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MateriaStats',
+            fields=[
+                ('materia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='agenda.materia')),
+                ('total_tarefas', models.PositiveIntegerField(default=0)),
+                ('tarefas_concluidas', models.PositiveIntegerField(default=0)),
+                ('total_provas', models.PositiveIntegerField(default=0)),
+                ('total_materiais', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Estatísticas das Matérias',
+            },
+        ),
+        migrations.RunPython(popular_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0014_materiastats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='horarioaula',
+            index=models.Index(fields=['materia', 'dia_semana', 'hora_inicio'], name='horario_materia_dia_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materia',
+            index=models.Index(fields=['usuario', 'nome'], name='materia_usuario_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prova',
+            index=models.Index(fields=['materia', 'data_prova'], name='prova_materia_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['materia', 'data_inicio'], name='tarefa_materia_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['materia', 'status', 'data_fim'], name='tarefa_materia_status_fim_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['materia', 'prioridade', 'status'], name='tarefa_materia_prior_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:36
+
+import agenda.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0015_indices_acesso_usuario'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAlteracao',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='marca_alteracao', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('alterado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Marcas de Alteração',
+            },
+        ),
+        migrations.CreateModel(
+            name='TokenCalendario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_calendario', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('token', models.CharField(default=agenda.models.gerar_token_calendario, max_length=64, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Tokens de Calendário',
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:40
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# SQL congelado como era nesta migration (não importa agenda.busca: mudanças nas tabelas ou
+# no formato dos documentos ali não podem quebrar um `migrate` do zero). O texto extraído dos
+# arquivos dos materiais (agenda_conteudoarquivo) só passa a existir na 0021.
+TABELA_BUSCA = 'agenda_busca'
+
+SQL_CRIAR = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        dono, titulo, conteudo, tipo UNINDEXED, objeto_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+"""
+
+DOCUMENTOS = [
+    """
+        SELECT m.id * 4 + 0, 'u' || m.usuario_id, m.nome,
+               COALESCE(m.nomenclatura, '') || ' ' || COALESCE(m.notas_materia, ''), 'materia', m.id
+        FROM agenda_materia m
+    """,
+    """
+        SELECT t.id * 4 + 1, 'u' || m.usuario_id, t.titulo, COALESCE(t.descricao, ''), 'tarefa', t.id
+        FROM agenda_tarefa t JOIN agenda_materia m ON m.id = t.materia_id
+    """,
+    """
+        SELECT p.id * 4 + 2, 'u' || m.usuario_id, p.titulo, COALESCE(p.observacoes, ''), 'prova', p.id
+        FROM agenda_prova p JOIN agenda_materia m ON m.id = p.materia_id
+    """,
+    """
+        SELECT a.id * 4 + 3, 'u' || m.usuario_id, a.titulo, '', 'material', a.id
+        FROM agenda_materialdeapoio a JOIN agenda_prova p ON p.id = a.prova_id
+        JOIN agenda_materia m ON m.id = p.materia_id
+    """,
+]
+
+
+def criar_indice(apps, schema_editor):
+    # Só no SQLite (FTS5); nos outros bancos a busca usa o fallback com icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(SQL_CRIAR)
+        except OperationalError:
+            return  # SQLite compilado sem FTS5
+        for sql in DOCUMENTOS:
+            cursor.execute(
+                f"INSERT INTO {TABELA_BUSCA} (rowid, dono, titulo, conteudo, tipo, objeto_id) " + sql
+            )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABELA_BUSCA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0017_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0018_indice_busca'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='horarioaula',
+            options={'ordering': [models.Case(models.When(dia_semana='SEG', then=models.Value(0)), models.When(dia_semana='TER', then=models.Value(1)), models.When(dia_semana='QUA', then=models.Value(2)), models.When(dia_semana='QUI', then=models.Value(3)), models.When(dia_semana='SEX', then=models.Value(4)), models.When(dia_semana='SAB', then=models.Value(5)), models.When(dia_semana='DOM', then=models.Value(6)), output_field=models.IntegerField()), 'hora_inicio'], 'verbose_name_plural': 'Horários de Aula'},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0019_ordem_dia_semana'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialdeapoio',
+            name='nome_original',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='materialdeapoio',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='materialdeapoio',
+            name='tamanho',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
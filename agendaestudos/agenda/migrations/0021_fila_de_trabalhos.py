@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0020_material_arquivo_conteudo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteudoArquivo',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('texto', models.TextField(blank=True)),
+                ('paginas', models.PositiveIntegerField(default=0)),
+                ('miniatura', models.CharField(blank=True, max_length=200)),
+                ('processado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Conteúdos de Arquivos',
+            },
+        ),
+        migrations.CreateModel(
+            name='Trabalho',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30)),
+                ('chave', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('E', 'Executando'), ('C', 'Concluído'), ('F', 'Falhou')], default='P', max_length=1)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('disponivel_em', models.DateTimeField(verbose_name='Disponível a partir de')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Trabalhos',
+                'indexes': [models.Index(fields=['status', 'disponivel_em'], name='trabalho_fila_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'chave'), name='trabalho_tipo_chave_unico')],
+            },
+        ),
+    ]
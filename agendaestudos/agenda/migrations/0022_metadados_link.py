@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0021_fila_de_trabalhos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadadosLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('titulo', models.CharField(blank=True, max_length=300)),
+                ('favicon', models.URLField(blank=True, max_length=500)),
+                ('tipo_conteudo', models.CharField(blank=True, max_length=100)),
+                ('status_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('erro', models.CharField(blank=True, max_length=300)),
+                ('falhas', models.PositiveSmallIntegerField(default=0)),
+                ('buscado_em', models.DateTimeField()),
+                ('expira_em', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Metadados de Links',
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0022_metadados_link'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lembrete',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('T', 'Tarefa'), ('P', 'Prova')], max_length=1)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('antecedencia', models.DurationField()),
+                ('momento_evento', models.DateTimeField()),
+                ('enviar_em', models.DateTimeField()),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('N', 'Enviando'), ('E', 'Enviado'), ('D', 'Descartado'), ('F', 'Falhou')], default='P', max_length=1)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('lote', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('erro', models.CharField(blank=True, max_length=300)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Lembretes',
+            },
+        ),
+        migrations.CreateModel(
+            name='MarcaVarredura',
+            fields=[
+                ('chave', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('ate', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Marcas de Varredura',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='prova',
+            index=models.Index(fields=['data_prova'], name='prova_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['data_fim'], name='tarefa_fim_idx'),
+        ),
+        migrations.AddField(
+            model_name='lembrete',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='lembrete',
+            index=models.Index(fields=['status', 'enviar_em'], name='lembrete_fila_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lembrete',
+            constraint=models.UniqueConstraint(fields=('tipo', 'objeto_id', 'antecedencia', 'momento_evento'), name='lembrete_idempotente'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:42
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def descartar_icones_externos(apps, schema_editor):
+    # Os ícones gravados antes eram URLs de terceiros: os links voltam para a fila do
+    # atualizar_links, que agora baixa o ícone e guarda o data URI
+    MetadadosLink = apps.get_model('agenda', 'MetadadosLink')
+    MetadadosLink.objects.exclude(favicon='').update(favicon='', expira_em=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0023_lembretes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='metadadoslink',
+            name='favicon',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(descartar_icones_externos, migrations.RunPython.noop),
+    ]
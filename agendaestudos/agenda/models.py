@@ -1,8 +1,45 @@
 # Em agenda/models.py
 
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import User
 
+
+# --- Projeções das listagens ---
+# As listagens só trazem as colunas que o template mostra; os textos longos (descrição,
+# anotações da matéria) ficam no banco e são carregados nas telas de detalhe/edição.
+# Ler um campo adiado numa instância dispara uma consulta por linha: ao mudar os templates
+# das listagens, mantenha estas tuplas em dia.
+
+CAMPOS_MATERIA_RESUMO = ('materia', 'materia__nome', 'materia__nomenclatura')
+
+
+class TarefaQuerySet(models.QuerySet):
+    CAMPOS_LISTA = ('titulo', 'data_inicio', 'data_fim', 'status', 'prioridade', 'link_anexo')
+
+    def para_lista(self):
+        return self.select_related('materia').only(*self.CAMPOS_LISTA, *CAMPOS_MATERIA_RESUMO)
+
+
+class ProvaQuerySet(models.QuerySet):
+    # observacoes aparece no card da prova, então continua na lista
+    CAMPOS_LISTA = ('titulo', 'data_prova', 'observacoes', 'link_anexos')
+
+    def para_lista(self):
+        return self.select_related('materia').only(*self.CAMPOS_LISTA, *CAMPOS_MATERIA_RESUMO)
+
+
+class MaterialQuerySet(models.QuerySet):
+    def com_conteudo(self):
+        """Anota miniatura/páginas extraídas pelo worker (None enquanto o arquivo não foi processado)."""
+        conteudo = ConteudoArquivo.objects.filter(sha256=models.OuterRef('sha256'))
+        return self.annotate(
+            miniatura=models.Subquery(conteudo.values('miniatura')[:1]),
+            paginas=models.Subquery(conteudo.values('paginas')[:1]),
+        )
+
+
 class Materia(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     nomenclatura = models.CharField(max_length=10, blank=True, verbose_name="Sigla")
@@ -21,11 +58,16 @@ class Materia(models.Model):
         verbose_name="Link do Plano de Ensino"
     )
 
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
     def __str__(self):
         return f"{self.nome} ({self.nomenclatura})"
 
     class Meta:
         verbose_name_plural = "Matérias"
+        indexes = [
+            models.Index(fields=['usuario', 'nome'], name='materia_usuario_nome_idx'),
+        ]
         
 class Tarefa(models.Model):
     STATUS_CHOICES = [('A', 'A Fazer'), ('E', 'Em Andamento'), ('C', 'Concluída')]
@@ -46,11 +88,23 @@ class Tarefa(models.Model):
         verbose_name="Link de Anexo/Material de Apoio"
     )
 
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    objects = TarefaQuerySet.as_manager()
+
     def __str__(self):
         return self.titulo
 
     class Meta:
         ordering = ['data_inicio']
+        indexes = [
+            # Listagem/filtros por matéria ordenados por data_inicio; prazos pendentes por data_fim
+            models.Index(fields=['materia', 'data_inicio'], name='tarefa_materia_inicio_idx'),
+            models.Index(fields=['materia', 'status', 'data_fim'], name='tarefa_materia_status_fim_idx'),
+            models.Index(fields=['materia', 'prioridade', 'status'], name='tarefa_materia_prior_idx'),
+            # Varredura dos lembretes (agenda.lembretes): prazos de todos os usuários numa faixa de tempo
+            models.Index(fields=['data_fim'], name='tarefa_fim_idx'),
+        ]
         
 class Prova(models.Model):
     materia = models.ForeignKey(
@@ -67,6 +121,9 @@ class Prova(models.Model):
     )
     observacoes = models.TextField(blank=True, null=True, verbose_name="Observações")
     link_anexos = models.URLField(max_length=200, blank=True, null=True, verbose_name="Link para Anexos (Drive/Lista)")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    objects = ProvaQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.titulo} ({self.materia.nome})"
@@ -74,6 +131,10 @@ class Prova(models.Model):
     class Meta:
         verbose_name_plural = "Provas"
         ordering = ['data_prova']
+        indexes = [
+            models.Index(fields=['materia', 'data_prova'], name='prova_materia_data_idx'),
+            models.Index(fields=['data_prova'], name='prova_data_idx'),
+        ]
         
 class MaterialDeApoio(models.Model):
     # TIPO_CHOICES original mantido para compatibilidade com dados existentes, mas form usa simplificado
@@ -104,6 +165,16 @@ class MaterialDeApoio(models.Model):
     
     titulo = models.CharField(max_length=255, verbose_name="Título do Material")
 
+    # Preenchidos no upload (agenda.arquivos): o conteúdo é guardado uma vez só por hash,
+    # mesmo que vários materiais apontem para ele
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    tamanho = models.PositiveBigIntegerField(blank=True, null=True, editable=False)
+    nome_original = models.CharField(max_length=255, blank=True, editable=False)
+
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    objects = MaterialQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.titulo} para {self.prova.titulo}"
 
@@ -111,16 +182,25 @@ class MaterialDeApoio(models.Model):
         verbose_name_plural = "Materiais de Apoio"
         
         
+DIAS_SEMANA = [
+    ('SEG', 'Segunda-feira'),
+    ('TER', 'Terça-feira'),
+    ('QUA', 'Quarta-feira'),
+    ('QUI', 'Quinta-feira'),
+    ('SEX', 'Sexta-feira'),
+    ('SAB', 'Sábado'),
+    ('DOM', 'Domingo'),
+]
+
+# Ordem real da semana; ordenar pela sigla daria DOM, QUA, QUI, SAB, SEG, SEX, TER
+ORDEM_DIA_SEMANA = models.Case(
+    *[models.When(dia_semana=sigla, then=models.Value(ordinal)) for ordinal, (sigla, _) in enumerate(DIAS_SEMANA)],
+    output_field=models.IntegerField(),
+)
+
+
 class HorarioAula(models.Model):
-    DIAS_SEMANA = [
-        ('SEG', 'Segunda-feira'),
-        ('TER', 'Terça-feira'),
-        ('QUA', 'Quarta-feira'),
-        ('QUI', 'Quinta-feira'),
-        ('SEX', 'Sexta-feira'),
-        ('SAB', 'Sábado'),
-        ('DOM', 'Domingo'),
-    ]
+    DIAS_SEMANA = DIAS_SEMANA
     
     materia = models.ForeignKey(
         'Materia', 
@@ -132,9 +212,211 @@ class HorarioAula(models.Model):
     hora_inicio = models.TimeField(verbose_name="Hora de Início")
     local = models.CharField(max_length=50, blank=True, null=True, verbose_name="Local/Sala")
 
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
     def __str__(self):
         return f"{self.materia.nome} ({self.dia_semana} {self.hora_inicio})"
 
     class Meta:
         verbose_name_plural = "Horários de Aula"
-        ordering = ['dia_semana', 'hora_inicio']
+        ordering = [ORDEM_DIA_SEMANA, 'hora_inicio']
+        indexes = [
+            models.Index(fields=['materia', 'dia_semana', 'hora_inicio'], name='horario_materia_dia_hora_idx'),
+        ]
+
+
+class MateriaStats(models.Model):
+    # Contadores desnormalizados por matéria, mantidos pelos signals em agenda/signals.py
+    materia = models.OneToOneField(
+        'Materia',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    total_tarefas = models.PositiveIntegerField(default=0)
+    tarefas_concluidas = models.PositiveIntegerField(default=0)
+    total_provas = models.PositiveIntegerField(default=0)
+    total_materiais = models.PositiveIntegerField(default=0)
+
+    @property
+    def tarefas_pendentes(self):
+        return self.total_tarefas - self.tarefas_concluidas
+
+    def __str__(self):
+        return f"Estatísticas de {self.materia_id}"
+
+    class Meta:
+        verbose_name_plural = "Estatísticas das Matérias"
+
+
+def gerar_token_calendario():
+    return secrets.token_urlsafe(32)
+
+
+class MarcaAlteracao(models.Model):
+    # Marca d'água persistente: momento da última escrita em qualquer dado do usuário.
+    # Avançada junto com a versão do cache (agenda.cache.invalidar_usuario)
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='marca_alteracao'
+    )
+    alterado_em = models.DateTimeField()
+
+    def __str__(self):
+        return f"Última alteração de {self.usuario_id}: {self.alterado_em}"
+
+    class Meta:
+        verbose_name_plural = "Marcas de Alteração"
+
+
+class TokenCalendario(models.Model):
+    # Token secreto da assinatura .ics (apps de calendário não fazem login)
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='token_calendario'
+    )
+    token = models.CharField(max_length=64, unique=True, default=gerar_token_calendario)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Token de calendário de {self.usuario_id}"
+
+    class Meta:
+        verbose_name_plural = "Tokens de Calendário"
+
+
+class ConteudoArquivo(models.Model):
+    # O que o worker extrai de um arquivo enviado (agenda.trabalhos), por hash do conteúdo:
+    # materiais de vários usuários com o mesmo PDF compartilham texto e miniatura
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    texto = models.TextField(blank=True)
+    paginas = models.PositiveIntegerField(default=0)
+    miniatura = models.CharField(max_length=200, blank=True)
+    processado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conteúdo {self.sha256[:12]}"
+
+    class Meta:
+        verbose_name_plural = "Conteúdos de Arquivos"
+
+
+class Trabalho(models.Model):
+    # Fila de trabalhos de fundo no próprio banco, consumida por `manage.py run_workers`
+    PENDENTE, EXECUTANDO, CONCLUIDO, FALHOU = 'P', 'E', 'C', 'F'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'), (EXECUTANDO, 'Executando'), (CONCLUIDO, 'Concluído'), (FALHOU, 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=30)
+    chave = models.CharField(max_length=100)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    disponivel_em = models.DateTimeField(verbose_name="Disponível a partir de")
+    iniciado_em = models.DateTimeField(blank=True, null=True)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tipo}:{self.chave} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name_plural = "Trabalhos"
+        constraints = [
+            # Um trabalho por (tipo, chave): enfileirar de novo reaproveita a linha
+            models.UniqueConstraint(fields=['tipo', 'chave'], name='trabalho_tipo_chave_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'disponivel_em'], name='trabalho_fila_idx'),
+        ]
+
+
+class MetadadosLink(models.Model):
+    # Título, ícone e tipo de conteúdo dos links cadastrados (materiais, tarefas, provas, plano de
+    # ensino), buscados pelo comando atualizar_links (agenda.links) e nunca durante a requisição.
+    # Falhas também ficam guardadas (cache negativo), com validade menor
+    url = models.URLField(max_length=500, unique=True)
+    titulo = models.CharField(max_length=300, blank=True)
+    # Ícone já baixado, como data URI (até links.LIMITE_ICONE): a página não busca nada fora
+    favicon = models.TextField(blank=True)
+    tipo_conteudo = models.CharField(max_length=100, blank=True)
+    status_http = models.PositiveSmallIntegerField(blank=True, null=True)
+    erro = models.CharField(max_length=300, blank=True)
+    falhas = models.PositiveSmallIntegerField(default=0)
+    buscado_em = models.DateTimeField()
+    expira_em = models.DateTimeField(db_index=True)
+
+    @property
+    def rotulo_tipo(self):
+        """Rótulo curto para links que não são páginas (ex: 'PDF'), vazio para HTML."""
+        tipo = self.tipo_conteudo
+        if not tipo or tipo in ('text/html', 'application/xhtml+xml'):
+            return ''
+        if tipo == 'application/pdf':
+            return 'PDF'
+        return {'image': 'Imagem', 'video': 'Vídeo', 'audio': 'Áudio', 'text': 'Texto'}.get(tipo.split('/')[0], 'Arquivo')
+
+    def __str__(self):
+        return self.url
+
+    class Meta:
+        verbose_name_plural = "Metadados de Links"
+
+
+class Lembrete(models.Model):
+    # Lembrete por e-mail de um prazo de tarefa ou de uma prova, criado pelo enviar_lembretes
+    # (agenda.lembretes). A restrição única é o registro de idempotência: reiniciar o comando
+    # ou varrer de novo a mesma faixa de tempo não cria (nem envia) o lembrete duas vezes
+    TAREFA, PROVA = 'T', 'P'
+    TIPO_CHOICES = [(TAREFA, 'Tarefa'), (PROVA, 'Prova')]
+    PENDENTE, ENVIANDO, ENVIADO, DESCARTADO, FALHOU = 'P', 'N', 'E', 'D', 'F'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'), (ENVIANDO, 'Enviando'), (ENVIADO, 'Enviado'),
+        (DESCARTADO, 'Descartado'), (FALHOU, 'Falhou'),
+    ]
+
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lembretes')
+    tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    antecedencia = models.DurationField()
+    momento_evento = models.DateTimeField()
+    enviar_em = models.DateTimeField()
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    lote = models.CharField(max_length=32, blank=True, db_index=True)
+    erro = models.CharField(max_length=300, blank=True)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Lembrete {self.get_tipo_display()} {self.objeto_id} ({self.antecedencia} antes)"
+
+    class Meta:
+        verbose_name_plural = "Lembretes"
+        constraints = [
+            # O momento do evento entra na chave: mudar o prazo gera lembretes para o prazo novo
+            models.UniqueConstraint(
+                fields=['tipo', 'objeto_id', 'antecedencia', 'momento_evento'], name='lembrete_idempotente',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'enviar_em'], name='lembrete_fila_idx'),
+        ]
+
+
+class MarcaVarredura(models.Model):
+    # Até onde uma varredura periódica já foi (ex: 'lembretes'): o próximo ciclo continua daí
+    chave = models.CharField(max_length=30, primary_key=True)
+    ate = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.chave}: {self.ate}"
+
+    class Meta:
+        verbose_name_plural = "Marcas de Varredura"
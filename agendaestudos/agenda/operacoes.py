@@ -0,0 +1,62 @@
+# Em agenda/operacoes.py
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busca import remover
+from .cache import invalidar_usuario
+from .contadores import recalcular_materia_stats
+from .models import Tarefa
+from .signals import em_lote
+
+ACOES_LOTE = [
+    ('concluir', 'Concluir'),
+    ('prioridade', 'Alterar prioridade'),
+    ('mover', 'Mover para outra matéria'),
+    ('excluir', 'Excluir'),
+]
+
+
+class ErroOperacaoLote(Exception):
+    pass
+
+
+def executar_lote_tarefas(usuario, acao, ids, prioridade=None, materia=None):
+    """
+    Aplica `acao` às tarefas `ids` do usuário com um único UPDATE/DELETE, dentro de uma transação.
+    Devolve {id: 'ok' | 'nao_encontrada'}; ids de outros usuários contam como não encontrados.
+    As estatísticas das matérias afetadas e o cache do usuário são refeitos uma vez no final.
+    """
+    if acao not in dict(ACOES_LOTE):
+        raise ErroOperacaoLote('Ação inválida.')
+    if acao == 'prioridade' and prioridade not in dict(Tarefa.PRIORIDADE_CHOICES):
+        raise ErroOperacaoLote('Prioridade inválida.')
+    if acao == 'mover' and (materia is None or materia.usuario_id != usuario.pk):
+        raise ErroOperacaoLote('Matéria de destino inválida.')
+
+    ids = set(ids)
+    with transaction.atomic(), em_lote():
+        tarefas = Tarefa.objects.filter(pk__in=ids, materia__usuario=usuario)
+        encontradas = dict(tarefas.values_list('pk', 'materia_id'))
+        alvo = Tarefa.objects.filter(pk__in=encontradas)
+        agora = timezone.now()  # update() não aplica o auto_now
+
+        if acao == 'concluir':
+            alvo.update(status='C', atualizado_em=agora)
+        elif acao == 'prioridade':
+            alvo.update(prioridade=prioridade, atualizado_em=agora)
+        elif acao == 'mover':
+            alvo.update(materia=materia, atualizado_em=agora)
+        elif acao == 'excluir':
+            alvo.delete()
+            remover('tarefa', encontradas)
+
+        materias_afetadas = set(encontradas.values())
+        if materia is not None:
+            materias_afetadas.add(materia.pk)
+        if encontradas:
+            recalcular_materia_stats(materias_afetadas)
+
+    if encontradas:
+        invalidar_usuario(usuario.pk)
+    return {pk: 'ok' if pk in encontradas else 'nao_encontrada' for pk in sorted(ids)}
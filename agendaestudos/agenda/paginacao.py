@@ -0,0 +1,97 @@
+# Em agenda/paginacao.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+class PaginaChave:
+    """Uma página da paginação por chave (keyset): itens e o cursor da próxima página."""
+
+    def __init__(self, itens, proximo_cursor, cursor_atual):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_atual = cursor_atual
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def e_primeira(self):
+        return not self.cursor_atual
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def codificar_cursor(valor, pk):
+    # isoformat() em vez do DjangoJSONEncoder, que corta microssegundos e quebraria o desempate
+    if hasattr(valor, 'isoformat'):
+        valor = valor.isoformat()
+    texto = json.dumps([valor, pk])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campo_modelo):
+    """Devolve (valor, pk) do cursor, ou None se ele estiver ausente ou inválido."""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        valor, pk = json.loads(texto)
+        return campo_modelo.to_python(valor), int(pk)
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _consulta_da_pagina(queryset, campo, cursor, tamanho):
+    """(queryset fatiado com uma linha a mais, campo do modelo, cursor válido ou None)."""
+    campo_modelo = queryset.model._meta.get_field(campo)
+    queryset = queryset.order_by(F(campo).asc(nulls_last=True), 'pk')
+
+    posicao = decodificar_cursor(cursor, campo_modelo)
+    if posicao is not None:
+        valor, pk = posicao
+        if valor is None:
+            queryset = queryset.filter(**{f'{campo}__isnull': True, 'pk__gt': pk})
+        else:
+            depois = Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk})
+            if campo_modelo.null:
+                depois |= Q(**{f'{campo}__isnull': True})
+            queryset = queryset.filter(depois)
+    else:
+        cursor = None
+
+    # Uma linha a mais só para saber se existe próxima página
+    return queryset[:tamanho + 1], cursor
+
+
+def _montar_pagina(itens, campo, cursor, tamanho):
+    proximo_cursor = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor(getattr(ultimo, campo), ultimo.pk)
+    return PaginaChave(itens, proximo_cursor, cursor)
+
+
+def paginar_por_chave(queryset, campo, cursor=None, tamanho=50):
+    """
+    Pagina `queryset` ordenando por (campo, id) e continuando depois da última linha vista,
+    em vez de usar OFFSET: qualquer página custa o mesmo que a primeira, e concluir/editar
+    itens não faz linhas pularem ou repetirem entre páginas. Valores nulos vão para o fim.
+    """
+    consulta, cursor = _consulta_da_pagina(queryset, campo, cursor, tamanho)
+    return _montar_pagina(list(consulta), campo, cursor, tamanho)
+
+
+async def apaginar_por_chave(queryset, campo, cursor=None, tamanho=50):
+    """Versão assíncrona de paginar_por_chave (ORM assíncrono, mesmos cursores)."""
+    consulta, cursor = _consulta_da_pagina(queryset, campo, cursor, tamanho)
+    return _montar_pagina([item async for item in consulta], campo, cursor, tamanho)
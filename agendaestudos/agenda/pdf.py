@@ -0,0 +1,501 @@
+# Em agenda/pdf.py
+
+import base64
+import re
+import shutil
+import subprocess
+import tempfile
+import zlib
+from pathlib import Path
+
+# Extração de texto e miniatura de PDFs para o worker de fundo (run_workers).
+# Só biblioteca padrão e sem Django: as funções rodam nos processos do pool.
+# O texto sai do próprio PDF (objetos, object streams, FlateDecode, fontes com ToUnicode),
+# o que basta para a busca; PDFs escaneados (só imagem) não têm texto a extrair.
+# A miniatura da primeira página usa o pdftoppm (poppler-utils) quando ele está instalado.
+
+LIMITE_TEXTO = 200_000
+# Teto da descompressão (FlateDecode) por stream e por documento: um PDF pequeno pode
+# descomprimir em gigabytes. Com o orçamento do documento esgotado, a extração para ali.
+LIMITE_STREAM = 25 * LIMITE_TEXTO
+LIMITE_DESCOMPRIMIDO = 100 * LIMITE_TEXTO
+PROFUNDIDADE_MAXIMA = 8
+# [ e << aninhados num mesmo objeto (PDFs reais ficam muito abaixo disso)
+PROFUNDIDADE_OBJETO = 64
+
+
+class ErroPdf(Exception):
+    pass
+
+
+# --- Objetos PDF ---
+
+class Nome(str):
+    """/Nome de um PDF (sem a barra)."""
+
+
+class Ref:
+    __slots__ = ('numero',)
+
+    def __init__(self, numero):
+        self.numero = numero
+
+
+class Operador(bytes):
+    """Palavra solta de um content stream (Tj, BT, Tf...)."""
+
+
+ESPACOS = b' \t\r\n\f\x00'
+DELIMITADORES = b'()<>[]{}/%'
+RE_NUMERO = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+RE_REF = re.compile(rb'\s*(\d+)\s+(\d+)\s+R\b')
+RE_OBJ = re.compile(rb'(?<![\d.])(\d+)\s+(\d+)\s+obj\b')
+ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+# Marcadores internos do Leitor
+SEM_CHAVE, PULAR = object(), object()
+
+
+class Leitor:
+    """Analisador da sintaxe de objetos do PDF (também usado para os content streams)."""
+
+    def __init__(self, dados, posicao=0):
+        self.dados = dados
+        self.posicao = posicao
+
+    def pular_espacos(self):
+        dados, tamanho = self.dados, len(self.dados)
+        while self.posicao < tamanho:
+            caractere = dados[self.posicao]
+            if caractere in ESPACOS:
+                self.posicao += 1
+            elif caractere == 0x25:  # % comentário até o fim da linha
+                while self.posicao < tamanho and dados[self.posicao] not in b'\r\n':
+                    self.posicao += 1
+            else:
+                break
+
+    def palavra(self):
+        inicio = self.posicao
+        while (self.posicao < len(self.dados) and self.dados[self.posicao] not in ESPACOS
+               and self.dados[self.posicao] not in DELIMITADORES):
+            self.posicao += 1
+        return self.dados[inicio:self.posicao]
+
+    def objeto(self):
+        """
+        Próximo objeto; None no fim dos dados. Listas e dicionários aninhados são montados numa
+        pilha explícita (sem recursão); aninhamento além de PROFUNDIDADE_OBJETO é ValueError, e
+        quem chama descarta o objeto como nos outros erros de sintaxe.
+        """
+        dados = self.dados
+        pilha = []  # [lista] ou [dicionário, chave pendente]
+        while True:
+            self.pular_espacos()
+            no_fim = self.posicao >= len(dados)
+            if pilha and (no_fim or dados.startswith(b'>>' if isinstance(pilha[-1][0], dict) else b']', self.posicao)):
+                # Fecha o contêiner do topo (o fim dos dados fecha o que ficou aberto)
+                self.posicao += 2 if isinstance(pilha[-1][0], dict) else 1
+                valor = pilha.pop()[0]
+            elif no_fim:
+                return None
+            elif dados.startswith(b'<<', self.posicao) or dados.startswith(b'[', self.posicao):
+                if len(pilha) >= PROFUNDIDADE_OBJETO:
+                    raise ValueError('Objeto aninhado demais.')
+                abre_dicionario = dados.startswith(b'<<', self.posicao)
+                self.posicao += 2 if abre_dicionario else 1
+                pilha.append([{}, SEM_CHAVE] if abre_dicionario else [[]])
+                continue
+            else:
+                valor = self._valor_simples()
+                if valor is PULAR:
+                    continue
+
+            if not pilha:
+                return valor
+            topo = pilha[-1]
+            if isinstance(topo[0], list):
+                topo[0].append(valor)
+            elif topo[1] is SEM_CHAVE:
+                topo[1] = valor
+            else:
+                if isinstance(topo[1], Nome):
+                    topo[0][topo[1]] = valor
+                topo[1] = SEM_CHAVE
+
+    def _valor_simples(self):
+        """Nome, string, número, referência, booleano/null ou operador; PULAR para lixo."""
+        dados, caractere = self.dados, self.dados[self.posicao:self.posicao + 1]
+        if caractere == b'/':
+            self.posicao += 1
+            nome = self.palavra()
+            return Nome(re.sub(rb'#([0-9A-Fa-f]{2})', lambda m: bytes([int(m.group(1), 16)]), nome).decode('latin-1'))
+        if caractere == b'(':
+            return self.texto_literal()
+        if caractere == b'<':
+            fim = dados.find(b'>', self.posicao)
+            fim = len(dados) if fim < 0 else fim
+            hexa = re.sub(rb'[^0-9A-Fa-f]', b'', dados[self.posicao + 1:fim])
+            self.posicao = fim + 1
+            return bytes.fromhex((hexa + b'0' * (len(hexa) % 2)).decode())
+        if caractere in (b']', b'>', b')', b'{', b'}'):
+            # Delimitador solto: ignorado
+            self.posicao += 1
+            return PULAR
+
+        numero = RE_NUMERO.match(dados, self.posicao)
+        if numero and (numero.end() >= len(dados) or dados[numero.end()] in ESPACOS + DELIMITADORES):
+            referencia = RE_REF.match(dados, self.posicao)
+            if referencia and b'.' not in referencia.group(1):
+                self.posicao = referencia.end()
+                return Ref(int(referencia.group(1)))
+            self.posicao = numero.end()
+            texto = numero.group()
+            return float(texto) if b'.' in texto else int(texto)
+
+        palavra = self.palavra()
+        if not palavra:
+            self.posicao += 1
+            return PULAR
+        return {b'true': True, b'false': False, b'null': None}.get(palavra, Operador(palavra))
+
+    def texto_literal(self):
+        dados = self.dados
+        self.posicao += 1
+        saida, nivel = bytearray(), 1
+        while self.posicao < len(dados):
+            caractere = dados[self.posicao:self.posicao + 1]
+            self.posicao += 1
+            if caractere == b'\\':
+                seguinte = dados[self.posicao:self.posicao + 1]
+                self.posicao += 1
+                if seguinte in ESCAPES:
+                    saida += ESCAPES[seguinte]
+                elif seguinte and seguinte in b'01234567':
+                    octal = re.match(rb'[0-7]{1,3}', dados[self.posicao - 1:self.posicao + 2]).group()
+                    self.posicao += len(octal) - 1
+                    saida.append(int(octal, 8) & 0xFF)
+                elif seguinte == b'\r':
+                    if dados[self.posicao:self.posicao + 1] == b'\n':
+                        self.posicao += 1
+                elif seguinte != b'\n':
+                    saida += seguinte
+            elif caractere == b'(':
+                nivel += 1
+                saida += caractere
+            elif caractere == b')':
+                nivel -= 1
+                if nivel == 0:
+                    break
+                saida += caractere
+            else:
+                saida += caractere
+        return bytes(saida)
+
+
+# --- Documento ---
+
+class Documento:
+    def __init__(self, dados):
+        if b'%PDF-' not in dados[:1024]:
+            raise ErroPdf('O arquivo não é um PDF.')
+        self.dados = dados
+        self.restante = LIMITE_DESCOMPRIMIDO
+        self.objetos = {}
+        self.streams = {}
+        self._ler_objetos()
+        self._ler_object_streams()
+
+    def _ler_objetos(self):
+        # Varre os "N G obj" em vez de confiar na tabela xref, que muitas vezes está quebrada
+        for encontrado in RE_OBJ.finditer(self.dados):
+            leitor = Leitor(self.dados, encontrado.end())
+            try:
+                valor = leitor.objeto()
+            except (ValueError, IndexError, AttributeError):
+                continue
+            numero = int(encontrado.group(1))
+            self.objetos[numero] = valor
+            leitor.pular_espacos()
+            if isinstance(valor, dict) and self.dados.startswith(b'stream', leitor.posicao):
+                inicio = leitor.posicao + 6
+                inicio += 2 if self.dados.startswith(b'\r\n', inicio) else 1 if self.dados[inicio:inicio + 1] in b'\r\n' else 0
+                self.streams[numero] = (valor, inicio)
+
+    def _ler_object_streams(self):
+        for numero, (dicionario, _) in list(self.streams.items()):
+            if dicionario.get('Type') != 'ObjStm':
+                continue
+            dados = self.conteudo_stream(numero)
+            if dados is None:
+                continue
+            primeiro = self.resolver(dicionario.get('First')) or 0
+            cabecalho = [int(v) for v in re.findall(rb'\d+', dados[:primeiro])]
+            for indice in range(0, len(cabecalho) - 1, 2):
+                numero_interno, deslocamento = cabecalho[indice], cabecalho[indice + 1]
+                if numero_interno not in self.objetos:
+                    try:
+                        self.objetos[numero_interno] = Leitor(dados, primeiro + deslocamento).objeto()
+                    except (ValueError, IndexError, AttributeError):
+                        continue
+
+    def resolver(self, valor, profundidade=0):
+        while isinstance(valor, Ref) and profundidade < PROFUNDIDADE_MAXIMA:
+            valor = self.objetos.get(valor.numero)
+            profundidade += 1
+        return None if isinstance(valor, Ref) else valor
+
+    def conteudo_stream(self, referencia):
+        """Bytes decodificados de um stream (pelo número do objeto ou Ref), ou None."""
+        numero = referencia.numero if isinstance(referencia, Ref) else referencia
+        if numero not in self.streams or self.esgotado:
+            return None
+        dicionario, inicio = self.streams[numero]
+        tamanho = self.resolver(dicionario.get('Length'))
+        fim = inicio + tamanho if isinstance(tamanho, int) else -1
+        if fim < 0 or self.dados[fim:fim + 30].lstrip()[:9] != b'endstream':
+            # /Length ausente ou errado: vai até o endstream
+            fim = self.dados.find(b'endstream', inicio)
+            if fim < 0:
+                return None
+        conteudo = decodificar(self.dados[inicio:fim], dicionario, self, min(LIMITE_STREAM, self.restante))
+        self.restante -= len(conteudo or b'')
+        return conteudo
+
+    @property
+    def esgotado(self):
+        return self.restante <= 0
+
+    def paginas(self):
+        catalogo = next((obj for obj in self.objetos.values()
+                         if isinstance(obj, dict) and obj.get('Type') == 'Catalog'), None)
+        paginas = []
+        if catalogo is not None:
+            self._coletar_paginas(self.resolver(catalogo.get('Pages')), {}, paginas, set())
+        if not paginas:
+            paginas = [obj for _, obj in sorted(self.objetos.items())
+                       if isinstance(obj, dict) and obj.get('Type') == 'Page']
+        return paginas
+
+    def _coletar_paginas(self, no, herdado, paginas, vistos):
+        if not isinstance(no, dict) or id(no) in vistos:
+            return
+        vistos.add(id(no))
+        herdado = {**herdado, **{chave: no[chave] for chave in ('Resources',) if chave in no}}
+        if no.get('Type') == 'Page' or 'Kids' not in no:
+            paginas.append({**herdado, **no})
+            return
+        for filho in self.resolver(no.get('Kids')) or []:
+            self._coletar_paginas(self.resolver(filho), herdado, paginas, vistos)
+
+
+def decodificar(dados, dicionario, documento, limite=LIMITE_STREAM):
+    """Aplica os filtros do stream; a saída é cortada em `limite` bytes."""
+    filtros = documento.resolver(dicionario.get('Filter'))
+    if filtros is None:
+        return dados
+    for filtro in filtros if isinstance(filtros, list) else [filtros]:
+        filtro = documento.resolver(filtro)
+        if filtro in ('FlateDecode', 'Fl'):
+            try:
+                # max_length: para de descomprimir no limite em vez de alocar tudo
+                dados = zlib.decompressobj().decompress(dados, limite)
+            except zlib.error:
+                return None
+        elif filtro in ('ASCIIHexDecode', 'AHx'):
+            hexa = re.sub(rb'[^0-9A-Fa-f]', b'', dados.split(b'>')[0])
+            dados = bytes.fromhex((hexa + b'0' * (len(hexa) % 2)).decode())
+        elif filtro in ('ASCII85Decode', 'A85'):
+            corpo = dados.strip()
+            corpo = corpo[2:] if corpo.startswith(b'<~') else corpo
+            try:
+                dados = base64.a85decode(corpo.split(b'~>')[0] + b'~>', adobe=False, ignorechars=b' \t\n\r\x0b~>')
+            except ValueError:
+                return None
+        else:
+            # LZW, DCT (imagens) etc.: nada de texto para a busca
+            return None
+    return dados[:limite]
+
+
+# --- Fontes ---
+
+class Fonte:
+    """Converte os códigos de uma string do PDF em texto, pelo ToUnicode ou pela codificação."""
+
+    def __init__(self, mapa=None, bytes_por_codigo=1, codificacao='latin-1'):
+        self.mapa = mapa or {}
+        self.bytes_por_codigo = bytes_por_codigo
+        self.codificacao = codificacao
+
+    def texto(self, codigos):
+        if not self.mapa:
+            return codigos.decode(self.codificacao, errors='replace')
+        passo = self.bytes_por_codigo
+        partes = []
+        for indice in range(0, len(codigos) - passo + 1, passo):
+            codigo = int.from_bytes(codigos[indice:indice + passo], 'big')
+            partes.append(self.mapa.get(codigo, '' if passo > 1 else chr(codigo)))
+        return ''.join(partes)
+
+
+def _utf16(dados):
+    return dados.decode('utf-16-be', errors='ignore')
+
+
+def ler_cmap(dados):
+    """(mapa código -> texto, bytes por código) de um CMap ToUnicode."""
+    mapa, bytes_por_codigo = {}, 1
+    for bloco in re.findall(rb'begincodespacerange(.*?)endcodespacerange', dados, re.S):
+        limites = re.findall(rb'<([0-9A-Fa-f]+)>', bloco)
+        if limites:
+            bytes_por_codigo = max(1, len(limites[0]) // 2)
+    for bloco in re.findall(rb'beginbfchar(.*?)endbfchar', dados, re.S):
+        for origem, destino in re.findall(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>', bloco):
+            mapa[int(origem, 16)] = _utf16(bytes.fromhex(destino.decode()))
+    for bloco in re.findall(rb'beginbfrange(.*?)endbfrange', dados, re.S):
+        for inicio, fim, destino in re.findall(
+                rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])', bloco):
+            inicio, fim = int(inicio, 16), int(fim, 16)
+            if fim - inicio > 0xFFFF:
+                continue
+            if destino.startswith(b'['):
+                for deslocamento, item in enumerate(re.findall(rb'<([0-9A-Fa-f]*)>', destino)):
+                    mapa[inicio + deslocamento] = _utf16(bytes.fromhex(item.decode()))
+            else:
+                base = bytes.fromhex(destino[1:-1].decode())
+                for deslocamento in range(fim - inicio + 1):
+                    ultimo = int.from_bytes(base[-2:] or b'\x00', 'big') + deslocamento
+                    mapa[inicio + deslocamento] = _utf16(base[:-2] + ultimo.to_bytes(2, 'big'))
+    return mapa, bytes_por_codigo
+
+
+def fontes_dos_recursos(documento, recursos):
+    fontes = {}
+    for nome, referencia in (documento.resolver((recursos or {}).get('Font')) or {}).items():
+        fonte = documento.resolver(referencia)
+        if not isinstance(fonte, dict):
+            continue
+        mapa, bytes_por_codigo = {}, 1
+        to_unicode = fonte.get('ToUnicode')
+        if isinstance(to_unicode, Ref):
+            cmap = documento.conteudo_stream(to_unicode)
+            if cmap:
+                mapa, bytes_por_codigo = ler_cmap(cmap)
+        codificacao = 'cp1252' if documento.resolver(fonte.get('Encoding')) == 'WinAnsiEncoding' else 'latin-1'
+        fontes[nome] = Fonte(mapa, bytes_por_codigo, codificacao)
+    return fontes
+
+
+# --- Texto das páginas ---
+
+def texto_do_conteudo(documento, dados, recursos, profundidade=0):
+    """Texto de um content stream: strings de Tj/TJ/'/\" na ordem, com quebras de linha aproximadas."""
+    fontes = fontes_dos_recursos(documento, recursos)
+    objetos_x = documento.resolver((recursos or {}).get('XObject')) or {}
+    fonte = Fonte()
+    partes, operandos = [], []
+    leitor = Leitor(dados)
+    while True:
+        try:
+            objeto = leitor.objeto()
+        except ValueError:
+            break  # operando aninhado demais: o resto deste conteúdo é descartado
+        if objeto is None:
+            break
+        if not isinstance(objeto, Operador):
+            operandos.append(objeto)
+            continue
+
+        if objeto == b'Tf' and len(operandos) >= 2:
+            fonte = fontes.get(operandos[-2], Fonte())
+        elif objeto == b'Tj' and operandos:
+            partes.append(fonte.texto(operandos[-1]) if isinstance(operandos[-1], bytes) else '')
+        elif objeto in (b"'", b'"') and operandos:
+            partes.append('\n')
+            if isinstance(operandos[-1], bytes):
+                partes.append(fonte.texto(operandos[-1]))
+        elif objeto == b'TJ' and operandos and isinstance(operandos[-1], list):
+            for item in operandos[-1]:
+                if isinstance(item, bytes):
+                    partes.append(fonte.texto(item))
+                elif isinstance(item, (int, float)) and item < -200:
+                    # Recuo grande entre pedaços: é um espaço entre palavras
+                    partes.append(' ')
+        elif objeto in (b'T*', b'ET'):
+            partes.append('\n')
+        elif objeto in (b'Td', b'TD') and len(operandos) >= 2:
+            partes.append('\n' if operandos[-1] else ' ')
+        elif objeto == b'Tm':
+            partes.append('\n')
+        elif objeto == b'Do' and operandos and profundidade < PROFUNDIDADE_MAXIMA:
+            referencia = objetos_x.get(operandos[-1])
+            formulario = documento.resolver(referencia)
+            if isinstance(referencia, Ref) and isinstance(formulario, dict) and formulario.get('Subtype') == 'Form':
+                conteudo = documento.conteudo_stream(referencia)
+                if conteudo:
+                    partes.append(texto_do_conteudo(
+                        documento, conteudo, documento.resolver(formulario.get('Resources')) or recursos,
+                        profundidade + 1,
+                    ))
+        elif objeto == b'BI':
+            # Imagem embutida: os bytes entre ID e EI não são sintaxe PDF
+            fim = re.compile(rb'\sEI(?=[\s]|$)').search(dados, leitor.posicao)
+            leitor.posicao = fim.end() if fim else len(dados)
+        operandos = []
+    return ''.join(partes)
+
+
+def normalizar(texto):
+    texto = ''.join(c if c.isprintable() or c == '\n' else ' ' for c in texto)
+    linhas = (re.sub(r'[ \t]+', ' ', linha).strip() for linha in texto.splitlines())
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(linhas)).strip()
+
+
+def extrair_texto(dados, limite=LIMITE_TEXTO):
+    """(texto, número de páginas) de um PDF em bytes."""
+    documento = Documento(dados)
+    paginas = documento.paginas()
+    partes, tamanho = [], 0
+    for pagina in paginas:
+        recursos = documento.resolver(pagina.get('Resources'))
+        # /Contents é um stream ou uma lista deles (a lista pode ser ela mesma indireta)
+        referencias = pagina.get('Contents')
+        if isinstance(documento.resolver(referencias), list):
+            referencias = documento.resolver(referencias)
+        fluxo = b'\n'.join(
+            documento.conteudo_stream(referencia) or b''
+            for referencia in (referencias if isinstance(referencias, list) else [referencias])
+            if isinstance(referencia, Ref)
+        )
+        texto = normalizar(texto_do_conteudo(documento, fluxo, recursos))
+        partes.append(texto)
+        tamanho += len(texto)
+        if tamanho >= limite or documento.esgotado:
+            break
+    return '\n\n'.join(parte for parte in partes if parte)[:limite], len(paginas)
+
+
+# --- Miniatura ---
+
+def pdftoppm_disponivel():
+    return shutil.which('pdftoppm') is not None
+
+
+def gerar_miniatura(caminho, largura=240, tempo_limite=60):
+    """PNG da primeira página (bytes), ou None se o pdftoppm não estiver instalado."""
+    if not pdftoppm_disponivel():
+        return None
+    with tempfile.TemporaryDirectory() as pasta:
+        saida = Path(pasta) / 'miniatura'
+        subprocess.run(
+            ['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile',
+             '-scale-to-x', str(largura), '-scale-to-y', '-1', str(caminho), str(saida)],
+            check=True, capture_output=True, timeout=tempo_limite,
+        )
+        return saida.with_suffix('.png').read_bytes()
+
+
+def processar_pdf(caminho):
+    """Trabalho do pool: texto, páginas e miniatura de um PDF guardado em disco."""
+    texto, paginas = extrair_texto(Path(caminho).read_bytes())
+    return {'texto': texto, 'paginas': paginas, 'miniatura': gerar_miniatura(caminho)}
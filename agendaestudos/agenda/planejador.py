@@ -0,0 +1,232 @@
+# Em agenda/planejador.py
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import TEMPO_CACHE, chave_usuario
+from .horarios import NOMES_DIAS, quadro_semanal
+from .lembretes import momento_da_prova
+from .models import Prova, Tarefa
+
+# Plano de estudos da semana: distribui blocos de foco (o mesmo tempo do Modo Foco) nos horários
+# livres entre as aulas, para as tarefas pendentes e as provas próximas.
+#
+# Os horários livres de cada dia (JANELA menos as aulas do quadro semanal) são cortados em
+# blocos e percorridos em ordem. Cada tarefa/prova entra num heap quando é liberada (data de
+# início da tarefa; para provas, DIAS_ESTUDO_PROVA antes) e cada bloco vai para o topo do heap:
+# o prazo mais cedo primeiro (EDF), com o prazo antecipado conforme a prioridade, para as de
+# prioridade alta saírem antes das outras de prazo parecido. Quem perde o prazo com blocos
+# faltando vai para `sem_tempo`. Custa O((blocos + itens) log itens): milissegundos para
+# centenas de tarefas. O resultado fica no cache sob a versão do usuário (qualquer escrita em
+# tarefas, provas ou horários o invalida) e o bloco de início (muda a cada meia hora).
+
+BLOCO = timedelta(minutes=25)
+PAUSA = timedelta(minutes=5)
+DIAS = 7
+JANELA = (time(8, 0), time(22, 0))
+DURACAO_AULA = timedelta(minutes=100)
+LIMITE_DIARIO = 8
+BLOCOS_TAREFA = {'A': 4, 'M': 2, 'B': 1}
+BLOCOS_PROVA = 6
+DIAS_ESTUDO_PROVA = 14
+ANTECIPACAO = {'A': timedelta(days=1), 'M': timedelta(hours=12), 'B': timedelta(0)}
+
+TAREFA, PROVA, AULA = 'tarefa', 'prova', 'aula'
+
+
+@dataclass(frozen=True)
+class Item:
+    tipo: str
+    pk: int
+    titulo: str
+    materia: str
+    prazo: datetime
+    liberado_em: datetime
+    prioridade: str
+    blocos: int
+
+    @property
+    def chave(self):
+        # EDF ponderado: prioridade alta "vence" antes
+        return self.prazo - ANTECIPACAO[self.prioridade]
+
+
+@dataclass(frozen=True)
+class Entrada:
+    """Um bloco de estudo ou uma aula na agenda do dia."""
+    inicio: datetime
+    fim: datetime
+    tipo: str
+    titulo: str
+    materia: str
+    pk: int = None
+    prazo: datetime = None
+
+
+@dataclass
+class DiaPlano:
+    data: date
+    entradas: list = field(default_factory=list)
+
+    @property
+    def nome(self):
+        return NOMES_DIAS[self.data.weekday()]
+
+    @property
+    def blocos(self):
+        return [entrada for entrada in self.entradas if entrada.tipo != AULA]
+
+
+@dataclass
+class Plano:
+    inicio: datetime
+    dias: list
+    # [(Item, blocos que faltaram)] de quem não cabe antes do prazo
+    sem_tempo: list
+
+    @property
+    def total_blocos(self):
+        return sum(len(dia.blocos) for dia in self.dias)
+
+
+def inicio_do_plano(agora):
+    """Início do próximo bloco: `agora` arredondado para cima na meia hora, no fuso local."""
+    local = timezone.localtime(agora).replace(second=0, microsecond=0)
+    passo = int((BLOCO + PAUSA).total_seconds() // 60)
+    resto = local.minute % passo
+    return local + timedelta(minutes=passo - resto) if resto else local
+
+
+def _janela():
+    return getattr(settings, 'AGENDA_PLANO_JANELA', JANELA)
+
+
+def _no_dia(data, hora):
+    return timezone.make_aware(datetime.combine(data, hora))
+
+
+# --- Horários livres ---
+
+def aulas_do_dia(data, ocupados):
+    """[(início, fim, matéria)] das aulas da data, em ordem."""
+    return [
+        (_no_dia(data, hora), _no_dia(data, hora) + DURACAO_AULA, materia)
+        for hora, materia in ocupados[data.weekday()]
+    ]
+
+
+def blocos_livres(data, aulas, inicio):
+    """[(início, fim)] dos blocos de foco que cabem na janela do dia, fora das aulas e depois de `inicio`."""
+    abertura, fechamento = (_no_dia(data, hora) for hora in _janela())
+    cursor = max(abertura, inicio)
+    livres = []
+    for aula_inicio, aula_fim, _ in [*aulas, (fechamento, fechamento, None)]:
+        limite = min(aula_inicio, fechamento)
+        while cursor + BLOCO <= limite:
+            livres.append((cursor, cursor + BLOCO))
+            cursor += BLOCO + PAUSA
+        cursor = max(cursor, aula_fim)
+    return livres
+
+
+# --- Alocação ---
+
+def planejar(itens, ocupados, inicio, dias=DIAS):
+    """
+    Plano de `dias` dias a partir de `inicio` (aware, fuso local). `ocupados` tem, por dia da
+    semana (0 = segunda), [(hora de início, matéria)] das aulas em ordem. Não consulta o banco.
+    """
+    por_liberacao = sorted(itens, key=lambda item: item.liberado_em)
+    proximo = 0
+    fila = []  # (chave, ordem, item); ordem desempata e evita comparar Items
+    faltando = {}
+    sem_tempo = []
+    plano_dias = []
+
+    for n in range(dias):
+        data = inicio.date() + timedelta(days=n)
+        aulas = aulas_do_dia(data, ocupados)
+        dia = DiaPlano(data)
+        for bloco_inicio, bloco_fim in blocos_livres(data, aulas, inicio):
+            if len(dia.entradas) >= LIMITE_DIARIO:
+                break
+            while proximo < len(por_liberacao) and por_liberacao[proximo].liberado_em <= bloco_inicio:
+                item = por_liberacao[proximo]
+                heapq.heappush(fila, (item.chave, proximo, item))
+                faltando[proximo] = item.blocos
+                proximo += 1
+            # Quem não termina mais um bloco antes do prazo sai da fila
+            while fila and fila[0][2].prazo < bloco_fim:
+                _, ordem, item = heapq.heappop(fila)
+                sem_tempo.append((item, faltando.pop(ordem)))
+            if not fila:
+                continue
+            _, ordem, item = fila[0]
+            dia.entradas.append(Entrada(bloco_inicio, bloco_fim, item.tipo, item.titulo, item.materia, item.pk, item.prazo))
+            faltando[ordem] -= 1
+            if not faltando[ordem]:
+                heapq.heappop(fila)
+                del faltando[ordem]
+
+        dia.entradas.extend(Entrada(a_inicio, a_fim, AULA, 'Aula', materia) for a_inicio, a_fim, materia in aulas)
+        dia.entradas.sort(key=lambda entrada: entrada.inicio)
+        plano_dias.append(dia)
+
+    # Prazos dentro da semana que ficaram com blocos faltando (os de depois continuam no próximo plano)
+    fim_do_plano = _no_dia(inicio.date() + timedelta(days=dias), time(0, 0))
+    sem_tempo.extend((item, faltando[ordem]) for _, ordem, item in fila if item.prazo <= fim_do_plano)
+    sem_tempo.sort(key=lambda par: par[0].prazo)
+    return Plano(inicio, plano_dias, sem_tempo)
+
+
+# --- Dados do usuário ---
+
+def itens_do_usuario(usuario_id, inicio, dias=DIAS):
+    """Tarefas pendentes com prazo futuro e provas até DIAS_ESTUDO_PROVA depois do plano."""
+    itens = [
+        Item(TAREFA, pk, titulo, materia, data_fim, max(data_inicio, inicio), prioridade, BLOCOS_TAREFA[prioridade])
+        for pk, titulo, materia, data_inicio, data_fim, prioridade in Tarefa.objects.filter(
+            materia__usuario_id=usuario_id, status__in=['A', 'E'], data_fim__gt=inicio,
+        ).values_list('pk', 'titulo', 'materia__nome', 'data_inicio', 'data_fim', 'prioridade')
+    ]
+    hoje = inicio.date()
+    provas = Prova.objects.filter(
+        materia__usuario_id=usuario_id, data_prova__gte=hoje,
+        data_prova__lte=hoje + timedelta(days=dias + DIAS_ESTUDO_PROVA),
+    ).values_list('pk', 'titulo', 'materia__nome', 'data_prova')
+    for pk, titulo, materia, data_prova in provas:
+        momento = momento_da_prova(data_prova)
+        if momento > inicio:
+            liberado_em = max(momento - timedelta(days=DIAS_ESTUDO_PROVA), inicio)
+            itens.append(Item(PROVA, pk, titulo, materia, momento, liberado_em, 'A', BLOCOS_PROVA))
+    return itens
+
+
+def aulas_ocupadas(usuario_id):
+    """Aulas do quadro semanal (já em cache) no formato de `planejar`."""
+    quadro = quadro_semanal(usuario_id)
+    return [[(aula.hora_inicio, aula.materia.nome) for aula in aulas] for _, _, aulas in quadro.semana()]
+
+
+def plano_da_semana(usuario_id, agora=None):
+    inicio = inicio_do_plano(agora or timezone.now())
+    return planejar(itens_do_usuario(usuario_id, inicio), aulas_ocupadas(usuario_id), inicio)
+
+
+def plano_em_cache(usuario_id, agora=None):
+    """
+    Plano guardado sob a versão do usuário e o bloco de início: recalculado só quando tarefas,
+    provas ou horários mudam, ou quando começa outro bloco (os que já passaram saem).
+    """
+    inicio = inicio_do_plano(agora or timezone.now())
+    chave = chave_usuario('plano', usuario_id, inicio.isoformat())
+    plano = cache.get(chave)
+    if plano is None:
+        plano = planejar(itens_do_usuario(usuario_id, inicio), aulas_ocupadas(usuario_id), inicio)
+        cache.set(chave, plano, TEMPO_CACHE)
+    return plano
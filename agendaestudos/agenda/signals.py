@@ -0,0 +1,223 @@
+# Em agenda/signals.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .arquivos import agendar_liberacao
+from .busca import TIPO_DO_MODELO, indexar, remover
+from .cache import invalidar_usuario
+from .horarios import invalidar_quadro
+from .models import Materia, MateriaStats, Tarefa, Prova, MaterialDeApoio, HorarioAula
+from .trabalhos import enfileirar_pdf
+
+
+# Ligado por em_lote(): quem faz a operação em massa recalcula estatísticas e cache uma vez só
+operacao_em_lote = ContextVar('operacao_em_lote', default=False)
+
+
+@contextmanager
+def em_lote():
+    """Suspende os ajustes por objeto dos receivers durante operações em massa."""
+    token = operacao_em_lote.set(True)
+    try:
+        yield
+    finally:
+        operacao_em_lote.reset(token)
+
+
+def ajustar_stats(materia_id=None, prova_id=None, **deltas):
+    """
+    Soma os deltas aos contadores da matéria com um único UPDATE (sem ler a linha).
+    A matéria pode ser indicada diretamente ou pela prova a que o objeto pertence.
+    """
+    if operacao_em_lote.get():
+        return
+    deltas = {campo: Greatest(F(campo) + valor, 0) for campo, valor in deltas.items() if valor}
+    if not deltas:
+        return
+    if materia_id is not None:
+        linhas = MateriaStats.objects.filter(materia_id=materia_id)
+    elif prova_id is not None:
+        linhas = MateriaStats.objects.filter(materia__provas=prova_id)
+    else:
+        return
+    # Se a linha não existir, materias_com_contadores() a recria na próxima leitura
+    linhas.update(**deltas)
+
+
+# --- Estado original (para saber o que mudou no post_save) ---
+# Lido direto do __dict__ para não disparar consultas em campos adiados por only()/defer()
+
+@receiver(post_init, sender=Tarefa)
+def guardar_estado_tarefa(sender, instance, **kwargs):
+    instance._stats_original = (instance.__dict__.get('materia_id'), instance.__dict__.get('status'))
+
+
+@receiver(post_init, sender=Prova)
+def guardar_estado_prova(sender, instance, **kwargs):
+    instance._stats_original = instance.__dict__.get('materia_id')
+
+
+@receiver(post_init, sender=MaterialDeApoio)
+def guardar_estado_material(sender, instance, **kwargs):
+    instance._stats_original = instance.__dict__.get('prova_id')
+
+
+# --- Matéria ---
+
+@receiver(post_save, sender=Materia)
+def criar_stats_materia(sender, instance, created, **kwargs):
+    if created:
+        MateriaStats.objects.get_or_create(materia=instance)
+
+
+# --- Tarefa ---
+
+@receiver(post_save, sender=Tarefa)
+def atualizar_stats_tarefa(sender, instance, created, **kwargs):
+    materia_antiga, status_antigo = instance._stats_original
+    concluida = int(instance.status == 'C')
+
+    if created:
+        ajustar_stats(instance.materia_id, total_tarefas=1, tarefas_concluidas=concluida)
+    elif materia_antiga is not None and materia_antiga != instance.materia_id:
+        ajustar_stats(materia_antiga, total_tarefas=-1, tarefas_concluidas=-int(status_antigo == 'C'))
+        ajustar_stats(instance.materia_id, total_tarefas=1, tarefas_concluidas=concluida)
+    elif status_antigo is not None and (status_antigo == 'C') != (instance.status == 'C'):
+        ajustar_stats(instance.materia_id, tarefas_concluidas=1 if concluida else -1)
+
+    instance._stats_original = (instance.materia_id, instance.status)
+
+
+@receiver(post_delete, sender=Tarefa)
+def remover_stats_tarefa(sender, instance, **kwargs):
+    ajustar_stats(instance.materia_id, total_tarefas=-1, tarefas_concluidas=-int(instance.status == 'C'))
+
+
+# --- Prova ---
+
+@receiver(post_save, sender=Prova)
+def atualizar_stats_prova(sender, instance, created, **kwargs):
+    materia_antiga = instance._stats_original
+
+    if created:
+        ajustar_stats(instance.materia_id, total_provas=1)
+    elif materia_antiga is not None and materia_antiga != instance.materia_id:
+        # Os materiais da prova acompanham a troca de matéria
+        materiais = instance.materiais.count()
+        ajustar_stats(materia_antiga, total_provas=-1, total_materiais=-materiais)
+        ajustar_stats(instance.materia_id, total_provas=1, total_materiais=materiais)
+
+    instance._stats_original = instance.materia_id
+
+
+@receiver(post_delete, sender=Prova)
+def remover_stats_prova(sender, instance, **kwargs):
+    # Os materiais removidos em cascata já descontaram total_materiais no próprio post_delete
+    ajustar_stats(instance.materia_id, total_provas=-1)
+
+
+# --- Material de Apoio ---
+
+@receiver(post_save, sender=MaterialDeApoio)
+def atualizar_stats_material(sender, instance, created, **kwargs):
+    prova_antiga = instance._stats_original
+
+    if created:
+        ajustar_stats(prova_id=instance.prova_id, total_materiais=1)
+    elif prova_antiga is not None and prova_antiga != instance.prova_id:
+        ajustar_stats(prova_id=prova_antiga, total_materiais=-1)
+        ajustar_stats(prova_id=instance.prova_id, total_materiais=1)
+
+    instance._stats_original = instance.prova_id
+
+
+@receiver(post_delete, sender=MaterialDeApoio)
+def remover_stats_material(sender, instance, **kwargs):
+    ajustar_stats(prova_id=instance.prova_id, total_materiais=-1)
+
+
+@receiver(post_save, sender=MaterialDeApoio)
+def processar_arquivo_material(sender, instance, created, **kwargs):
+    # Texto e miniatura dos PDFs são extraídos pelo run_workers, fora da requisição
+    if created and instance.tipo == 'PDF' and instance.sha256:
+        sha256 = instance.sha256
+        transaction.on_commit(lambda: enfileirar_pdf(sha256))
+
+
+@receiver(post_delete, sender=MaterialDeApoio)
+def liberar_arquivo_material(sender, instance, **kwargs):
+    # Também em lote e em cascata: o conteúdo some só quando nenhum material aponta para ele
+    agendar_liberacao(instance.__dict__.get('sha256'))
+
+
+# --- Invalidação do cache por usuário ---
+
+def usuario_do_objeto(instance):
+    """Dono do objeto, usando a matéria/prova já carregada quando possível."""
+    # Memorizado por FK: a invalidação do cache e o índice de busca perguntam o mesmo no mesmo save
+    chave = (instance.__dict__.get('materia_id'), instance.__dict__.get('prova_id'))
+    memo = instance.__dict__.get('_dono_memo')
+    if memo is not None and memo[0] == chave:
+        return memo[1]
+    usuario_id = _consultar_dono(instance)
+    instance._dono_memo = (chave, usuario_id)
+    return usuario_id
+
+
+def _consultar_dono(instance):
+    if isinstance(instance, Materia):
+        return instance.usuario_id
+    if isinstance(instance, MaterialDeApoio):
+        if MaterialDeApoio.prova.is_cached(instance) and Prova.materia.is_cached(instance.prova):
+            return instance.prova.materia.usuario_id
+        return Prova.objects.filter(pk=instance.prova_id).values_list('materia__usuario_id', flat=True).first()
+    if type(instance).materia.is_cached(instance):
+        return instance.materia.usuario_id
+    return Materia.objects.filter(pk=instance.materia_id).values_list('usuario_id', flat=True).first()
+
+
+def invalidar_cache_usuario(sender, instance, origin=None, **kwargs):
+    if operacao_em_lote.get():
+        return
+    # Em exclusões em cascata, só o objeto de origem invalida (evita uma consulta por filho);
+    # se a origem é o próprio usuário sendo excluído, não há o que invalidar
+    if origin is not None and isinstance(origin, (User, Materia, Prova)) and origin is not instance:
+        return
+    usuario_id = usuario_do_objeto(instance)
+    invalidar_usuario(usuario_id)
+    # O quadro semanal tem cache próprio: só horários e matérias (nome/sigla) o alteram
+    if isinstance(instance, (Materia, HorarioAula)):
+        invalidar_quadro(usuario_id)
+
+
+for modelo in (Materia, Tarefa, Prova, MaterialDeApoio, HorarioAula):
+    post_save.connect(invalidar_cache_usuario, sender=modelo, dispatch_uid=f'invalidar_cache_{modelo.__name__}')
+    post_delete.connect(invalidar_cache_usuario, sender=modelo, dispatch_uid=f'invalidar_cache_del_{modelo.__name__}')
+
+
+# --- Índice de busca (FTS5) ---
+# Operações em massa atualizam o índice por conta própria (agenda.busca.indexar/remover)
+
+def indexar_busca(sender, instance, **kwargs):
+    if operacao_em_lote.get():
+        return
+    indexar(TIPO_DO_MODELO[sender], [instance], usuario_do_objeto(instance))
+
+
+def remover_da_busca(sender, instance, **kwargs):
+    if operacao_em_lote.get():
+        return
+    remover(TIPO_DO_MODELO[sender], [instance.pk])
+
+
+for modelo in TIPO_DO_MODELO:
+    post_save.connect(indexar_busca, sender=modelo, dispatch_uid=f'indexar_busca_{modelo.__name__}')
+    post_delete.connect(remover_da_busca, sender=modelo, dispatch_uid=f'remover_busca_{modelo.__name__}')
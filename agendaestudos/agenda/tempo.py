@@ -0,0 +1,90 @@
+# Em agenda/tempo.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.utils import timezone
+
+# "Agora" da requisição em andamento, fixado por agenda.middleware.AgoraRequisicaoMiddleware:
+# todas as linhas de uma página são calculadas contra o mesmo instante
+agora_requisicao = ContextVar('agora_requisicao', default=None)
+
+
+def agora():
+    """Instante da requisição atual (ou timezone.now() fora de uma requisição)."""
+    return agora_requisicao.get() or timezone.now()
+
+
+@contextmanager
+def agora_fixo(momento=None):
+    token = agora_requisicao.set(momento or timezone.now())
+    try:
+        yield agora_requisicao.get()
+    finally:
+        agora_requisicao.reset(token)
+
+
+# --- Tempo restante das tarefas ---
+
+def faixa_tempo_restante(segundos):
+    """
+    Reduz os segundos até data_fim (negativos se já passou) à faixa que o texto mostra:
+    ('vencida', dias, horas) ou ('faltam', dias, horas, minutos). Muitas tarefas caem na
+    mesma faixa, e o texto de cada faixa é montado uma vez só (texto_da_faixa).
+    As contas são as mesmas (em float) do filtro original, para o texto não mudar.
+    """
+    if segundos <= 0:
+        total_horas = int(-segundos // 3600)
+        if total_horas > 48:
+            return ('vencida', int(total_horas // 24), 0)
+        return ('vencida', 0, total_horas)
+
+    dias = int(segundos // 86400)
+    segundos -= dias * 86400
+    horas = int(segundos // 3600)
+    segundos -= horas * 3600
+    # Os minutos só aparecem quando não há dias nem horas
+    minutos = int(segundos // 60) if dias == 0 and horas == 0 else 0
+    return ('faltam', dias, horas, minutos)
+
+
+@lru_cache(maxsize=4096)
+def texto_da_faixa(faixa):
+    if faixa[0] == 'vencida':
+        _, dias, horas = faixa
+        if dias:
+            return f"❌ Vencida há {dias} dias"
+        if horas > 0:
+            return f"❌ Vencida há {horas} horas"
+        return "❌ VENCIDA AGORA"
+
+    _, dias, horas, minutos = faixa
+    partes = []
+    if dias > 0:
+        partes.append(f"{dias} dia{'s' if dias > 1 else ''}")
+    if horas > 0:
+        partes.append(f"{horas} hora{'s' if horas > 1 else ''}")
+    if minutos > 0:
+        partes.append(f"{minutos} minuto{'s' if minutos > 1 else ''}")
+    if not partes:
+        return "⏳ Vence em breve..."
+    return f"⏳ Faltam {', '.join(partes)}"
+
+
+def formatar_tempo_restante(data_fim, momento):
+    """'Faltam X dias e Y horas' / 'Vencida há Z horas' de data_fim em relação a `momento`."""
+    if data_fim is None:
+        return ""
+    return texto_da_faixa(faixa_tempo_restante((data_fim - momento).total_seconds()))
+
+
+def anotar_tempo_restante(tarefas, momento=None):
+    """
+    Preenche tarefa.tempo_restante em todas as tarefas de uma vez, contra o mesmo "agora".
+    Chamada pela view depois de avaliar a página; o template só lê o atributo.
+    """
+    momento = momento or agora()
+    for tarefa in tarefas:
+        tarefa.tempo_restante = formatar_tempo_restante(tarefa.data_fim, momento)
+    return tarefas
@@ -1,3 +1,1738 @@
-from django.test import TestCase
+import asyncio
+import base64
+import contextvars
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time as time_module
+import zlib
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template.base import Template
+from django.urls import reverse
+from django.utils import timezone
+
+from .arquivos import TAMANHO_BLOCO, UploadComHashHandler
+from .busca import buscar, reindexar_usuario
+from .calendario import vtimezone
+from .cache import versao_usuario
+from .contadores import CAMPOS_STATS, anotar_contadores
+from .estatisticas import PainelEstatisticas, apainel_em_cache
+from .horarios import QuadroSemanal, quadro_semanal
+from .importacao import TAMANHO_LOTE
+from .instrumentacao import MedicaoRequisicao, impressao_digital, medindo, resumo_rotas
+from .lembretes import (
+    ESPERA_FALHA, MAX_TENTATIVAS, TEMPO_LIMITE_ENVIO, agendar_lembretes, enviar_pendentes, momento_da_prova,
+    provas_entre, tarefas_entre,
+)
+from .links import (
+    LIMITE_CORPO, LIMITE_ICONE, VALIDADE, VALIDADE_FALHA, Resultado, apagar_orfaos, baixar_icone,
+    buscar_todos, gravar_metadados, ler_cabecalho_html, links_pendentes,
+)
+from .models import (
+    ConteudoArquivo, Lembrete, MarcaVarredura, Materia, MateriaStats, Tarefa, Prova, MaterialDeApoio, HorarioAula,
+    MetadadosLink, TokenCalendario, Trabalho,
+)
+from .paginacao import apaginar_por_chave, paginar_por_chave
+from .planejador import (
+    AULA, BLOCO, LIMITE_DIARIO, PROVA, TAREFA, Item, inicio_do_plano, plano_em_cache, planejar,
+)
+from .pdf import LIMITE_STREAM, Documento, ErroPdf, Leitor, extrair_texto
+from .trabalhos import MAX_TENTATIVAS as TENTATIVAS_TRABALHO, TEMPO_LIMITE, TIPOS, enfileirar, falhar, reservar
+from .tempo import agora, agora_fixo, anotar_tempo_restante, formatar_tempo_restante, texto_da_faixa
+from .templatetags.tempo_restante import formatar_tempo_restante as filtro_tempo_restante
+from .views import PROVAS_POR_PAGINA, TAREFAS_POR_PAGINA
+
+
+class DadosMixin:
+    """Cria um usuário com algumas matérias, tarefas, provas e horários."""
+
+    def criar_dados(self, username='aluno', materias=2, tarefas=3, provas=2):
+        usuario = User.objects.create_user(username=username, password='senha-forte-123')
+        agora = timezone.now()
+        for m in range(materias):
+            materia = Materia.objects.create(usuario=usuario, nome=f'Matéria {m}', nomenclatura=f'M{m}')
+            for t in range(tarefas):
+                Tarefa.objects.create(
+                    materia=materia, titulo=f'Tarefa {m}.{t}',
+                    data_inicio=agora + timedelta(days=t), data_fim=agora + timedelta(days=t + 1),
+                    status='C' if t == 0 else 'A', prioridade='A' if t == 1 else 'M',
+                )
+            for p in range(provas):
+                prova = Prova.objects.create(
+                    materia=materia, titulo=f'Prova {m}.{p}',
+                    data_prova=(agora + timedelta(days=7 * (p - 1))).date(),
+                )
+                MaterialDeApoio.objects.create(prova=prova, titulo='Lista', link_url='https://exemplo.com/lista')
+        return usuario
+
+
+class DashboardTests(DadosMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = self.criar_dados()
+        self.client.force_login(self.usuario)
+
+    def test_contadores(self):
+        painel = PainelEstatisticas(self.usuario).calcular()
+        self.assertEqual(painel['total_tarefas'], 6)
+        self.assertEqual(painel['tarefas_concluidas'], 2)
+        self.assertEqual(painel['porcentagem_concluida'], 33)
+        self.assertEqual(painel['total_provas'], 4)
+        self.assertEqual(painel['provas_futuras'], 2)
+        self.assertEqual(painel['all_materias'], 2)
+
+    def test_uma_consulta_por_secao(self):
+        painel = PainelEstatisticas(self.usuario).calcular()
+        self.assertTrue(all(total == 1 for total in painel['consultas_por_secao'].values()))
+
+    def test_proxima_aula_sai_da_lista_do_dia(self):
+        agora = timezone.make_aware(datetime(2025, 11, 3, 10, 0))  # segunda-feira
+        materia = Materia.objects.filter(usuario=self.usuario).first()
+        for hora in (8, 14, 16):
+            HorarioAula.objects.create(materia=materia, dia_semana='SEG', hora_inicio=time(hora))
+
+        painel = PainelEstatisticas(self.usuario, agora=agora).quadro_horarios()
+        self.assertEqual(len(painel['aulas_hoje']), 3)
+        self.assertEqual(painel['proxima_aula'].hora_inicio, time(14))
+
+        painel = PainelEstatisticas(self.usuario, agora=agora.replace(hour=20)).quadro_horarios()
+        self.assertEqual(painel['proxima_aula'].hora_inicio, time(16))
+
+    def test_dashboard_nao_cresce_com_os_dados(self):
+        with self.assertNumQueries(9):
+            self.client.get(reverse('home'))
+        self.criar_dados(username='outro', materias=5, tarefas=10)
+        Tarefa.objects.filter(materia__usuario__username='outro').update(
+            materia=Materia.objects.filter(usuario=self.usuario).first()
+        )
+        cache.clear()
+        with self.assertNumQueries(9):
+            self.client.get(reverse('home'))
+
+    def test_recarga_nao_consulta_tabelas_da_agenda(self):
+        self.client.get(reverse('home'))
+        # Só sessão e usuário
+        with self.assertNumQueries(2):
+            resposta = self.client.get(reverse('home'))
+        self.assertContains(resposta, 'Tarefa 0.1')
+
+        materia = Materia.objects.filter(usuario=self.usuario).first()
+        Tarefa.objects.create(materia=materia, titulo='Nova urgente', prioridade='A',
+                              data_inicio=timezone.now(), data_fim=timezone.now())
+        # Quadro de horários continua em cache: a tarefa nova não toca nos horários
+        with self.assertNumQueries(8):
+            resposta = self.client.get(reverse('home'))
+        self.assertContains(resposta, 'Nova urgente')
+
+    def test_escrita_de_outro_usuario_nao_invalida(self):
+        versao = versao_usuario(self.usuario.pk)
+        self.criar_dados(username='outro', materias=1)
+        self.assertEqual(versao_usuario(self.usuario.pk), versao)
+        Materia.objects.filter(usuario=self.usuario).first().delete()
+        self.assertGreater(versao_usuario(self.usuario.pk), versao)
+
+
+class ContadoresTests(DadosMixin, TestCase):
+    def test_contadores_nao_multiplicam_entre_relacoes(self):
+        usuario = self.criar_dados(materias=1, tarefas=4, provas=3)
+        materia = anotar_contadores(Materia.objects.filter(usuario=usuario)).get()
+        self.assertEqual(materia.total_tarefas, 4)
+        self.assertEqual(materia.tarefas_concluidas, 1)
+        self.assertEqual(materia.tarefas_pendentes, 3)
+        self.assertEqual(materia.total_provas, 3)
+        self.assertEqual(materia.total_materiais, 3)
+
+    def test_materia_sem_relacoes_conta_zero(self):
+        usuario = User.objects.create_user(username='vazio')
+        Materia.objects.create(usuario=usuario, nome='Vazia')
+        materia = anotar_contadores(Materia.objects.filter(usuario=usuario), 'total_tarefas').get()
+        self.assertEqual(materia.total_tarefas, 0)
+
+
+class MateriaStatsTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=2, tarefas=3, provas=2)
+        self.materia, self.outra = Materia.objects.filter(usuario=self.usuario).order_by('pk')
+
+    def assertStatsCorretas(self):
+        esperado = {m['pk']: m for m in anotar_contadores(Materia.objects.all(), *CAMPOS_STATS).values('pk', *CAMPOS_STATS)}
+        for stats in MateriaStats.objects.all():
+            for campo in CAMPOS_STATS:
+                self.assertEqual(getattr(stats, campo), esperado[stats.materia_id][campo], campo)
+
+    def test_signals_mantem_contadores(self):
+        self.assertStatsCorretas()
+
+        tarefa = self.materia.tarefas.exclude(status='C').first()
+        tarefa.status = 'C'
+        tarefa.save(update_fields=['status'])
+        self.assertStatsCorretas()
+
+        tarefa.materia = self.outra
+        tarefa.save()
+        self.assertStatsCorretas()
+
+        prova = self.materia.provas.first()
+        prova.materia = self.outra
+        prova.save()
+        self.assertStatsCorretas()
+
+        prova.delete()
+        self.materia.tarefas.first().delete()
+        self.assertStatsCorretas()
+
+    def test_rebuild_corrige_divergencia(self):
+        MateriaStats.objects.update(total_tarefas=99, total_materiais=0)
+        call_command('rebuild_materia_stats', stdout=StringIO())
+        self.assertStatsCorretas()
+
+    def test_materia_list_le_a_tabela_de_stats(self):
+        self.client.force_login(self.usuario)
+        MateriaStats.objects.filter(materia=self.outra).delete()
+        resposta = self.client.get(reverse('materia_list'))
+        materias = resposta.context['materias']
+        self.assertEqual([m.total_tarefas for m in materias], [3, 3])
+        self.assertEqual(materias[0].percentual_concluido, 33)
+        self.assertTrue(MateriaStats.objects.filter(materia=self.outra).exists())
+
+
+class AgendaEventosTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=1, tarefas=3, provas=2)
+        self.client.force_login(self.usuario)
+
+    def buscar(self, **params):
+        resposta = self.client.get(reverse('agenda_eventos'), params)
+        self.assertTrue(resposta.streaming)
+        return json.loads(b''.join(resposta.streaming_content))
+
+    def test_sem_intervalo_traz_tudo(self):
+        eventos = self.buscar()
+        self.assertEqual(sum(e['extendedProps']['tipo'] == 'Tarefa' for e in eventos), 3)
+        self.assertEqual(sum(e['extendedProps']['tipo'] == 'Prova' for e in eventos), 2)
+
+    def test_respeita_janela_start_end(self):
+        amanha = timezone.localtime() + timedelta(days=1)
+        eventos = self.buscar(start=amanha.isoformat(), end=(amanha + timedelta(days=30)).isoformat())
+        titulos = {e['title'] for e in eventos}
+        self.assertNotIn('Tarefa 0.0', titulos)  # termina em menos de um dia
+        self.assertIn('Tarefa 0.2', titulos)
+        self.assertFalse(titulos & {'Prova 0.0', 'Prova 0.1'})
+
+        ontem = timezone.localtime() - timedelta(days=1)
+        eventos = self.buscar(start=ontem.date().isoformat(), end=(ontem + timedelta(days=30)).date().isoformat())
+        self.assertEqual({e['title'] for e in eventos} & {'Prova 0.0', 'Prova 0.1'}, {'Prova 0.1'})
+
+    def test_so_colunas_do_calendario(self):
+        tarefa = next(e for e in self.buscar() if e['extendedProps']['tipo'] == 'Tarefa')
+        self.assertEqual(set(tarefa), {'id', 'title', 'start', 'end', 'color', 'extendedProps'})
+        self.assertNotIn('descricao', tarefa['extendedProps'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é específico do SQLite')
+class PlanoConsultaTests(DadosMixin, TestCase):
+    TABELAS = ('agenda_tarefa', 'agenda_prova', 'agenda_horarioaula', 'agenda_materia')
+
+    def setUp(self):
+        self.usuario = self.criar_dados()
+
+    def plano(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [linha[-1] for linha in cursor.fetchall()]
+
+    def assertSemVarreduraCompleta(self, queryset):
+        plano = self.plano(queryset)
+        for linha in plano:
+            for tabela in self.TABELAS:
+                # "SCAN tabela" (mesmo "USING INDEX") percorre a tabela/índice inteiro
+                self.assertFalse(
+                    linha.startswith(f'SCAN {tabela}'),
+                    f'Varredura completa em {tabela}: {plano}',
+                )
+
+    def test_consultas_quentes_usam_indices(self):
+        hoje = timezone.localdate()
+        consultas = [
+            Tarefa.objects.filter(materia__usuario=self.usuario).order_by('data_inicio'),
+            Tarefa.objects.filter(materia__usuario=self.usuario, status='A', prioridade='A'),
+            Tarefa.objects.filter(materia__usuario=self.usuario, status__in=['A', 'E']).order_by('data_fim')[:5],
+            Prova.objects.filter(materia__usuario=self.usuario).order_by('data_prova'),
+            Prova.objects.filter(materia__usuario=self.usuario, data_prova__gte=hoje).order_by('data_prova')[:5],
+            HorarioAula.objects.filter(materia__usuario=self.usuario, dia_semana='SEG').order_by('hora_inicio'),
+            Materia.objects.filter(usuario=self.usuario).order_by('nome'),
+            # Varredura dos lembretes (todos os usuários, por faixa de tempo)
+            tarefas_entre(timezone.now(), timezone.now() + timedelta(hours=1)),
+            provas_entre(timezone.now(), timezone.now() + timedelta(hours=1)),
+            # Entradas do plano de estudos
+            Tarefa.objects.filter(materia__usuario=self.usuario, status__in=['A', 'E'], data_fim__gt=timezone.now()),
+            Prova.objects.filter(materia__usuario=self.usuario, data_prova__gte=hoje,
+                                 data_prova__lte=hoje + timedelta(days=21)),
+        ]
+        for queryset in consultas:
+            with self.subTest(sql=str(queryset.query)):
+                self.assertSemVarreduraCompleta(queryset)
+
+
+class ProvaListTests(DadosMixin, TestCase):
+    def test_numero_de_consultas_nao_depende_das_provas(self):
+        usuario = self.criar_dados(materias=1, tarefas=0, provas=2)
+        self.client.force_login(usuario)
+        # sessão, usuário, marca d'água, provas, materiais (prefetch), metadados dos links e matérias do filtro
+        with self.assertNumQueries(7):
+            resposta = self.client.get(reverse('prova_list'))
+        self.assertContains(resposta, 'Materiais (1)', count=2)
+
+        materia = Materia.objects.get(usuario=usuario)
+        for p in range(50):
+            prova = Prova.objects.create(materia=materia, titulo=f'Extra {p}', data_prova=timezone.localdate())
+            MaterialDeApoio.objects.create(prova=prova, titulo='Resumo', link_url='https://exemplo.com/resumo')
+        with self.assertNumQueries(7):
+            resposta = self.client.get(reverse('prova_list'))
+        self.assertContains(resposta, 'Materiais (1)', count=PROVAS_POR_PAGINA)
+
+
+class PaginacaoTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=1, tarefas=0, provas=0)
+        self.materia = Materia.objects.get(usuario=self.usuario)
+
+    def percorrer(self, queryset, campo, tamanho):
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar_por_chave(queryset, campo, cursor, tamanho)
+            vistos.extend(item.pk for item in pagina)
+            if not pagina.tem_proxima:
+                return vistos
+            cursor = pagina.proximo_cursor
+
+    def test_percorre_tudo_sem_repetir_com_datas_iguais_e_nulas(self):
+        data = timezone.localdate()
+        for p in range(7):
+            Prova.objects.create(materia=self.materia, titulo=f'P{p}', data_prova=data if p % 3 else None)
+        esperado = list(Prova.objects.order_by(F('data_prova').asc(nulls_last=True), 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.percorrer(Prova.objects.all(), 'data_prova', 2), esperado)
+
+    def test_pagina_estavel_ao_concluir_tarefas(self):
+        agora = timezone.now()
+        for t in range(6):
+            Tarefa.objects.create(materia=self.materia, titulo=f'T{t}', data_inicio=agora + timedelta(hours=t),
+                                  data_fim=agora + timedelta(days=1))
+        pendentes = Tarefa.objects.filter(status='A')
+        primeira = paginar_por_chave(pendentes, 'data_inicio', None, 2)
+        Tarefa.objects.filter(pk__in=[t.pk for t in primeira]).update(status='C')
+        segunda = paginar_por_chave(pendentes, 'data_inicio', primeira.proximo_cursor, 2)
+        self.assertEqual([t.titulo for t in segunda], ['T2', 'T3'])
+
+    def test_lista_de_tarefas_mantem_filtros_no_link(self):
+        self.client.force_login(self.usuario)
+        agora = timezone.now()
+        for t in range(TAREFAS_POR_PAGINA + 1):
+            Tarefa.objects.create(materia=self.materia, titulo=f'T{t}', data_inicio=agora, data_fim=agora)
+        resposta = self.client.get(reverse('tarefa_list'), {'status': 'A'})
+        self.assertEqual(len(resposta.context['tarefas']), TAREFAS_POR_PAGINA)
+        cursor = resposta.context['pagina'].proximo_cursor
+        self.assertContains(resposta, f'?status=A&amp;cursor={cursor}')
+        resposta = self.client.get(reverse('tarefa_list'), {'status': 'A', 'cursor': cursor})
+        self.assertEqual(len(resposta.context['tarefas']), 1)
+
+
+@override_settings(AGENDA_INSTRUMENTACAO=True)
+class InstrumentacaoTests(DadosMixin, TestCase):
+    def setUp(self):
+        resumo_rotas.limpar()
+        self.usuario = self.criar_dados(materias=1)
+        self.client.force_login(self.usuario)
+
+    def test_server_timing(self):
+        resposta = self.client.get(reverse('tarefa_list'))
+        cabecalho = resposta['Server-Timing']
+        for metrica in ('sql;dur=', 'dup;desc=', 'tpl;dur=', 'view;dur='):
+            self.assertIn(metrica, cabecalho)
+
+    async def test_server_timing_na_view_assincrona(self):
+        await self.async_client.aforce_login(self.usuario)
+        resposta = await self.async_client.get(reverse('tarefa_list_async'))
+        consultas = int(re.search(r'sql;dur=[\d.]+;desc="(\d+) consultas"', resposta['Server-Timing']).group(1))
+        self.assertGreater(consultas, 0)
+        self.assertIn('tarefa_list_async', resumo_rotas.resumo())
+
+    def test_consultas_de_outras_threads_e_template_restaurado(self):
+        self.client.get(reverse('tarefa_list'))  # carrega o middleware
+        render_original = Template.render
+
+        def consultar():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+
+        with medindo(MedicaoRequisicao()) as medicao:
+            self.assertIsNot(Template.render, render_original)
+            # Como no sync_to_async: outra thread (outra conexão), mesmo contexto
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(consultar,))
+            thread.start()
+            thread.join()
+        self.assertEqual(medicao.consultas, 1)
+        self.assertIs(Template.render, render_original)
+
+    def test_impressao_digital_agrupa_consultas_iguais(self):
+        self.assertEqual(
+            impressao_digital("SELECT * FROM t WHERE id = 1 AND nome = 'a' AND x IN (1, 2, 3)"),
+            impressao_digital("SELECT  * FROM t WHERE id = 27 AND nome = 'b''c' AND x IN (4)"),
+        )
+
+    def test_resumo_por_rota_so_para_equipe(self):
+        for _ in range(3):
+            self.client.get(reverse('tarefa_list'))
+        self.client.get(reverse('prova_list'))
+
+        resposta = self.client.get(reverse('instrumentacao_resumo'))
+        self.assertEqual(resposta.status_code, 302)
+
+        self.usuario.is_staff = True
+        self.usuario.save()
+        rotas = self.client.get(reverse('instrumentacao_resumo')).json()['rotas']
+        self.assertEqual(rotas['tarefa_list']['requisicoes'], 3)
+        self.assertEqual(rotas['prova_list']['requisicoes'], 1)
+        self.assertIn('p95', rotas['tarefa_list']['tempo_ms'])
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_e_runner_de_views(self):
+        call_command('seed_benchmark_data', usuarios=2, materias=2, tarefas=5, provas=2, materiais=1,
+                     horarios=1, stdout=StringIO())
+        self.assertEqual(Tarefa.objects.filter(materia__usuario__username='bench-1').count(), 10)
+        self.assertEqual(MateriaStats.objects.get(materia__usuario__username='bench-0', materia__nome='Matéria 0').total_tarefas, 5)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            saida = Path(pasta) / 'resultado.json'
+            call_command('benchmark_views', repeticoes=2, host='testserver', saida=str(saida),
+                         baseline=str(Path(pasta) / 'inexistente.json'), stdout=StringIO())
+            resultado = json.loads(saida.read_text())
+        self.assertEqual(resultado['home']['status'], 200)
+        self.assertEqual(resultado['tarefa_list']['status'], 200)
+        self.assertNotIn('tarefa_concluir', resultado)
+        self.assertIn('p95_ms', resultado['prova_list'])
+
+    def test_comparacao_acusa_regressao(self):
+        from .management.commands.benchmark_views import Command
+        baseline = {'home': {'p95_ms': 10, 'consultas': 2}}
+        self.assertEqual(Command().comparar(baseline, {'home': {'p95_ms': 12, 'consultas': 2}}, 0.5), [])
+        self.assertEqual(len(Command().comparar(baseline, {'home': {'p95_ms': 30, 'consultas': 3}}, 0.5)), 2)
+
+
+class TarefaLoteTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=2, tarefas=3, provas=0)
+        self.outro = self.criar_dados(username='outro', materias=1, tarefas=2, provas=0)
+        self.client.force_login(self.usuario)
+        self.minhas = list(Tarefa.objects.filter(materia__usuario=self.usuario).values_list('pk', flat=True))
+        self.alheia = Tarefa.objects.filter(materia__usuario=self.outro).exclude(status='C').first()
+
+    def lote(self, **dados):
+        return self.client.post(reverse('tarefa_lote'), dados, HTTP_ACCEPT='application/json')
+
+    def test_concluir_com_resultado_por_id(self):
+        resposta = self.lote(acao='concluir', ids=self.minhas[:2] + [self.alheia.pk])
+        resultados = resposta.json()['resultados']
+        self.assertEqual(resultados[str(self.minhas[0])], 'ok')
+        self.assertEqual(resultados[str(self.alheia.pk)], 'nao_encontrada')
+        self.assertEqual(Tarefa.objects.filter(pk__in=self.minhas[:2], status='C').count(), 2)
+        self.assertNotEqual(Tarefa.objects.get(pk=self.alheia.pk).status, 'C')
+
+    def test_mover_e_excluir_mantem_estatisticas(self):
+        origem, destino = Materia.objects.filter(usuario=self.usuario).order_by('pk')
+        ids = list(origem.tarefas.values_list('pk', flat=True))
+        self.lote(acao='mover', ids=ids, materia=destino.pk)
+        self.assertEqual(MateriaStats.objects.get(materia=destino).total_tarefas, 6)
+        self.assertEqual(MateriaStats.objects.get(materia=origem).total_tarefas, 0)
+
+        self.lote(acao='excluir', ids=ids[:2])
+        self.assertEqual(MateriaStats.objects.get(materia=destino).total_tarefas, 4)
+
+    def test_nao_move_para_materia_alheia(self):
+        resposta = self.lote(acao='mover', ids=self.minhas, materia=Materia.objects.get(usuario=self.outro).pk)
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_uma_escrita_por_acao(self):
+        ids = self.minhas
+        with CaptureQueriesContext(connection) as consultas:
+            self.lote(acao='prioridade', ids=ids, prioridade='B')
+        escritas = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "agenda_tarefa"')]
+        self.assertEqual(len(escritas), 1)
+        self.assertEqual(Tarefa.objects.filter(pk__in=ids, prioridade='B').count(), len(ids))
+
+    def test_concluir_individual_grava_so_o_status(self):
+        tarefa = Tarefa.objects.filter(pk__in=self.minhas).exclude(status='C').first()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('tarefa_concluir', args=[tarefa.pk]))
+        update = next(q['sql'] for q in consultas if q['sql'].startswith('UPDATE "agenda_tarefa"'))
+        self.assertNotIn('"titulo"', update)
+
+
+class ImportacaoTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=2, tarefas=0, provas=0)
+        self.client.force_login(self.usuario)
+
+    def enviar(self, nome, conteudo, codificacao='utf-8', **dados):
+        arquivo = SimpleUploadedFile(nome, conteudo.encode(codificacao))
+        return self.client.post(reverse('importar'), {'arquivo': arquivo, 'tipo': 'tarefa', **dados})
+
+    def test_csv_em_varios_lotes_com_erros_por_linha(self):
+        linhas = ['tipo;materia;titulo;data_inicio;data_fim;data_prova;dia_semana;hora_inicio']
+        total = TAMANHO_LOTE * 2 + 10
+        linhas += [f'tarefa;m{i % 2};Tarefa {i};2025-03-01 10:00;2025-03-02;;;' for i in range(total)]
+        linhas += [
+            'prova;Matéria 1;P1;;;2025-04-10;;',
+            'horario;M0;;;;;QUA;08:00',
+            'tarefa;Inexistente;X;2025-03-01;2025-03-02;;;',
+            'tarefa;M0;Sem data;ontem;2025-03-02;;;',
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.enviar('dados.csv', '\n'.join(linhas))
+        resultado = resposta.context['resultado']
+
+        self.assertEqual(resultado.criados, {'tarefa': total, 'prova': 1, 'horario': 1})
+        self.assertEqual([linha for linha, _ in resultado.erros], [total + 4, total + 5])
+        self.assertIn('matéria não encontrada', resultado.erros[0][1])
+        inserts = [q for q in consultas if q['sql'].startswith('INSERT INTO "agenda_tarefa"')]
+        self.assertLess(len(inserts), total // 50)  # em lotes, não uma inserção por linha
+        self.assertEqual(MateriaStats.objects.get(materia__nomenclatura='M0').total_tarefas, total // 2)
+
+    def test_ics_com_linhas_dobradas(self):
+        conteudo = '\r\n'.join([
+            'BEGIN:VCALENDAR',
+            'BEGIN:VEVENT',
+            'SUMMARY:Lista de exercícios\\, capítulo 2',
+            'CATEGORIES:M0',
+            'DTSTART:20250310T130000Z',
+            'DTEND:20250311T130000Z',
+            'DESCRIPTION:Resolver do 1 ao',
+            '  20',
+            'END:VEVENT',
+            'BEGIN:VEVENT',
+            'SUMMARY:Prova 1',
+            'CATEGORIES:M1',
+            'DTSTART;VALUE=DATE:20250320',
+            'END:VEVENT',
+            'BEGIN:VEVENT',
+            'SUMMARY:Aula',
+            'CATEGORIES:M1',
+            'DTSTART;TZID=America/Sao_Paulo:20250303T080000',
+            'RRULE:FREQ=WEEKLY;BYDAY=MO,WE',
+            'END:VEVENT',
+            'END:VCALENDAR',
+        ])
+        resultado = self.enviar('agenda.ics', conteudo).context['resultado']
+
+        self.assertEqual(resultado.criados, {'tarefa': 1, 'prova': 1, 'horario': 2})
+        tarefa = Tarefa.objects.get(materia__usuario=self.usuario)
+        self.assertEqual(tarefa.titulo, 'Lista de exercícios, capítulo 2')
+        self.assertEqual(tarefa.descricao, 'Resolver do 1 ao 20')
+        self.assertEqual(
+            sorted(HorarioAula.objects.filter(materia__nomenclatura='M1').values_list('dia_semana', flat=True)),
+            ['QUA', 'SEG'],
+        )
+
+    def test_arquivo_fora_de_utf8(self):
+        # O "CSV" padrão do Excel em português sai em cp1252; nada é gravado
+        linhas = ['materia;titulo;data_inicio;data_fim'] + [
+            f'M0;Revisão {i};2025-03-01;2025-03-02' for i in range(TAMANHO_LOTE + 10)
+        ]
+        resposta = self.enviar('excel.csv', '\n'.join(linhas), codificacao='cp1252')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIsNone(resposta.context['resultado'])
+        self.assertFormError(resposta.context['form'], 'arquivo',
+                             'O arquivo precisa estar em UTF-8 (no Excel, salve como "CSV UTF-8").')
+        self.assertFalse(Tarefa.objects.filter(materia__usuario=self.usuario).exists())
+
+
+class CalendarioFeedTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=1, tarefas=2, provas=2)
+        materia = Materia.objects.get(usuario=self.usuario)
+        HorarioAula.objects.create(materia=materia, dia_semana='QUA', hora_inicio=time(10, 0), local='Sala 1, bloco B')
+        self.token = TokenCalendario.objects.create(usuario=self.usuario).token
+        self.url = reverse('calendario_feed', args=[self.token])
+
+    def baixar(self, **cabecalhos):
+        resposta = self.client.get(self.url, **cabecalhos)
+        corpo = b''.join(resposta.streaming_content).decode() if resposta.streaming else ''
+        return resposta, corpo
+
+    def test_feed_com_tarefas_provas_e_aulas_semanais(self):
+        resposta, corpo = self.baixar()
+        self.assertEqual(resposta['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(corpo.count('BEGIN:VEVENT'), 2 + 2 + 1)
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=WE\r\n', corpo)
+        self.assertIn('LOCATION:Sala 1\\, bloco B\r\n', corpo)
+        self.assertTrue(all(len(linha.encode()) <= 75 for linha in corpo.split('\r\n')))
+
+    @override_settings(TIME_ZONE='America/Sao_Paulo')
+    def test_cada_tzid_tem_vtimezone(self):
+        _, corpo = self.baixar()
+        tzids = set(re.findall(r';TZID=([^:;]+)', corpo))
+        self.assertEqual(tzids, {'America/Sao_Paulo'})
+        self.assertEqual(set(re.findall(r'^TZID:(.+)\r$', corpo, re.MULTILINE)), tzids)
+        self.assertIn('TZOFFSETFROM:-0300\r\nTZOFFSETTO:-0300\r\n', corpo)
+        self.assertLess(corpo.index('END:VTIMEZONE'), corpo.index('BEGIN:VEVENT'))
+
+    def test_vtimezone_com_horario_de_verao(self):
+        linhas = vtimezone('Europe/Lisbon', date(2026, 10, 19))
+        self.assertIn('DTSTART:20260329T010000', linhas)
+        indice = linhas.index('DTSTART:20261025T020000')
+        self.assertEqual(linhas[indice - 1:indice + 4],
+                         ['BEGIN:STANDARD', 'DTSTART:20261025T020000', 'TZOFFSETFROM:+0100', 'TZOFFSETTO:+0000', 'TZNAME:WET'])
+
+    def test_304_sem_consultar_tabelas_da_agenda(self):
+        resposta, _ = self.baixar()
+        with CaptureQueriesContext(connection) as consultas:
+            repetida, _ = self.baixar(HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        tabelas = ('agenda_tarefa', 'agenda_prova', 'agenda_horarioaula', 'agenda_materia"')
+        self.assertFalse([q for q in consultas if any(t in q['sql'] for t in tabelas)])
+
+    def test_etag_muda_quando_os_dados_mudam(self):
+        resposta, _ = self.baixar()
+        Tarefa.objects.filter(materia__usuario=self.usuario).first().save()
+        nova, corpo = self.baixar(HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(nova.status_code, 200)
+        self.assertNotEqual(nova['ETag'], resposta['ETag'])
+
+    def test_token_invalido_e_renovacao(self):
+        self.assertEqual(self.client.get(reverse('calendario_feed', args=['nao-existe'])).status_code, 404)
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('calendario_assinatura'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_excluir_usuario_com_dados(self):
+        self.baixar()
+        self.usuario.delete()
+        self.assertFalse(Tarefa.objects.exists())
+
+
+class RespostaCondicionalTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=1, tarefas=2, provas=1)
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('login'))  # como no navegador, o cookie CSRF já existe
+
+    def revalidar(self, url):
+        primeira = self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        return primeira, segunda, consultas
+
+    def test_304_sem_alteracoes_em_todas_as_listas(self):
+        prova = Prova.objects.get(materia__usuario=self.usuario)
+        for url in [reverse('materia_list'), reverse('tarefa_list'), reverse('prova_list'),
+                    reverse('material_list', args=[prova.pk]), reverse('agenda')]:
+            with self.subTest(url=url):
+                primeira, segunda, consultas = self.revalidar(url)
+                self.assertEqual(primeira.status_code, 200)
+                self.assertIn('Cookie', primeira['Vary'])
+                self.assertEqual(segunda.status_code, 304)
+                self.assertFalse([q for q in consultas if '"agenda_tarefa"' in q['sql'] or '"agenda_prova"' in q['sql']])
+
+    def test_alteracao_invalida_a_etag(self):
+        url = reverse('tarefa_list')
+        primeira = self.client.get(url)
+        tarefa = Tarefa.objects.filter(materia__usuario=self.usuario).exclude(status='C').first()
+        antes = tarefa.atualizado_em
+        self.client.get(reverse('tarefa_concluir', args=[tarefa.pk]))
+        tarefa.refresh_from_db()
+        self.assertGreater(tarefa.atualizado_em, antes)
+
+        # A mensagem de sucesso pendente força a renderização; depois disso, a ETag já é outra
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code, 200)
+
+    def test_prazos_mudam_com_o_tempo(self):
+        url = reverse('tarefa_list')
+        primeira = self.client.get(url)
+        daqui_a_pouco = timezone.now() + timedelta(minutes=2)
+        with mock.patch('agenda.condicional.timezone.now', return_value=daqui_a_pouco):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code, 200)
+
+
+class BuscaTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.usuario = self.criar_dados(materias=1, tarefas=0, provas=0)
+        self.outro = self.criar_dados(username='outro', materias=1, tarefas=0, provas=0)
+        self.materia = Materia.objects.get(usuario=self.usuario)
+        self.materia.nome = 'Cálculo Numérico'
+        self.materia.save()
+        agora = timezone.now()
+        self.tarefa = Tarefa.objects.create(
+            materia=self.materia, titulo='Lista de integrais', descricao='Exercícios de cálculo do capítulo 3',
+            data_inicio=agora, data_fim=agora,
+        )
+        Tarefa.objects.create(
+            materia=Materia.objects.get(usuario=self.outro), titulo='Integrais do outro', data_inicio=agora, data_fim=agora,
+        )
+
+    def titulos(self, termo, usuario=None):
+        return [r['titulo'] for r in buscar(usuario or self.usuario, termo)]
+
+    def test_prefixo_sem_acento_e_ranking(self):
+        # 'calc' casa com 'Cálculo' no nome da matéria (peso maior) e na descrição da tarefa
+        self.assertEqual(self.titulos('calc'), ['Cálculo Numérico', 'Lista de integrais'])
+        self.assertEqual(self.titulos('integrais cap'), ['Lista de integrais'])
+        self.assertEqual(self.titulos('integ cap'), [])  # só a última palavra é prefixo
+
+    def test_materia_nao_fica_sempre_por_ultimo(self):
+        # Tarefas criadas depois têm rowid maior; a matéria cujo nome é a própria busca vem antes
+        agora = timezone.now()
+        Tarefa.objects.bulk_create([
+            Tarefa(materia=self.materia, titulo=f'Revisar exercícios de cálculo da lista {n}', data_inicio=agora, data_fim=agora)
+            for n in range(20)
+        ])
+        reindexar_usuario(self.usuario.pk)
+        titulos = self.titulos('calculo')
+        self.assertEqual(titulos[0], 'Cálculo Numérico')
+        self.assertEqual(len(titulos), 22)
+        self.assertEqual(titulos[-1], 'Lista de integrais')  # só na descrição: segunda faixa
+
+        with mock.patch('agenda.busca.CANDIDATOS_FAIXA', 5):
+            self.assertEqual(len(self.titulos('calculo')), 6)
+
+    def test_resultados_apenas_do_usuario(self):
+        self.assertEqual(self.titulos('integrais'), ['Lista de integrais'])
+        self.assertEqual(self.titulos('integrais', self.outro), ['Integrais do outro'])
+
+    def test_indice_acompanha_edicoes_e_exclusoes(self):
+        self.tarefa.titulo = 'Lista de derivadas'
+        self.tarefa.save()
+        self.assertEqual(self.titulos('deriv'), ['Lista de derivadas'])
+
+        prova = Prova.objects.create(materia=self.materia, titulo='P1 derivadas')
+        MaterialDeApoio.objects.create(prova=prova, titulo='Resumo de derivadas', link_url='https://exemplo.com')
+        self.assertEqual(len(self.titulos('deriv')), 3)
+
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('tarefa_lote'), {'acao': 'excluir', 'ids': [self.tarefa.pk]})
+        self.assertEqual(len(self.titulos('deriv')), 2)
+
+        self.materia.delete()
+        self.assertEqual(self.titulos('deriv'), [])
+
+    def test_view_e_fallback_sem_fts(self):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('busca'), {'q': 'integrais'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resposta.json()['resultados'][0]['url'], reverse('tarefa_update', args=[self.tarefa.pk]))
+
+        with mock.patch('agenda.busca.fts_disponivel', return_value=False):
+            self.assertEqual(self.titulos('Lista integ'), ['Lista de integrais'])
+            self.assertEqual(self.titulos('capítulo'), ['Lista de integrais'])
+
+
+class HorariosSemanaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(username='aluno', password='senha-forte-123')
+        self.materia = Materia.objects.create(usuario=self.usuario, nome='Física', nomenclatura='FIS1')
+        for dia, hora in [('SAB', 8), ('SEG', 14), ('QUA', 10), ('SEG', 8), ('DOM', 9)]:
+            HorarioAula.objects.create(materia=self.materia, dia_semana=dia, hora_inicio=time(hora))
+
+    def test_ordenacao_segue_os_dias_da_semana(self):
+        dias = list(HorarioAula.objects.values_list('dia_semana', 'hora_inicio'))
+        self.assertEqual(dias, [('SEG', time(8)), ('SEG', time(14)), ('QUA', time(10)), ('SAB', time(8)), ('DOM', time(9))])
+
+    def test_proxima_aula_por_bisect_sem_consultas(self):
+        quadro = quadro_semanal(self.usuario.pk)
+        segunda = timezone.make_aware(datetime(2025, 11, 3, 9, 0))
+        with self.assertNumQueries(0):
+            self.assertEqual(quadro.proxima_de_hoje(0, time(9)).hora_inicio, time(14))
+            self.assertEqual([a.hora_inicio for a in quadro.restantes_do_dia(0, time(8))], [time(8), time(14)])
+            self.assertEqual(quadro.proxima_na_semana(segunda)[0], 0)
+            # Depois da última aula de domingo, dá a volta para segunda
+            dia, aula = quadro.proxima_na_semana(segunda + timedelta(days=6, hours=3))
+            self.assertEqual((dia, aula.hora_inicio), (0, time(8)))
+            self.assertEqual(aula.materia.nome, 'Física')
+            self.assertEqual(quadro_semanal(self.usuario.pk).dias, quadro.dias)
+        self.assertEqual(QuadroSemanal([]).proxima_na_semana(segunda), (None, None))
+
+    def test_formset_invalida_o_quadro(self):
+        self.assertEqual(len(quadro_semanal(self.usuario.pk)), 5)
+        self.client.force_login(self.usuario)
+        horarios = list(self.materia.horarios.all())
+        dados = {
+            'nome': 'Física', 'nomenclatura': 'FIS1', 'notas_materia': '', 'link_plano_ensino': '',
+            'horarioaula_set-TOTAL_FORMS': len(horarios) + 1,
+            'horarioaula_set-INITIAL_FORMS': len(horarios),
+            'horarioaula_set-MIN_NUM_FORMS': 0,
+            'horarioaula_set-MAX_NUM_FORMS': 1000,
+        }
+        for i, horario in enumerate(horarios + [None]):
+            dados.update({
+                f'horarioaula_set-{i}-id': horario.pk if horario else '',
+                f'horarioaula_set-{i}-dia_semana': horario.dia_semana if horario else 'TER',
+                f'horarioaula_set-{i}-hora_inicio': horario.hora_inicio.strftime('%H:%M') if horario else '19:00',
+                f'horarioaula_set-{i}-local': '',
+            })
+        dados['horarioaula_set-0-DELETE'] = 'on'
+        resposta = self.client.post(reverse('materia_update', args=[self.materia.pk]), dados)
+        self.assertRedirects(resposta, reverse('materia_list'))
+
+        quadro = quadro_semanal(self.usuario.pk)
+        self.assertEqual(len(quadro), 5)
+        self.assertEqual([a.hora_inicio for a in quadro.aulas_do_dia(1)], [time(19)])
+        self.assertEqual([a.hora_inicio for a in quadro.aulas_do_dia(0)], [time(14)])
+
+    def test_pagina_da_semana(self):
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('horarios_semana'))
+        with self.assertNumQueries(3):  # sessão, usuário e marca d'água
+            resposta = self.client.get(reverse('horarios_semana'))
+        dias = [nome for _, nome, _ in resposta.context['semana']]
+        self.assertEqual(dias[0], 'Segunda-feira')
+        self.assertEqual(len(dias), 7)
+        self.assertEqual(resposta.context['total_aulas'], 5)
+        self.assertIsNotNone(resposta.context['proxima_aula'])
+
+
+class ViewsAssincronasTests(DadosMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = self.criar_dados(materias=2, tarefas=4, provas=2)
+        for dia in ('SEG', 'QUA'):
+            HorarioAula.objects.create(materia=Materia.objects.filter(usuario=self.usuario).first(),
+                                       dia_semana=dia, hora_inicio=time(10))
+
+    async def test_painel_assincrono_igual_ao_sincrono(self):
+        esperado = await sync_to_async(PainelEstatisticas(self.usuario).calcular)()
+        cache.clear()
+        dados = await apainel_em_cache(self.usuario)
+        for chave in ('total_tarefas', 'tarefas_concluidas', 'porcentagem_concluida', 'total_provas',
+                      'provas_futuras', 'all_materias', 'dia_semana_display'):
+            self.assertEqual(dados[chave], esperado[chave], chave)
+        for chave in ('tarefas_urgentes', 'tarefas_proximas', 'proximas_provas', 'materias', 'aulas_hoje'):
+            self.assertEqual([o.pk for o in dados[chave]], [o.pk for o in esperado[chave]], chave)
+
+    async def test_paginacao_assincrona_mesmos_cursores(self):
+        tarefas = Tarefa.objects.filter(materia__usuario=self.usuario)
+        esperado = await sync_to_async(paginar_por_chave)(tarefas, 'data_inicio', None, 3)
+        pagina = await apaginar_por_chave(tarefas, 'data_inicio', None, 3)
+        self.assertEqual([t.pk for t in pagina], [t.pk for t in esperado])
+        self.assertEqual(pagina.proximo_cursor, esperado.proximo_cursor)
+        vistas = [t.pk for t in pagina]
+        while pagina.tem_proxima:
+            pagina = await apaginar_por_chave(tarefas, 'data_inicio', pagina.proximo_cursor, 3)
+            vistas += [t.pk for t in pagina]
+        self.assertEqual(sorted(vistas), sorted([t.pk async for t in tarefas]))
+
+    def normalizar(self, resposta):
+        # O token CSRF é mascarado de novo a cada renderização; a URL de retorno dos formulários é a da página
+        return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b'', resposta.content).replace(b'/async/', b'/')
+
+    def test_paginas_assincronas_iguais_as_sincronas(self):
+        self.client.force_login(self.usuario)
+        prova = Prova.objects.filter(materia__usuario=self.usuario).first()
+        for nome, kwargs in [('home', {}), ('agenda', {}), ('materia_list', {}), ('tarefa_list', {}),
+                             ('prova_list', {}), ('material_list', {'prova_pk': prova.pk})]:
+            with self.subTest(nome=nome):
+                sincrona = self.client.get(reverse(nome, kwargs=kwargs))
+                assincrona = self.client.get(reverse(f'{nome}_async', kwargs=kwargs))
+                self.assertEqual(assincrona.status_code, 200)
+                self.assertEqual(self.normalizar(assincrona), self.normalizar(sincrona))
+
+    async def test_dono_e_resposta_condicional(self):
+        await self.async_client.aforce_login(self.usuario)
+        outro = await sync_to_async(self.criar_dados)(username='outro', materias=1, provas=1)
+        prova_do_outro = await Prova.objects.filter(materia__usuario=outro).afirst()
+        resposta = await self.async_client.get(reverse('material_list_async', args=[prova_do_outro.pk]))
+        self.assertEqual(resposta.status_code, 404)
+
+        url = reverse('materia_list_async')
+        await self.async_client.get(reverse('login'))  # cookie CSRF, que entra na ETag
+        primeira = await self.async_client.get(url)
+        self.assertEqual(primeira.status_code, 200)
+        segunda = await self.async_client.get(url, headers={'if-none-match': primeira['ETag']})
+        self.assertEqual(segunda.status_code, 304)
+
+
+class PerfilProducaoTests(TestCase):
+    def importar_settings_producao(self, **ambiente):
+        sys.modules.pop('agendaestudos.settings_producao', None)
+        with mock.patch.dict(os.environ, ambiente):
+            return importlib.import_module('agendaestudos.settings_producao')
+
+    def test_perfil_escolhido_pelo_ambiente(self):
+        from agendaestudos import modulo_settings
+        with mock.patch.dict(os.environ, {'AGENDA_PERFIL': 'producao'}):
+            self.assertEqual(modulo_settings(), 'agendaestudos.settings_producao')
+        with mock.patch.dict(os.environ, {'AGENDA_PERFIL': ''}):
+            self.assertEqual(modulo_settings(), 'agendaestudos.settings')
+
+    def test_conexoes_persistentes_wal_e_templates_em_cache(self):
+        producao = self.importar_settings_producao(DJANGO_SECRET_KEY='chave-de-teste')
+        banco = producao.DATABASES['default']
+        self.assertFalse(producao.DEBUG)
+        self.assertGreater(banco['CONN_MAX_AGE'], 0)
+        self.assertTrue(banco['CONN_HEALTH_CHECKS'])
+        self.assertIn('journal_mode=WAL', banco['OPTIONS']['init_command'])
+        self.assertEqual(banco['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(producao.CACHES['default']['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        loader, _ = producao.TEMPLATES[0]['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+
+    def test_exige_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.importar_settings_producao(DJANGO_SECRET_KEY='')
+
+    def test_escritores_concorrentes_sem_banco_travado(self):
+        saida = Path(tempfile.mkdtemp()) / 'escritas.json'
+        call_command('benchmark_escritas', processos=4, operacoes=15, perfil=['producao'],
+                     saida=str(saida), stdout=StringIO())
+        resultado = json.loads(saida.read_text())['producao']
+        self.assertEqual(resultado['travadas'], 0)
+        self.assertEqual(resultado['concluidas'], 4 * 15 * 2)
+
+
+class TempoRestanteTests(TestCase):
+    agora = timezone.make_aware(datetime(2025, 11, 3, 12, 0))
+
+    def test_textos_de_cada_faixa(self):
+        casos = {
+            timedelta(days=3, hours=5, minutes=10): '⏳ Faltam 3 dias, 5 horas',
+            timedelta(days=1, minutes=30): '⏳ Faltam 1 dia',
+            timedelta(hours=1, minutes=59): '⏳ Faltam 1 hora',
+            timedelta(minutes=2, seconds=30): '⏳ Faltam 2 minutos',
+            timedelta(seconds=59): '⏳ Vence em breve...',
+            timedelta(0): '❌ VENCIDA AGORA',
+            -timedelta(minutes=59): '❌ VENCIDA AGORA',
+            -timedelta(hours=5): '❌ Vencida há 5 horas',
+            -timedelta(hours=48): '❌ Vencida há 48 horas',
+            -timedelta(hours=49): '❌ Vencida há 2 dias',
+        }
+        for diferenca, texto in casos.items():
+            with self.subTest(diferenca=diferenca):
+                self.assertEqual(formatar_tempo_restante(self.agora + diferenca, self.agora), texto)
+        self.assertEqual(formatar_tempo_restante(None, self.agora), '')
+
+    def test_filtro_usa_o_agora_da_requisicao(self):
+        with agora_fixo(self.agora):
+            self.assertEqual(agora(), self.agora)
+            self.assertEqual(filtro_tempo_restante(self.agora + timedelta(hours=3)), '⏳ Faltam 3 horas')
+        self.assertNotEqual(agora(), self.agora)
+
+    def test_lista_grande_monta_cada_texto_uma_vez(self):
+        tarefas = [Tarefa(data_fim=self.agora + timedelta(minutes=7 * i)) for i in range(5000)]
+        texto_da_faixa.cache_clear()
+        anotar_tempo_restante(tarefas, self.agora)
+        self.assertEqual(tarefas[1].tempo_restante, '⏳ Faltam 7 minutos')
+        self.assertEqual(tarefas[-1].tempo_restante, formatar_tempo_restante(tarefas[-1].data_fim, self.agora))
+        distintos = len({tarefa.tempo_restante for tarefa in tarefas})
+        self.assertEqual(texto_da_faixa.cache_info().misses, distintos)
+        self.assertLess(distintos, 1000)
+
+    def test_pagina_usa_um_instante_por_requisicao(self):
+        usuario = User.objects.create_user(username='aluno')
+        materia = Materia.objects.create(usuario=usuario, nome='Física')
+        agora_real = timezone.now()
+        for horas in (1, 30, -3):
+            Tarefa.objects.create(materia=materia, titulo=f'T{horas}', data_inicio=agora_real,
+                                  data_fim=agora_real + timedelta(hours=horas, minutes=30))
+        self.client.force_login(usuario)
+        with mock.patch('agenda.tempo.timezone.now', return_value=agora_real) as relogio:
+            resposta = self.client.get(reverse('tarefa_list'))
+        self.assertContains(resposta, '⏳ Faltam 1 hora')
+        self.assertContains(resposta, '⏳ Faltam 1 dia, 6 horas')
+        self.assertContains(resposta, '❌ Vencida há 2 horas')
+
+        # O middleware fixa o instante: as linhas não consultam o relógio
+        for i in range(20):
+            Tarefa.objects.create(materia=materia, titulo=f'Extra {i}', data_inicio=agora_real, data_fim=agora_real)
+        with mock.patch('agenda.tempo.timezone.now', return_value=agora_real) as relogio_com_mais_linhas:
+            self.client.get(reverse('tarefa_list'))
+        self.assertEqual(relogio_com_mais_linhas.call_count, relogio.call_count)
+
+
+class ProjecaoListagensTests(DadosMixin, TestCase):
+    def test_listagens_nao_leem_os_textos_longos(self):
+        usuario = self.criar_dados(materias=1, tarefas=3, provas=2)
+        Tarefa.objects.update(descricao='Descrição longa ' * 100)
+        Materia.objects.update(notas_materia='Anotações ' * 100)
+        self.client.force_login(usuario)
+        for rota in ('tarefa_list', 'tarefa_list_async', 'prova_list', 'prova_list_async', 'home'):
+            with self.subTest(rota=rota), CaptureQueriesContext(connection) as consultas:
+                resposta = self.client.get(reverse(rota))
+            self.assertEqual(resposta.status_code, 200)
+            sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+            self.assertNotIn('"descricao"', sql)
+            self.assertNotIn('"notas_materia"', sql)
+
+        tarefa = self.client.get(reverse('tarefa_list')).context['tarefas'].itens[0]
+        self.assertIn('descricao', tarefa.get_deferred_fields())
+        self.assertIn('notas_materia', tarefa.materia.get_deferred_fields())
+        prova = self.client.get(reverse('prova_list')).context['provas'].itens[0]
+        self.assertNotIn('observacoes', prova.get_deferred_fields())
+
+    def test_template_nao_carrega_campo_adiado_por_linha(self):
+        usuario = self.criar_dados(materias=1, tarefas=3, provas=0)
+        self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as poucas:
+            self.client.get(reverse('tarefa_list'))
+        materia = Materia.objects.get(usuario=usuario)
+        agora_real = timezone.now()
+        for i in range(30):
+            Tarefa.objects.create(materia=materia, titulo=f'Extra {i}', descricao='Texto',
+                                  link_anexo='https://exemplo.com', data_inicio=agora_real, data_fim=agora_real)
+        # + 1: agora há links na página (metadados de todos numa consulta)
+        with self.assertNumQueries(len(poucas) + 1):
+            resposta = self.client.get(reverse('tarefa_list'))
+        self.assertContains(resposta, 'Extra 29')
+
+    def test_edicao_carrega_a_descricao(self):
+        usuario = self.criar_dados(materias=1, tarefas=1, provas=0)
+        Tarefa.objects.update(descricao='Ler o capítulo 4 inteiro')
+        self.client.force_login(usuario)
+        tarefa = Tarefa.objects.get(materia__usuario=usuario)
+        self.assertContains(self.client.get(reverse('tarefa_update', args=[tarefa.pk])), 'Ler o capítulo 4 inteiro')
+
+    def test_benchmark_de_memoria(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            saida = Path(pasta) / 'memoria.json'
+            call_command('benchmark_memoria', tarefas=300, materias=3, texto=2000, repeticoes=1,
+                         saida=str(saida), stdout=StringIO())
+            resultado = json.loads(saida.read_text())
+        self.assertLess(resultado['para_lista']['retido_kib'], resultado['completa']['retido_kib'] / 2)
+        self.assertLess(resultado['values']['retido_kib'], resultado['completa']['retido_kib'])
+        self.assertFalse(User.objects.filter(username='benchmark-memoria').exists())
+
+
+class ArquivosMixin:
+    """MEDIA_ROOT temporário e upload de materiais pela view."""
+    conteudo = b'%PDF-1.4\n' + bytes(range(256)) * 2000
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.media = Path(pasta.name)
+        configuracao = override_settings(MEDIA_ROOT=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def enviar(self, usuario, titulo='Resumo', nome='resumo.pdf', conteudo=None):
+        prova = Prova.objects.filter(materia__usuario=usuario).first()
+        self.client.force_login(usuario)
+        arquivo = SimpleUploadedFile(nome, self.conteudo if conteudo is None else conteudo)
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse('material_create', args=[prova.pk]),
+                                        {'titulo': titulo, 'link_url': '', 'arquivo': arquivo})
+        return resposta, MaterialDeApoio.objects.filter(prova__materia__usuario=usuario, titulo=titulo).first()
+
+    def arquivos_guardados(self):
+        return [caminho for caminho in self.media.rglob('*') if caminho.is_file()]
+
+
+class MaterialArquivoTests(ArquivosMixin, DadosMixin, TestCase):
+    def test_upload_guarda_conteudo_uma_vez(self):
+        aluno = self.criar_dados('aluno', materias=1, tarefas=0, provas=1)
+        colega = self.criar_dados('colega', materias=1, tarefas=0, provas=1)
+        resposta, material = self.enviar(aluno)
+        self.assertRedirects(resposta, reverse('material_list', args=[material.prova_id]))
+        _, copia = self.enviar(colega, nome='Prova Antiga.PDF')
+
+        self.assertEqual(material.sha256, copia.sha256)
+        self.assertEqual(material.arquivo.name, copia.arquivo.name)
+        self.assertEqual((material.tipo, material.tamanho, copia.nome_original), ('PDF', len(self.conteudo), 'Prova Antiga.PDF'))
+        self.assertEqual(len(self.arquivos_guardados()), 1)
+        self.assertEqual(self.arquivos_guardados()[0].read_bytes(), self.conteudo)
+
+        # O conteúdo só some quando o último material que aponta para ele é removido
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        self.assertEqual(len(self.arquivos_guardados()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Prova.objects.filter(materia__usuario=colega).delete()
+        self.assertEqual(self.arquivos_guardados(), [])
+
+    def test_formulario_exige_link_ou_arquivo(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        prova = Prova.objects.get(materia__usuario=aluno)
+        self.client.force_login(aluno)
+        url = reverse('material_create', args=[prova.pk])
+        self.assertContains(self.client.post(url, {'titulo': 'Nada'}), 'insira um link válido ou envie um arquivo')
+        ambos = {'titulo': 'Ambos', 'link_url': 'https://exemplo.com',
+                 'arquivo': SimpleUploadedFile('a.pdf', b'%PDF')}
+        self.assertContains(self.client.post(url, ambos), 'não os dois')
+        executavel = {'titulo': 'Exe', 'arquivo': SimpleUploadedFile('virus.exe', b'MZ')}
+        self.assertContains(self.client.post(url, executavel), 'Tipo de arquivo não aceito')
+
+        self.client.post(url, {'titulo': 'Vídeo', 'link_url': 'https://youtu.be/x'})
+        self.assertEqual(MaterialDeApoio.objects.get(titulo='Vídeo').tipo, 'LINK')
+        self.assertEqual(self.arquivos_guardados(), [])
+
+    def test_upload_acima_do_limite_para_no_meio(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        recebidos = []
+        original = UploadComHashHandler.receive_data_chunk
+
+        def receber(handler, dados, inicio):
+            recebidos.append((handler, len(dados)))
+            return original(handler, dados, inicio)
+
+        grande = b'%PDF-1.4\n' + b'\0' * (TAMANHO_BLOCO * 16)
+        with mock.patch('agenda.arquivos.TAMANHO_MAXIMO', TAMANHO_BLOCO), \
+                mock.patch.object(UploadComHashHandler, 'receive_data_chunk', receber):
+            resposta, material = self.enviar(aluno, conteudo=grande)
+        self.assertContains(resposta, 'O arquivo passa do limite')
+        self.assertIsNone(material)
+        # Parou no primeiro bloco acima do limite, e o temporário foi apagado
+        self.assertEqual(len(recebidos), 2)
+        self.assertFalse(os.path.exists(recebidos[0][0].file.temporary_file_path()))
+        self.assertEqual(self.arquivos_guardados(), [])
+
+    def test_download_confere_dono_e_responde_intervalos(self):
+        aluno = self.criar_dados('aluno', materias=1, tarefas=0, provas=1)
+        _, material = self.enviar(aluno)
+        url = reverse('material_arquivo', args=[material.pk])
+        self.assertContains(self.client.get(reverse('material_list', args=[material.prova_id])), url)
+
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(b''.join(resposta.streaming_content), self.conteudo)
+        self.assertEqual(resposta['Content-Length'], str(len(self.conteudo)))
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+        self.assertEqual(resposta['Accept-Ranges'], 'bytes')
+        etag = resposta['ETag']
+
+        total = len(self.conteudo)
+        casos = {
+            'bytes=0-99': (0, 99),
+            'bytes=1000-': (1000, total - 1),
+            'bytes=-10': (total - 10, total - 1),
+            f'bytes=100-{total * 2}': (100, total - 1),
+        }
+        for cabecalho, (inicio, fim) in casos.items():
+            with self.subTest(cabecalho=cabecalho):
+                parcial = self.client.get(url, HTTP_RANGE=cabecalho)
+                self.assertEqual(parcial.status_code, 206)
+                self.assertEqual(parcial['Content-Range'], f'bytes {inicio}-{fim}/{total}')
+                self.assertEqual(parcial['Content-Length'], str(fim - inicio + 1))
+                self.assertEqual(b''.join(parcial.streaming_content), self.conteudo[inicio:fim + 1])
+
+        fora = self.client.get(url, HTTP_RANGE=f'bytes={total}-')
+        self.assertEqual((fora.status_code, fora['Content-Range']), (416, f'bytes */{total}'))
+        # If-Range com outra versão: arquivo inteiro; If-None-Match com a mesma: 304
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outro"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        intruso = self.criar_dados('intruso', materias=1, tarefas=0, provas=1)
+        self.client.force_login(intruso)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(AGENDA_SENDFILE_PREFIXO='/protegido/')
+    def test_download_pelo_servidor_web(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        _, material = self.enviar(aluno)
+        resposta = self.client.get(reverse('material_arquivo', args=[material.pk]))
+        self.assertEqual(resposta['X-Accel-Redirect'], f'/protegido/{material.arquivo.name}')
+        self.assertEqual(resposta.content, b'')
+
+
+def montar_pdf(paginas, fonte_extra=b''):
+    """PDF mínimo com uma página por content stream (comprimidos), para os testes de extração."""
+    objetos = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: (f'<< /Type /Pages /Kids [{" ".join(f"{3 + 2 * i} 0 R" for i in range(len(paginas)))}] '
+            f'/Count {len(paginas)} /Resources << /Font << /F1 90 0 R /F2 91 0 R >> >> >>').encode(),
+        90: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        91: b'<< /Type /Font /Subtype /Type0 /Encoding /Identity-H /ToUnicode 92 0 R >>',
+        92: b'<< /Length %d >>\nstream\n%s\nendstream' % (len(fonte_extra), fonte_extra),
+    }
+    for i, conteudo in enumerate(paginas):
+        comprimido = zlib.compress(conteudo)
+        objetos[3 + 2 * i] = f'<< /Type /Page /Parent 2 0 R /Contents {4 + 2 * i} 0 R >>'.encode()
+        objetos[4 + 2 * i] = b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(comprimido), comprimido)
+    corpo = b''.join(b'%d 0 obj\n%s\nendobj\n' % (numero, objeto) for numero, objeto in sorted(objetos.items()))
+    return b'%PDF-1.4\n' + corpo + b'trailer\n<< /Root 1 0 R >>\n%%EOF\n'
+
+
+PAGINA_WINANSI = 'BT /F1 12 Tf 72 720 Td (Teorema de Pit\\341goras \\(revis\\343o\\)) Tj 0 -14 Td [(Cap) -30 (\\355tulo) -400 (3)] TJ ET'.encode()
+CMAP = b'''begincmap
+1 begincodespacerange <0000> <FFFF> endcodespacerange
+2 beginbfchar <0001> <0047> <0002> <00E1> endbfchar
+1 beginbfrange <0010> <0012> <0061> endbfrange
+endcmap'''
+PAGINA_CMAP = b'BT /F2 12 Tf 72 720 Td <00010002001000110012> Tj /F1 12 Tf T* (Trigonometria) Tj ET'
+
+
+class ExtracaoPdfTests(TestCase):
+    def test_texto_das_paginas(self):
+        texto, paginas = extrair_texto(montar_pdf([PAGINA_WINANSI, PAGINA_CMAP], CMAP))
+        self.assertEqual(paginas, 2)
+        self.assertEqual(texto, 'Teorema de Pitágoras (revisão)\nCapítulo 3\n\nGáabc\nTrigonometria')
+
+    def test_arquivo_que_nao_e_pdf(self):
+        with self.assertRaises(ErroPdf):
+            extrair_texto(b'MZ\x90\x00 executavel')
+
+    def test_aninhamento_e_delimitadores_soltos(self):
+        lixo = b''.join(b'%d 0 obj\n%s\nendobj\n' % (numero, conteudo) for numero, conteudo in [
+            (200, b'[' * 5000), (201, b'<<' * 5000), (202, b']' * 5000 + b'>' * 5000 + b'}' * 5000 + b' 7'),
+        ])
+        documento = montar_pdf([PAGINA_WINANSI + b' [' * 5000, PAGINA_CMAP], CMAP)
+        # Os objetos inválidos vão antes do trailer; as páginas continuam legíveis
+        documento = documento.replace(b'trailer', lixo + b'trailer')
+        texto, paginas = extrair_texto(documento)
+        self.assertEqual(paginas, 2)
+        self.assertEqual(texto, 'Teorema de Pitágoras (revisão)\nCapítulo 3\n\nGáabc\nTrigonometria')
+        objetos = Documento(documento).objetos
+        self.assertNotIn(200, objetos)
+        self.assertEqual(objetos[202], 7)
+        self.assertEqual(Leitor(b'<< /A [1 [2]] /B /C >>').objeto(), {'A': [1, [2]], 'B': 'C'})
+        with self.assertRaises(ValueError):
+            Leitor(b'[' * 5000).objeto()
+
+    def test_descompressao_limitada(self):
+        # Bomba de Flate: poucos KB que descomprimem em dezenas de MB
+        bomba = montar_pdf([b'\0' * (LIMITE_STREAM * 8)])
+        self.assertLess(len(bomba), LIMITE_STREAM // 10)
+        self.assertEqual(len(Documento(bomba).conteudo_stream(4)), LIMITE_STREAM)
+
+        # Orçamento do documento esgotado: a extração para nas páginas já lidas
+        pagina = PAGINA_WINANSI + b' ' * 2000 + b'BT /F1 12 Tf (Escondido) Tj ET'
+        with mock.patch.multiple('agenda.pdf', LIMITE_STREAM=1000, LIMITE_DESCOMPRIMIDO=1500):
+            texto, paginas = extrair_texto(montar_pdf([pagina] * 3))
+        self.assertEqual(paginas, 3)
+        self.assertEqual(texto, '\n\n'.join(['Teorema de Pitágoras (revisão)\nCapítulo 3'] * 2))
+
+
+class TrabalhosFundoTests(ArquivosMixin, DadosMixin, TestCase):
+    conteudo = montar_pdf([PAGINA_WINANSI])
+
+    def test_worker_extrai_texto_do_pdf_enviado(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        _, material = self.enviar(aluno)
+        trabalho = Trabalho.objects.get(tipo='processar_pdf', chave=material.sha256)
+        self.assertEqual(trabalho.status, Trabalho.PENDENTE)
+        url_lista = reverse('material_list', args=[material.prova_id])
+        self.assertContains(self.client.get(url_lista), 'Gerando prévia')
+
+        saida = StringIO()
+        call_command('run_workers', uma_vez=True, processos=1, stdout=saida, stderr=StringIO())
+        self.assertIn('1 trabalho(s) concluído(s), 0 falha(s)', saida.getvalue())
+        trabalho.refresh_from_db()
+        self.assertEqual(trabalho.status, Trabalho.CONCLUIDO)
+        conteudo = ConteudoArquivo.objects.get(sha256=material.sha256)
+        self.assertEqual(conteudo.paginas, 1)
+        self.assertIn('Pitágoras', conteudo.texto)
+
+        # O texto do arquivo entra na busca, e a lista já mostra o resultado sem processar nada
+        self.assertEqual([r['objeto_id'] for r in buscar(aluno, 'pitagoras')], [material.pk])
+        with self.assertNumQueries(7):
+            resposta = self.client.get(url_lista)
+        self.assertContains(resposta, '1 página')
+        self.assertNotContains(resposta, 'Gerando prévia')
+
+        # O mesmo PDF enviado de novo (por outro aluno) não é processado outra vez
+        colega = self.criar_dados('colega', materias=1, tarefas=0, provas=1)
+        _, copia = self.enviar(colega)
+        self.assertEqual(Trabalho.objects.get(chave=material.sha256).status, Trabalho.CONCLUIDO)
+        self.assertEqual([r['objeto_id'] for r in buscar(colega, 'teorema')], [copia.pk])
+
+    def test_miniatura_gravada_aparece_na_lista(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        _, material = self.enviar(aluno)
+        png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+        TIPOS['processar_pdf'].gravar(material.sha256, {'texto': '', 'paginas': 1, 'miniatura': png})
+
+        url = reverse('material_miniatura', args=[material.pk])
+        self.assertContains(self.client.get(reverse('material_list', args=[material.prova_id])), url)
+        resposta = self.client.get(url)
+        self.assertEqual((resposta.status_code, resposta['Content-Type']), (200, 'image/png'))
+        self.assertEqual(b''.join(resposta.streaming_content), png)
+
+        self.client.force_login(self.criar_dados('intruso', materias=1, tarefas=0, provas=1))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        self.assertEqual(self.arquivos_guardados(), [])
+        self.assertFalse(ConteudoArquivo.objects.exists())
+
+    def test_falhas_voltam_para_a_fila_com_espera(self):
+        trabalho = enfileirar('processar_pdf', 'f' * 64)  # conteúdo que não existe em disco
+        erros = StringIO()
+        call_command('run_workers', uma_vez=True, processos=1, stdout=StringIO(), stderr=erros)
+        self.assertIn('tentativa 1', erros.getvalue())
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.tentativas), (Trabalho.PENDENTE, 1))
+        self.assertGreater(trabalho.disponivel_em, timezone.now())
+
+        for dias in (1, 2):
+            futuro = timezone.now() + timedelta(days=dias)
+            [reservado] = reservar(5, agora=futuro)
+            falhar(reservado, FileNotFoundError('sumiu'), agora=futuro)
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.tentativas), (Trabalho.FALHOU, 3))
+        self.assertIn('FileNotFoundError', trabalho.erro)
+
+        # Enfileirar de novo recomeça as tentativas
+        enfileirar('processar_pdf', 'f' * 64)
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.tentativas), (Trabalho.PENDENTE, 0))
+
+    def test_worker_avisa_sem_pdftoppm(self):
+        erros = StringIO()
+        with mock.patch('agenda.pdf.shutil.which', return_value=None):
+            call_command('run_workers', uma_vez=True, processos=1, stdout=StringIO(), stderr=erros)
+        self.assertEqual(erros.getvalue().count('pdftoppm'), 1)
+
+    def test_falha_definitiva_encerra_a_previa(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=1)
+        _, material = self.enviar(aluno, nome='planilha.pdf', conteudo=b'PK\x03\x04 planilha renomeada')
+        url_lista = reverse('material_list', args=[material.prova_id])
+        call_command('run_workers', uma_vez=True, processos=1, stdout=StringIO(), stderr=StringIO())
+        self.assertContains(self.client.get(url_lista), 'Gerando prévia')
+
+        for dias in (1, 2):
+            futuro = timezone.now() + timedelta(days=dias)
+            [reservado] = reservar(5, agora=futuro)
+            falhar(reservado, ErroPdf('O arquivo não é um PDF.'), agora=futuro)
+        self.assertEqual(Trabalho.objects.get(chave=material.sha256).status, Trabalho.FALHOU)
+        self.assertEqual(ConteudoArquivo.objects.get(sha256=material.sha256).paginas, 0)
+        resposta = self.client.get(url_lista)
+        self.assertNotContains(resposta, 'Gerando prévia')
+        self.assertContains(resposta, 'Prévia indisponível')
+
+        # Worker morto em todas as tentativas: o trabalho preso também encerra a prévia
+        trabalho = enfileirar('processar_pdf', 'e' * 64)
+        agora = timezone.now()
+        for _ in range(TENTATIVAS_TRABALHO):
+            agora += TEMPO_LIMITE + timedelta(seconds=1)
+            reservar(5, agora=agora)
+        self.assertEqual(reservar(5, agora=agora + TEMPO_LIMITE + timedelta(seconds=1)), [])
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.erro), (Trabalho.FALHOU, 'Tempo limite excedido.'))
+        self.assertTrue(ConteudoArquivo.objects.filter(sha256='e' * 64, paginas=0).exists())
+
+    def test_reserva_nao_entrega_o_mesmo_trabalho_duas_vezes(self):
+        for numero in range(3):
+            enfileirar('processar_pdf', f'{numero}' * 64)
+        primeiro = reservar(2)
+        segundo = reservar(5)
+        self.assertEqual(len(primeiro), 2)
+        self.assertEqual(len(segundo), 1)
+        self.assertEqual(reservar(5), [])
+        # Um worker que morreu no meio: depois do tempo limite o trabalho é retomado
+        retomados = reservar(5, agora=timezone.now() + TEMPO_LIMITE + timedelta(seconds=1))
+        self.assertEqual(len(retomados), 3)
+        self.assertTrue(all(trabalho.tentativas == 2 for trabalho in retomados))
+
+
+class ServidorStub:
+    """Servidor HTTP local para os testes do atualizar_links: caminho -> (status, cabeçalhos, corpo, atraso)."""
+
+    def __init__(self, rotas):
+        self.rotas = rotas
+        self.acessos = []
+        self.simultaneos = self.maximo_simultaneos = 0
+        trava = threading.Lock()
+        stub = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                caminho = self.path.split('?')[0]
+                with trava:
+                    stub.acessos.append(caminho)
+                    stub.simultaneos += 1
+                    stub.maximo_simultaneos = max(stub.maximo_simultaneos, stub.simultaneos)
+                try:
+                    status, cabecalhos, corpo, atraso = stub.rotas.get(caminho, (404, {}, b'', 0))
+                    time_module.sleep(atraso)
+                    self.send_response(status)
+                    for nome, valor in cabecalhos.items():
+                        self.send_header(nome, valor)
+                    if 'Transfer-Encoding' not in cabecalhos:
+                        self.send_header('Content-Length', str(len(corpo)))
+                    self.end_headers()
+                    self.wfile.write(corpo)
+                finally:
+                    with trava:
+                        stub.simultaneos -= 1
+
+            def log_message(self, *args):
+                pass
+
+        class Servidor(ThreadingHTTPServer):
+            daemon_threads = True
+            block_on_close = False
+
+            def handle_error(self, *args):
+                pass  # cliente que desistiu por tempo esgotado
+
+        self.servidor = Servidor(('127.0.0.1', 0), Tratador)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def url(self, caminho):
+        return f'http://127.0.0.1:{self.servidor.server_port}{caminho}'
+
+    def fechar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+ICONE_PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 24
+ICONE_DATA_URI = 'data:image/png;base64,' + base64.b64encode(ICONE_PNG).decode('ascii')
+
+PAGINA_AULA = (
+    '<!doctype html><html><head><meta charset="iso-8859-1"><title>\n  Aula 3 &amp; exercícios </title>'
+    '<link rel="shortcut icon" href="/icone.png"></head><body>Conteúdo</body></html>'
+).encode('latin-1')
+
+
+@override_settings(AGENDA_LINKS_PERMITIR_REDE_LOCAL=True)
+class MetadadosLinkTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.stub = ServidorStub({
+            '/aula': (200, {'Content-Type': 'text/html'}, PAGINA_AULA, 0),
+            '/antigo': (301, {'Location': '/aula'}, b'', 0),
+            '/lista.pdf': (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.4', 0),
+            '/icone.png': (200, {'Content-Type': 'image/png'}, ICONE_PNG, 0),
+            '/icone-movido.png': (302, {'Location': '/icone.png'}, b'', 0),
+            '/grande.png': (200, {'Content-Type': 'image/png'}, ICONE_PNG + b'\x00' * LIMITE_ICONE, 0),
+            '/falso.png': (200, {'Content-Type': 'text/html'}, b'<script>alert(1)</script>', 0),
+            '/lento': (200, {'Content-Type': 'text/html'}, b'<title>Tarde demais</title>', 2),
+            '/devagar': (200, {'Content-Type': 'text/html'}, b'<title>Ok</title>', 0.2),
+            # Anuncia um pedaço de 1 GiB e manda só o começo, sem fechar a conexão
+            '/enorme': (200, {'Content-Type': 'text/html', 'Transfer-Encoding': 'chunked'},
+                        b'40000000\r\n<title>Grande</title>' + b'x' * (LIMITE_CORPO + 1000), 0),
+        })
+        self.addCleanup(self.stub.fechar)
+
+    def atualizar(self, **opcoes):
+        saida = StringIO()
+        call_command('atualizar_links', uma_vez=True, tempo_limite=0.5, stdout=saida, stderr=StringIO(), **opcoes)
+        return saida.getvalue()
+
+    def test_paginas_mostram_metadados_sem_buscar_nada(self):
+        aluno = self.criar_dados(materias=1, tarefas=1, provas=1)
+        Materia.objects.update(link_plano_ensino=self.stub.url('/lento'))
+        Tarefa.objects.update(link_anexo=self.stub.url('/antigo'))
+        Prova.objects.update(link_anexos=self.stub.url('/sumiu'))
+        MaterialDeApoio.objects.update(link_url=self.stub.url('/lista.pdf'))
+        self.client.force_login(aluno)
+        self.assertContains(self.client.get(reverse('tarefa_list')), '[Ver Material de Apoio]')
+        etag = self.client.get(reverse('materia_list'))['ETag']
+        self.assertEqual(self.stub.acessos, [])
+
+        self.assertIn('2 link(s) atualizado(s), 2 falha(s)', self.atualizar())
+        aula = MetadadosLink.objects.get(url=self.stub.url('/antigo'))
+        self.assertEqual((aula.titulo, aula.favicon, aula.tipo_conteudo, aula.status_http),
+                         ('Aula 3 & exercícios', ICONE_DATA_URI, 'text/html', 200))
+        pdf = MetadadosLink.objects.get(url=self.stub.url('/lista.pdf'))
+        self.assertEqual((pdf.rotulo_tipo, pdf.titulo), ('PDF', ''))
+        self.assertEqual(MetadadosLink.objects.get(url=self.stub.url('/sumiu')).erro, 'HTTP 404')
+        self.assertEqual(MetadadosLink.objects.get(url=self.stub.url('/lento')).erro, 'Tempo esgotado.')
+
+        acessos = len(self.stub.acessos)
+        resposta = self.client.get(reverse('tarefa_list'))
+        self.assertContains(resposta, 'Aula 3 &amp; exercícios')
+        self.assertContains(resposta, f'<img src="{ICONE_DATA_URI}"')
+        self.assertNotContains(resposta, self.stub.url('/icone.png'))
+        self.assertContains(self.client.get(reverse('prova_list')), '<span class="badge text-bg-light">PDF</span>')
+        self.assertContains(self.client.get(reverse('tarefa_list_async')), 'Aula 3 &amp; exercícios')
+        self.assertEqual(len(self.stub.acessos), acessos)
+        # O título novo muda a página: a ETag antiga não vale mais
+        self.assertEqual(self.client.get(reverse('materia_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_falhas_ficam_em_cache_com_validade_crescente(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=0)
+        url = self.stub.url('/sumiu')
+        Materia.objects.filter(usuario=aluno).update(link_plano_ensino=url)
+        self.atualizar()
+        self.atualizar()
+        self.assertEqual(self.stub.acessos, ['/sumiu'])
+        self.assertEqual(links_pendentes(10), [])
+
+        depois = timezone.now() + VALIDADE_FALHA + timedelta(seconds=1)
+        self.assertEqual(links_pendentes(10, agora=depois), [url])
+        gravar_metadados([Resultado(url, 404, erro='HTTP 404')], agora=depois)
+        metadados = MetadadosLink.objects.get(url=url)
+        self.assertEqual((metadados.falhas, metadados.expira_em), (2, depois + 2 * VALIDADE_FALHA))
+
+        # Um link que funcionava e passou a falhar continua mostrando o último título
+        gravar_metadados([Resultado(url, 200, 'text/html', titulo='Plano de ensino')], agora=depois)
+        gravar_metadados([Resultado(url, erro='Tempo esgotado.')], agora=depois)
+        metadados.refresh_from_db()
+        self.assertEqual((metadados.titulo, metadados.erro, metadados.falhas), ('Plano de ensino', 'Tempo esgotado.', 1))
+
+        # Sem ninguém usando o link, os metadados vencidos são apagados
+        Materia.objects.update(link_plano_ensino=None)
+        self.assertEqual(apagar_orfaos(agora=depois), 0)
+        self.assertEqual(apagar_orfaos(agora=depois + VALIDADE), 1)
+
+    def test_concorrencia_limitada(self):
+        aluno = self.criar_dados(materias=1, tarefas=6, provas=0)
+        for numero, tarefa in enumerate(Tarefa.objects.filter(materia__usuario=aluno)):
+            Tarefa.objects.filter(pk=tarefa.pk).update(link_anexo=self.stub.url(f'/devagar?n={numero}'))
+        self.assertIn('6 link(s) atualizado(s), 0 falha(s)', self.atualizar(concorrencia=2))
+        self.assertEqual(len(self.stub.acessos), 6)
+        self.assertEqual(self.stub.maximo_simultaneos, 2)
+
+    def test_rede_local_e_outros_esquemas_recusados(self):
+        aluno = self.criar_dados(materias=1, tarefas=0, provas=0)
+        Materia.objects.filter(usuario=aluno).update(link_plano_ensino=self.stub.url('/aula'))
+        with override_settings(AGENDA_LINKS_PERMITIR_REDE_LOCAL=False):
+            self.atualizar()
+        self.assertEqual(self.stub.acessos, [])
+        self.assertEqual(MetadadosLink.objects.get().erro, 'Endereço não permitido.')
+        [resultado] = asyncio.run(buscar_todos(['ftp://exemplo.com/lista.pdf']))
+        self.assertEqual(resultado.erro, 'Esquema não suportado.')
+
+    def test_pedaco_enorme_nao_passa_do_limite(self):
+        with mock.patch('agenda.links.ler_cabecalho_html', wraps=ler_cabecalho_html) as ler:
+            [resultado] = asyncio.run(buscar_todos([self.stub.url('/enorme')], tempo_limite=2))
+        self.assertEqual((resultado.erro, resultado.titulo), ('', 'Grande'))
+        self.assertEqual(len(ler.call_args.args[0]), LIMITE_CORPO)
+
+
+    def test_icone_baixado_so_se_for_imagem_pequena(self):
+        self.assertEqual(asyncio.run(baixar_icone(self.stub.url('/icone-movido.png'))), ICONE_DATA_URI)
+        for caminho in ('/grande.png', '/falso.png', '/sumiu.png'):
+            with self.subTest(caminho=caminho):
+                self.assertEqual(asyncio.run(baixar_icone(self.stub.url(caminho))), '')
+        with override_settings(AGENDA_LINKS_PERMITIR_REDE_LOCAL=False):
+            self.assertEqual(asyncio.run(baixar_icone(self.stub.url('/icone.png'))), '')
+
+
+class LembretesTests(DadosMixin, TestCase):
+    def setUp(self):
+        self.aluno = self.criar_dados(materias=1, tarefas=0, provas=0)
+        User.objects.filter(pk=self.aluno.pk).update(email='aluno@exemplo.com', first_name='Ana')
+        self.materia = Materia.objects.get(usuario=self.aluno)
+        self.t0 = timezone.now().replace(microsecond=0)
+
+    def tarefa(self, titulo, data_fim, materia=None):
+        return Tarefa.objects.create(materia=materia or self.materia, titulo=titulo,
+                                     data_inicio=self.t0, data_fim=data_fim)
+
+    def ciclo(self, agora, **opcoes):
+        agendar_lembretes(agora)
+        return enviar_pendentes(agora, **opcoes)
+
+    def test_cada_lembrete_e_enviado_uma_vez(self):
+        tarefa = self.tarefa('Relatório', self.t0 + timedelta(hours=30))
+        sem_email = self.criar_dados('sem-email', materias=1, tarefas=0, provas=0)
+        self.tarefa('Invisível', self.t0 + timedelta(hours=30), materia=Materia.objects.get(usuario=sem_email))
+
+        self.assertEqual(self.ciclo(self.t0), (0, 0, 0))  # primeira execução: só grava a marca
+        self.assertEqual(self.ciclo(self.t0 + timedelta(hours=5)), (0, 0, 0))
+        self.assertEqual(self.ciclo(self.t0 + timedelta(hours=6, minutes=1)), (1, 0, 0))
+        [email] = mail.outbox
+        self.assertEqual(email.to, ['aluno@exemplo.com'])
+        self.assertEqual(email.subject, 'Lembrete: prazo de "Relatório" em 24 horas')
+        self.assertIn('Olá, Ana!', email.body)
+
+        # Reinício que perdeu a marca d'água: a faixa é varrida de novo, mas nada sai duas vezes
+        MarcaVarredura.objects.update(ate=self.t0)
+        self.assertEqual(self.ciclo(self.t0 + timedelta(hours=6, minutes=2)), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.assertEqual(self.ciclo(self.t0 + timedelta(hours=29, minutes=1)), (1, 0, 0))
+        self.assertEqual(mail.outbox[1].subject, 'Lembrete: prazo de "Relatório" em 1 hora')
+        self.assertEqual(
+            sorted(Lembrete.objects.filter(objeto_id=tarefa.pk).values_list('status', flat=True)),
+            [Lembrete.ENVIADO, Lembrete.ENVIADO],
+        )
+        self.assertFalse(Lembrete.objects.filter(usuario=sem_email).exists())
+
+    def test_um_email_por_aluno_numa_conexao(self):
+        prova = Prova.objects.create(materia=self.materia, titulo='P1', data_prova=(self.t0 + timedelta(days=2)).date())
+        momento = momento_da_prova(prova.data_prova)
+        self.tarefa('Lista 1', momento - timedelta(hours=1))
+        self.tarefa('Lista 2', momento - timedelta(hours=2))
+        colega = self.criar_dados('colega', materias=1, tarefas=0, provas=0)
+        User.objects.filter(pk=colega.pk).update(email='colega@exemplo.com')
+        self.tarefa('Lista do colega', momento, materia=Materia.objects.get(usuario=colega))
+
+        MarcaVarredura.objects.create(chave='lembretes', ate=momento - timedelta(hours=26, minutes=1))
+        conexao = get_connection()
+        with mock.patch.object(conexao, 'open', wraps=conexao.open) as abrir:
+            self.assertEqual(self.ciclo(momento - timedelta(hours=24) + timedelta(minutes=1), conexao=conexao),
+                             (4, 0, 0))
+        abrir.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+        email = next(e for e in mail.outbox if e.to == ['aluno@exemplo.com'])
+        self.assertEqual(email.subject, '3 lembretes da sua agenda de estudos')
+        self.assertIn('- Prova "P1" (Matéria 0): em 24 horas', email.body)
+        self.assertIn('- Tarefa "Lista 2" (Matéria 0): prazo em 24 horas', email.body)
+
+    def test_descarta_o_que_nao_vale_mais(self):
+        concluida = self.tarefa('Concluída antes', self.t0 + timedelta(hours=2))
+        adiada = self.tarefa('Adiada', self.t0 + timedelta(hours=2))
+        MarcaVarredura.objects.create(chave='lembretes', ate=self.t0)
+        agendar_lembretes(self.t0 + timedelta(hours=1, minutes=1))
+        self.assertEqual(Lembrete.objects.count(), 2)
+
+        Tarefa.objects.filter(pk=concluida.pk).update(status='C')
+        Tarefa.objects.filter(pk=adiada.pk).update(data_fim=self.t0 + timedelta(hours=5))
+        self.assertEqual(enviar_pendentes(self.t0 + timedelta(hours=1, minutes=1)), (0, 2, 0))
+        self.assertEqual(mail.outbox, [])
+        # O prazo novo ganha os próprios lembretes
+        self.assertEqual(self.ciclo(self.t0 + timedelta(hours=4, minutes=1)), (1, 0, 0))
+        self.assertIn('Adiada', mail.outbox[0].subject)
+
+    def test_falha_no_envio_volta_para_a_fila(self):
+        self.tarefa('Relatório', self.t0 + timedelta(hours=2))
+        MarcaVarredura.objects.create(chave='lembretes', ate=self.t0)
+        agora = self.t0 + timedelta(hours=1, minutes=1)
+        conexao = get_connection()
+        with mock.patch.object(conexao, 'send_messages', side_effect=OSError('SMTP fora do ar')):
+            self.assertEqual(self.ciclo(agora, conexao=conexao), (0, 0, 1))
+            lembrete = Lembrete.objects.get()
+            self.assertEqual((lembrete.status, lembrete.tentativas, lembrete.enviar_em),
+                             (Lembrete.PENDENTE, 1, agora + ESPERA_FALHA))
+            for tentativa in range(1, MAX_TENTATIVAS):
+                enviar_pendentes(agora + ESPERA_FALHA * tentativa, conexao=conexao)
+        lembrete.refresh_from_db()
+        self.assertEqual((lembrete.status, lembrete.tentativas), (Lembrete.FALHOU, MAX_TENTATIVAS))
+        self.assertIn('SMTP fora do ar', lembrete.erro)
+
+    def test_envio_interrompido_nao_e_repetido(self):
+        tarefa = self.tarefa('Relatório', self.t0 + timedelta(hours=2))
+        lembrete = Lembrete.objects.create(
+            usuario=self.aluno, tipo=Lembrete.TAREFA, objeto_id=tarefa.pk, antecedencia=timedelta(hours=1),
+            momento_evento=tarefa.data_fim, enviar_em=self.t0, status=Lembrete.ENVIANDO,
+        )
+        Lembrete.objects.filter(pk=lembrete.pk).update(atualizado_em=self.t0)
+        self.assertEqual(enviar_pendentes(self.t0 + TEMPO_LIMITE_ENVIO + timedelta(seconds=1)), (0, 0, 0))
+        lembrete.refresh_from_db()
+        self.assertEqual((lembrete.status, lembrete.erro), (Lembrete.FALHOU, 'Envio interrompido.'))
+        self.assertEqual(mail.outbox, [])
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command('enviar_lembretes', uma_vez=True, antecedencias='2d,90m', stdout=saida)
+        self.assertIn('Antecedências: 2 dias, 90 minutos', saida.getvalue())
+        self.assertTrue(MarcaVarredura.objects.filter(chave='lembretes').exists())
+        with self.assertRaises(CommandError):
+            call_command('enviar_lembretes', uma_vez=True, antecedencias='amanhã', stdout=StringIO())
+
+    def test_cadastro_com_email(self):
+        self.client.post(reverse('cadastro'), {
+            'username': 'nova', 'email': 'nova@exemplo.com',
+            'password1': 'senha-forte-123', 'password2': 'senha-forte-123',
+        })
+        self.assertEqual(User.objects.get(username='nova').email, 'nova@exemplo.com')
+
+
+class PlanejadorTests(DadosMixin, TestCase):
+    SEM_AULAS = [[] for _ in range(7)]
+
+    def setUp(self):
+        cache.clear()
+        # Segunda-feira, abertura da janela
+        self.inicio = timezone.make_aware(datetime(2026, 10, 19, 8, 0))
+
+    def item(self, pk, prazo, prioridade='M', blocos=1, tipo=TAREFA, liberado_em=None):
+        return Item(tipo, pk, f'Item {pk}', 'Matéria', prazo, liberado_em or self.inicio, prioridade, blocos)
+
+    def blocos(self, plano):
+        return [entrada for dia in plano.dias for entrada in dia.blocos]
+
+    def test_prazo_mais_cedo_primeiro_com_peso_da_prioridade(self):
+        itens = [
+            self.item(1, self.inicio + timedelta(days=3)),
+            self.item(2, self.inicio + timedelta(days=2)),
+            # Prazo seis horas depois do item 2, mas prioridade alta passa à frente
+            self.item(3, self.inicio + timedelta(days=2, hours=6), prioridade='A'),
+        ]
+        plano = planejar(itens, self.SEM_AULAS, self.inicio)
+        self.assertEqual([entrada.pk for entrada in self.blocos(plano)], [3, 2, 1])
+        self.assertEqual(self.blocos(plano)[0].inicio, self.inicio)
+        self.assertEqual(plano.sem_tempo, [])
+
+    def test_blocos_fora_das_aulas_e_liberacao(self):
+        ocupados = [[(time(9, 0), 'Cálculo')], *self.SEM_AULAS[1:]]
+        itens = [
+            self.item(1, self.inicio + timedelta(days=5), blocos=3),
+            self.item(2, self.inicio + timedelta(days=5), blocos=1, liberado_em=self.inicio + timedelta(days=1)),
+        ]
+        segunda, terca = planejar(itens, ocupados, self.inicio).dias[:2]
+        self.assertEqual(
+            [(entrada.inicio.strftime('%H:%M'), entrada.tipo) for entrada in segunda.entradas],
+            [('08:00', TAREFA), ('08:30', TAREFA), ('09:00', AULA), ('10:40', TAREFA)],
+        )
+        self.assertEqual([(entrada.pk, entrada.inicio.strftime('%H:%M')) for entrada in terca.entradas], [(2, '08:00')])
+
+    def test_limite_diario_e_sem_tempo(self):
+        itens = [
+            self.item(1, self.inicio + timedelta(days=6), blocos=20),
+            # Só cabem dois blocos antes das 9h
+            self.item(2, self.inicio + timedelta(hours=1), prioridade='A', blocos=4),
+        ]
+        plano = planejar(itens, self.SEM_AULAS, self.inicio)
+        self.assertEqual([len(dia.blocos) for dia in plano.dias][:4], [LIMITE_DIARIO, LIMITE_DIARIO, 6, 0])
+        self.assertEqual([(item.pk, faltando) for item, faltando in plano.sem_tempo], [(2, 2)])
+
+    def test_centenas_de_tarefas_em_milissegundos(self):
+        itens = [
+            self.item(pk, self.inicio + timedelta(hours=6 + pk % 160), prioridade='ABM'[pk % 3], blocos=1 + pk % 4)
+            for pk in range(600)
+        ]
+        ocupados = [[(time(10, 0), 'A'), (time(14, 0), 'B')] for _ in range(7)]
+        inicio = time_module.perf_counter()
+        plano = planejar(itens, ocupados, self.inicio)
+        self.assertLess(time_module.perf_counter() - inicio, 0.5)
+        self.assertEqual(plano.total_blocos, 7 * LIMITE_DIARIO)
+        for bloco in self.blocos(plano):
+            self.assertEqual(bloco.fim - bloco.inicio, BLOCO)
+            self.assertLessEqual(bloco.fim, bloco.prazo)
+
+    def test_plano_do_usuario_em_cache(self):
+        usuario = self.criar_dados(materias=1, tarefas=0, provas=0)
+        materia = Materia.objects.get(usuario=usuario)
+        HorarioAula.objects.create(materia=materia, dia_semana='SEG', hora_inicio=time(8, 0))
+        Prova.objects.create(materia=materia, titulo='P1', data_prova=(self.inicio + timedelta(days=3)).date())
+        agora = self.inicio - timedelta(minutes=10)
+        self.assertEqual(inicio_do_plano(agora), self.inicio)
+
+        plano = plano_em_cache(usuario.pk, agora)
+        primeiro = self.blocos(plano)[0]
+        self.assertEqual((primeiro.tipo, primeiro.inicio.strftime('%H:%M')), (PROVA, '09:40'))
+        with self.assertNumQueries(0):
+            plano_em_cache(usuario.pk, agora + timedelta(minutes=5))
+
+        # Qualquer escrita do usuário troca a versão do cache
+        Tarefa.objects.create(materia=materia, titulo='Urgente', prioridade='A',
+                              data_inicio=agora, data_fim=self.inicio + timedelta(days=1))
+        titulos = {entrada.titulo for entrada in self.blocos(plano_em_cache(usuario.pk, agora))}
+        self.assertEqual(titulos, {'P1', 'Urgente'})
+
+    def test_view(self):
+        usuario = self.criar_dados()
+        self.client.force_login(usuario)
+        resposta = self.client.get(reverse('plano_estudos'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Plano de Estudos')
+        self.assertContains(resposta, reverse('tarefa_foco', args=[Tarefa.objects.filter(
+            materia__usuario=usuario, prioridade='A').values_list('pk', flat=True).first()]))
@@ -0,0 +1,144 @@
+# Em agenda/trabalhos.py
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .arquivos import armazenamento, caminho_da_miniatura, caminho_do_conteudo
+from .busca import reindexar_materiais_do_conteudo
+from .models import ConteudoArquivo, Trabalho
+from .pdf import processar_pdf
+
+# Fila de trabalhos de fundo sem broker externo: uma tabela (Trabalho) consumida pelo comando
+# run_workers. O processo principal do comando reserva os trabalhos com um UPDATE condicional
+# (vários comandos podem rodar ao mesmo tempo sem pegar o mesmo trabalho), executa a parte
+# pesada num pool de processos e grava o resultado. Falhas voltam para a fila com espera
+# crescente até MAX_TENTATIVAS; trabalhos presos em "executando" (worker morto) são retomados
+# depois de TEMPO_LIMITE.
+
+MAX_TENTATIVAS = 3
+ESPERA_BASE = timedelta(seconds=30)
+TEMPO_LIMITE = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class TipoTrabalho:
+    # argumentos(chave) -> tupla passada a executar; roda no processo principal (tem banco)
+    argumentos: Callable
+    # executar(*argumentos) -> resultado; roda no pool, sem banco (precisa ser "picklável")
+    executar: Callable
+    # gravar(chave, resultado); de volta ao processo principal
+    gravar: Callable
+    # desistir(chave): quando o trabalho falha de vez, para quem espera o resultado não esperar para sempre
+    desistir: Callable = None
+
+
+# --- Fila ---
+
+def enfileirar(tipo, chave):
+    """Coloca (ou recoloca) o trabalho na fila; se ele já está pendente/executando, nada muda."""
+    trabalho, criado = Trabalho.objects.get_or_create(
+        tipo=tipo, chave=chave, defaults={'disponivel_em': timezone.now()},
+    )
+    if not criado and trabalho.status in (Trabalho.CONCLUIDO, Trabalho.FALHOU):
+        Trabalho.objects.filter(pk=trabalho.pk, status=trabalho.status).update(
+            status=Trabalho.PENDENTE, tentativas=0, erro='', disponivel_em=timezone.now(), iniciado_em=None,
+        )
+    return trabalho
+
+
+def reservar(quantidade, agora=None):
+    """Marca até `quantidade` trabalhos disponíveis como executando e os devolve."""
+    if quantidade <= 0:
+        return []
+    agora = agora or timezone.now()
+    travado = Q(status=Trabalho.EXECUTANDO, iniciado_em__lt=agora - TEMPO_LIMITE)
+    # Presos em "executando" que já gastaram as tentativas não voltam mais
+    for pk, tipo, chave in Trabalho.objects.filter(travado, tentativas__gte=MAX_TENTATIVAS).values_list(
+        'pk', 'tipo', 'chave',
+    ):
+        if Trabalho.objects.filter(travado, pk=pk).update(status=Trabalho.FALHOU, erro='Tempo limite excedido.'):
+            _desistir(tipo, chave)
+    disponivel = Q(status=Trabalho.PENDENTE, disponivel_em__lte=agora) | travado
+
+    reservados = []
+    candidatos = Trabalho.objects.filter(disponivel).order_by('disponivel_em', 'pk').values_list('pk', flat=True)
+    for pk in candidatos[:quantidade * 2]:
+        # Só muda a linha se ela ainda está disponível: outro worker pode ter reservado antes
+        if Trabalho.objects.filter(disponivel, pk=pk).update(
+            status=Trabalho.EXECUTANDO, iniciado_em=agora, tentativas=F('tentativas') + 1,
+        ):
+            reservados.append(pk)
+            if len(reservados) == quantidade:
+                break
+    return list(Trabalho.objects.filter(pk__in=reservados).order_by('disponivel_em', 'pk'))
+
+
+def concluir(trabalho):
+    Trabalho.objects.filter(pk=trabalho.pk).update(status=Trabalho.CONCLUIDO, erro='')
+
+
+def falhar(trabalho, erro, agora=None):
+    """Devolve o trabalho à fila com espera crescente, ou o dá por perdido após MAX_TENTATIVAS."""
+    agora = agora or timezone.now()
+    mensagem = f'{type(erro).__name__}: {erro}'[:2000]
+    if trabalho.tentativas >= MAX_TENTATIVAS:
+        Trabalho.objects.filter(pk=trabalho.pk).update(status=Trabalho.FALHOU, erro=mensagem)
+        _desistir(trabalho.tipo, trabalho.chave)
+    else:
+        espera = ESPERA_BASE * 2 ** (trabalho.tentativas - 1)
+        Trabalho.objects.filter(pk=trabalho.pk).update(
+            status=Trabalho.PENDENTE, erro=mensagem, disponivel_em=agora + espera,
+        )
+
+
+def _desistir(tipo, chave):
+    tipo_trabalho = TIPOS.get(tipo)
+    if tipo_trabalho and tipo_trabalho.desistir:
+        tipo_trabalho.desistir(chave)
+
+
+# --- PDFs enviados como material ---
+
+def enfileirar_pdf(sha256):
+    if sha256 and not ConteudoArquivo.objects.filter(sha256=sha256).exists():
+        enfileirar('processar_pdf', sha256)
+
+
+def _argumentos_pdf(sha256):
+    return (armazenamento().path(caminho_do_conteudo(sha256)),)
+
+
+def _gravar_pdf(sha256, resultado):
+    miniatura = ''
+    if resultado['miniatura']:
+        storage = armazenamento()
+        miniatura = caminho_da_miniatura(sha256)
+        if storage.exists(miniatura):
+            storage.delete(miniatura)
+        storage.save(miniatura, ContentFile(resultado['miniatura']))
+    with transaction.atomic():
+        ConteudoArquivo.objects.update_or_create(sha256=sha256, defaults={
+            'texto': resultado['texto'], 'paginas': resultado['paginas'], 'miniatura': miniatura,
+        })
+        # O texto entra na busca e a lista de materiais passa a mostrar a miniatura
+        reindexar_materiais_do_conteudo(sha256, resultado['texto'])
+
+
+def _desistir_pdf(sha256):
+    # PDF corrompido, outro arquivo com extensão .pdf, pdftoppm com erro...: fica registrado
+    # sem texto nem páginas, e a lista de materiais deixa de mostrar "Gerando prévia"
+    with transaction.atomic():
+        _, criado = ConteudoArquivo.objects.get_or_create(sha256=sha256, defaults={'paginas': 0})
+        if criado:
+            reindexar_materiais_do_conteudo(sha256, '')
+
+
+TIPOS = {
+    'processar_pdf': TipoTrabalho(_argumentos_pdf, processar_pdf, _gravar_pdf, _desistir_pdf),
+}
@@ -2,12 +2,17 @@
 
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import views, views_async
 from .forms import CustomLoginForm
 
 urlpatterns = [
     path('', views.dashboard, name='home'),
     path('agenda/', views.agenda, name='agenda'),
+    path('agenda/eventos/', views.agenda_eventos, name='agenda_eventos'),
+    path('agenda/assinar/', views.calendario_assinatura, name='calendario_assinatura'),
+    path('horarios/', views.horarios_semana, name='horarios_semana'),
+    path('plano/', views.plano_estudos, name='plano_estudos'),
+    path('calendario/<str:token>.ics', views.calendario_feed, name='calendario_feed'),
     
     # Rotas de Autenticação
     path('login/', auth_views.LoginView.as_view(
@@ -34,11 +39,31 @@ urlpatterns = [
     path('provas/<int:prova_pk>/materiais/', views.material_list, name='material_list'),
     path('provas/<int:prova_pk>/materiais/nova/', views.material_create, name='material_create'),
     path('materiais/<int:pk>/deletar/', views.material_delete, name='material_delete'),
+    path('materiais/<int:pk>/arquivo/', views.material_arquivo, name='material_arquivo'),
+    path('materiais/<int:pk>/miniatura/', views.material_miniatura, name='material_miniatura'),
 
     path('tarefas/', views.tarefa_list, name='tarefa_list'),
     path('tarefas/nova/', views.tarefa_create, name='tarefa_create'),
+    path('tarefas/lote/', views.tarefa_lote, name='tarefa_lote'),
     path('tarefas/<int:pk>/concluir/', views.tarefa_concluir, name='tarefa_concluir'),
     path('tarefas/<int:pk>/foco/', views.tarefa_foco, name='tarefa_foco'),
     path('tarefas/editar/<int:pk>/', views.tarefa_update, name='tarefa_update'),
     path('tarefas/deletar/<int:pk>/', views.tarefa_delete, name='tarefa_delete'),
+
+    # --- BUSCA ---
+    path('busca/', views.busca, name='busca'),
+
+    # --- IMPORTAÇÃO EM MASSA (CSV / iCalendar) ---
+    path('importar/', views.importar, name='importar'),
+
+    # --- PÁGINAS DE LEITURA ASSÍNCRONAS (servidor ASGI) ---
+    path('async/', views_async.dashboard, name='home_async'),
+    path('async/agenda/', views_async.agenda, name='agenda_async'),
+    path('async/materias/', views_async.materia_list, name='materia_list_async'),
+    path('async/tarefas/', views_async.tarefa_list, name='tarefa_list_async'),
+    path('async/provas/', views_async.prova_list, name='prova_list_async'),
+    path('async/provas/<int:prova_pk>/materiais/', views_async.material_list, name='material_list_async'),
+
+    # --- INSTRUMENTAÇÃO (somente equipe) ---
+    path('instrumentacao/', views.instrumentacao_resumo, name='instrumentacao_resumo'),
 ]
\ No newline at end of file
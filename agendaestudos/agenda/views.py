@@ -2,16 +2,47 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_POST, require_safe
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 # Garantindo que apenas modelos existentes sejam importados
-from .models import Materia, Tarefa, Prova, MaterialDeApoio 
+from .models import Materia, Tarefa, Prova, MaterialDeApoio, TokenCalendario, gerar_token_calendario
 from django.db.models import Count, Q
-from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 # Garantindo que apenas forms existentes sejam importados
-from .forms import CustomUserCreationForm, MateriaForm, TarefaForm, ProvaForm, MaterialDeApoioForm, CustomLoginForm,HorarioAulaFormSet
+from .forms import ERRO_TAMANHO_MAXIMO, CustomUserCreationForm, MateriaForm, TarefaForm, ProvaForm, MaterialDeApoioForm, CustomLoginForm,HorarioAulaFormSet, TarefaLoteForm, ImportacaoForm
+from .operacoes import ACOES_LOTE, ErroOperacaoLote, executar_lote_tarefas
+from .importacao import ErroArquivo, importar_arquivo
+from .links import anexar_metadados
+from .listagens import (
+    anotar_percentual_concluido, contexto_provas, contexto_tarefas, filtros_tarefas, links_das_provas,
+    materia_escolhida, materiais_da_prova, materias_do_filtro, materias_do_usuario, provas_filtradas,
+    tarefas_filtradas,
+)
+from .arquivos import UploadComHashHandler, guardar_arquivo, resposta_arquivo, resposta_miniatura
+from .calendario import etag_feed, gerar_ics
+from .cache import marca_usuario
+from .condicional import resposta_condicional
+from .busca import buscar
+from .estatisticas import painel_em_cache
+from .horarios import NOMES_DIAS, quadro_semanal
+from .planejador import plano_em_cache
+from .contadores import materias_com_contadores
+from .paginacao import paginar_por_chave
+from .tempo import agora as agora_da_requisicao, anotar_tempo_restante
+from .instrumentacao import resumo_rotas
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 from django import forms
 # import json (REMOVIDO pois não é mais necessário sem a lógica de FullCalendar e notas)
 
+TAREFAS_POR_PAGINA = 50
+PROVAS_POR_PAGINA = 20
+
 # REMOVIDA: def calcular_media_ponderada(materia):
 
 # --- Views de Autenticação e Dashboard ---
@@ -32,121 +63,169 @@ def cadastro(request):
 
 @login_required
 def dashboard(request):
-    from .models import HorarioAula
-
-    # 1. Dados Estatísticos de Tarefas
-    user_tasks = Tarefa.objects.filter(materia__usuario=request.user)
-    total_tarefas = user_tasks.count()
-    tarefas_concluidas = user_tasks.filter(status='C').count()
-    porcentagem_concluida = round((tarefas_concluidas / total_tarefas) * 100) if total_tarefas > 0 else 0
-
-    # 1B. Dados Estatísticos de PROVAS
-    user_provas = Prova.objects.filter(materia__usuario=request.user)
-    total_provas = user_provas.count()
-    provas_futuras = user_provas.filter(data_prova__gte=timezone.now().date()).count()
-
-    # 2. Tarefas Urgentes e Próximas
-    tarefas_urgentes = user_tasks.filter(status__in=['A', 'E'], prioridade='A').order_by('data_fim')[:5]
-    tarefas_proximas = user_tasks.filter(status__in=['A', 'E']).order_by('data_fim')[:5]
+    # Todas as seções do painel vêm do motor de estatísticas (uma consulta por seção),
+    # cacheadas por usuário até a próxima escrita dele
+    context = painel_em_cache(request.user)
+    return render(request, 'agenda/dashboard.html', context)
 
-    # 2B. Próximas PROVAS
-    proximas_provas = user_provas.filter(data_prova__gte=timezone.now().date()).order_by('data_prova')[:5]
+@login_required
+@resposta_condicional()
+def agenda(request):
+    # Os eventos não vêm mais embutidos na página: o FullCalendar busca em agenda_eventos
+    # apenas o intervalo visível (mês/semana/dia)
+    return render(request, 'agenda/agenda.html')
 
-    # 3. Distribuição por Matéria
-    distribuicao_materias = Materia.objects.filter(usuario=request.user).annotate(
-        total_tarefas=Count('tarefas'),
-        tarefas_pendentes=Count('tarefas', filter=Q(tarefas__status__in=['A', 'E'])),
-        total_provas=Count('provas'),
-        total_materiais=Count('provas__materiais')
-    ).order_by('-tarefas_pendentes')
 
-    # --- QUADRO DE HORÁRIOS ---
-    hoje = timezone.localtime().date()
-    hora_atual = timezone.localtime().time()
+@login_required
+@resposta_condicional(balde='minuto')
+def horarios_semana(request):
+    # Montado a partir do quadro semanal em cache: nenhuma consulta enquanto os horários não mudam
+    quadro = quadro_semanal(request.user.pk)
+    agora = timezone.localtime(agora_da_requisicao())
+    dia_proxima, proxima = quadro.proxima_na_semana(agora)
+    context = {
+        'semana': quadro.semana(),
+        'hoje': agora.weekday(),
+        'proxima_aula': proxima,
+        'dia_proxima': NOMES_DIAS[dia_proxima] if proxima else None,
+        'total_aulas': len(quadro),
+        'title': 'Horários da Semana',
+    }
+    return render(request, 'agenda/horarios_semana.html', context)
 
-    dia_semana_num = hoje.weekday()  # 0 = Segunda, 6 = Domingo
-    DIAS_MAP = {0: 'SEG', 1: 'TER', 2: 'QUA', 3: 'QUI', 4: 'SEX', 5: 'SAB', 6: 'DOM'}
-    dia_semana_sigla = DIAS_MAP.get(dia_semana_num, 'SEG')
 
-    aulas_hoje = HorarioAula.objects.filter(
-        materia__usuario=request.user,
-        dia_semana=dia_semana_sigla
-    ).select_related('materia').order_by('hora_inicio')
+@login_required
+@resposta_condicional(balde='minuto')
+def plano_estudos(request):
+    # Blocos de foco da semana para tarefas e provas, entre as aulas; recalculado só quando
+    # tarefas, provas ou horários mudam (ver planejador.plano_em_cache)
+    plano = plano_em_cache(request.user.pk, agora_da_requisicao())
+    context = {
+        'plano': plano,
+        'hoje': timezone.localdate(agora_da_requisicao()),
+        'title': 'Plano de Estudos',
+    }
+    return render(request, 'agenda/plano_estudos.html', context)
+
+
+def _parse_limite(valor):
+    """Converte os parâmetros start/end do FullCalendar (data ou data/hora ISO 8601)."""
+    if not valor:
+        return None
+    # O '+' do fuso pode chegar como espaço quando a query string não foi codificada
+    valor = valor.strip().replace(' ', '+')
+    try:
+        momento = parse_datetime(valor)
+        if momento is None:
+            data = parse_date(valor)
+            if data is None:
+                return None
+            momento = datetime.combine(data, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def _eventos_calendario(usuario, inicio, fim):
+    """Gera os eventos (dicts no formato do FullCalendar) de tarefas e provas do intervalo."""
+    status_display = dict(Tarefa.STATUS_CHOICES)
+
+    tarefas = Tarefa.objects.filter(materia__usuario=usuario)
+    provas = Prova.objects.filter(materia__usuario=usuario, data_prova__isnull=False)
+    if inicio:
+        tarefas = tarefas.filter(data_fim__gte=inicio)
+        provas = provas.filter(data_prova__gte=timezone.localtime(inicio).date())
+    if fim:
+        tarefas = tarefas.filter(data_inicio__lt=fim)
+        provas = provas.filter(data_prova__lt=timezone.localtime(fim).date())
+
+    colunas_tarefa = tarefas.values('pk', 'titulo', 'data_inicio', 'data_fim', 'status', 'materia__nome')
+    for tarefa in colunas_tarefa.order_by('data_inicio').iterator(chunk_size=500):
+        yield {
+            'id': tarefa['pk'],
+            'title': tarefa['titulo'],
+            'start': tarefa['data_inicio'],
+            'end': tarefa['data_fim'],
+            'color': '#0dcaf0',
+            'extendedProps': {
+                'tipo': 'Tarefa',
+                'materia': tarefa['materia__nome'],
+                'status': status_display.get(tarefa['status'], tarefa['status']),
+            },
+        }
 
-    # Próxima aula (ainda não ocorrida)
-    proxima_aula = aulas_hoje.filter(hora_inicio__gte=hora_atual).first()
+    colunas_prova = provas.values('pk', 'titulo', 'data_prova', 'observacoes', 'materia__nome')
+    for prova in colunas_prova.order_by('data_prova').iterator(chunk_size=500):
+        yield {
+            'id': prova['pk'],
+            'title': prova['titulo'],
+            'start': prova['data_prova'],
+            'allDay': True,
+            'color': '#dc3545',
+            'extendedProps': {
+                'tipo': 'Prova',
+                'materia': prova['materia__nome'],
+                'observacoes': prova['observacoes'],
+            },
+        }
 
-    # Caso não haja nenhuma aula futura, e existam aulas hoje, mostra última aula passada
-    if not proxima_aula and aulas_hoje.exists():
-        proxima_aula = aulas_hoje.last()
 
-    dia_semana_display = next((d[1] for d in HorarioAula.DIAS_SEMANA if d[0] == dia_semana_sigla), 'Hoje')
+def _json_em_partes(itens):
+    """Serializa uma sequência como lista JSON, um item por vez (sem montar a lista inteira)."""
+    encoder = DjangoJSONEncoder()
+    yield '['
+    for indice, item in enumerate(itens):
+        yield (',' if indice else '') + encoder.encode(item)
+    yield ']'
 
-    context = {
-        'total_tarefas': total_tarefas,
-        'tarefas_concluidas': tarefas_concluidas,
-        'porcentagem_concluida': porcentagem_concluida,
-        'tarefas_urgentes': tarefas_urgentes,
-        'tarefas_proximas': tarefas_proximas,
-        'total_provas': total_provas,
-        'provas_futuras': provas_futuras,
-        'proximas_provas': proximas_provas,
-        'materias': distribuicao_materias,
-        'all_materias': Materia.objects.filter(usuario=request.user).count(),
-        'proxima_aula': proxima_aula,
-        'aulas_hoje': aulas_hoje,
-        'dia_semana_display': dia_semana_display,
-        'hoje': hoje,
-    }
-    return render(request, 'agenda/dashboard.html', context)
 
 @login_required
-def agenda(request):
-    # A view Agenda também precisa de , mas sem a lógica de Provas/Tarefas combinadas
-    tarefas = Tarefa.objects.filter(materia__usuario=request.user)
-    provas = Prova.objects.filter(materia__usuario=request.user)
-    
-    # Combina para serialização
-    eventos = list(tarefas) + list(provas)
-    eventos_json = serializers.serialize('json', eventos)
-
-    context = {
-        'eventos_json': eventos_json,
-        'materias': Materia.objects.filter(usuario=request.user),
-    }
-    return render(request, 'agenda/agenda.html', context)
+def agenda_eventos(request):
+    inicio = _parse_limite(request.GET.get('start'))
+    fim = _parse_limite(request.GET.get('end'))
+    eventos = _eventos_calendario(request.user, inicio, fim)
+    return StreamingHttpResponse(_json_em_partes(eventos), content_type='application/json')
 
 
 # --- Views de Matérias (Lógica Limpa) ---
 
 @login_required
+@resposta_condicional()
 def materia_list(request):
-    materias = Materia.objects.filter(usuario=request.user).annotate(
-        total_tarefas=Count('tarefas'),
-        tarefas_concluidas=Count('tarefas', filter=Q(tarefas__status='C')),
-        total_provas=Count('provas'),
-        total_materiais=Count('provas__materiais') 
-    ).order_by('nome')
-
-    for materia in materias:
-        if materia.total_tarefas > 0:
-            porcentagem = (materia.tarefas_concluidas / materia.total_tarefas) * 100
-            materia.percentual_concluido = round(porcentagem)
-        else:
-            materia.percentual_concluido = 0
+    # Contadores vêm da tabela MateriaStats (mantida pelos signals), sem varrer tarefas/provas
+    materias = anotar_percentual_concluido(materias_com_contadores(materias_do_usuario(request.user)))
+    # Título/ícone dos links já buscados pelo atualizar_links (uma consulta, nenhum HTTP)
+    anexar_metadados(materias)
             
     return render(request, 'agenda/materia_list.html', {'materias': materias})
 
 @login_required
+@csrf_exempt
 def material_create(request, prova_pk):
+    # O handler de upload só pode ser trocado antes de o CSRF ler o POST: a verificação
+    # fica em _material_create, logo depois (padrão da documentação do Django)
+    request.upload_handlers = [UploadComHashHandler(request)]
+    return _material_create(request, prova_pk)
+
+
+@csrf_protect
+def _material_create(request, prova_pk):
     prova = get_object_or_404(Prova, pk=prova_pk, materia__usuario=request.user)
     
     if request.method == 'POST':
-        form = MaterialDeApoioForm(request.POST)
+        form = MaterialDeApoioForm(request.POST, request.FILES)
+        if getattr(request, 'upload_excedido', False):
+            # O handler parou o upload no limite: o arquivo nem chegou a request.FILES
+            form.add_error('arquivo', ERRO_TAMANHO_MAXIMO)
         if form.is_valid():
             material = form.save(commit=False)
             material.prova = prova
-            material.tipo = 'LINK'  # força o tipo como LINK
+            if form.cleaned_data['arquivo']:
+                guardar_arquivo(material, form.cleaned_data['arquivo'])
+            else:
+                material.tipo = 'LINK'
             material.save()
             messages.success(request, 'Material de apoio adicionado com sucesso!')
             return redirect('material_list', prova_pk=prova.pk)
@@ -161,6 +240,27 @@ def material_create(request, prova_pk):
     return render(request, 'agenda/material_form.html', context)
 
 
+@login_required
+@require_safe
+def material_arquivo(request, pk):
+    # Só o dono baixa; o arquivo é lido em blocos (ou entregue pelo nginx, ver AGENDA_SENDFILE_PREFIXO)
+    material = get_object_or_404(
+        MaterialDeApoio.objects.exclude(arquivo=''), pk=pk, prova__materia__usuario=request.user,
+    )
+    return resposta_arquivo(request, material)
+
+
+@login_required
+@require_safe
+def material_miniatura(request, pk):
+    material = get_object_or_404(
+        MaterialDeApoio.objects.exclude(sha256='').com_conteudo(), pk=pk, prova__materia__usuario=request.user,
+    )
+    if not material.miniatura:
+        raise Http404('Miniatura ainda não gerada.')
+    return resposta_miniatura(request, material)
+
+
 @login_required
 def materia_create(request):
     if request.method == 'POST':
@@ -241,18 +341,151 @@ def materia_delete(request, pk):
         return redirect('materia_list')
     return render(request, 'agenda/materia_confirm_delete.html', {'materia': materia})
 
+
+# --- Assinatura do calendário (.ics) ---
+
+def _dados_feed(request, token):
+    """(usuario_id, marca d'água) do token, consultados uma vez por requisição e sem tocar nas tabelas da agenda."""
+    if not hasattr(request, '_dados_feed'):
+        usuario_id = TokenCalendario.objects.filter(token=token).values_list('usuario_id', flat=True).first()
+        request._dados_feed = (usuario_id, marca_usuario(usuario_id) if usuario_id else None)
+    return request._dados_feed
+
+
+def _etag_feed(request, token):
+    usuario_id, marca = _dados_feed(request, token)
+    return etag_feed(usuario_id, marca) if usuario_id else None
+
+
+def _ultima_alteracao_feed(request, token):
+    return _dados_feed(request, token)[1]
+
+
+@condition(etag_func=_etag_feed, last_modified_func=_ultima_alteracao_feed)
+def calendario_feed(request, token):
+    # Sem login: os apps de calendário se autenticam pelo token secreto na URL.
+    # Consultas repetidas com If-None-Match recebem 304 antes de chegar aqui.
+    usuario_id, marca = _dados_feed(request, token)
+    if usuario_id is None:
+        raise Http404
+    response = StreamingHttpResponse(gerar_ics(usuario_id, marca), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="agenda.ics"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def calendario_assinatura(request):
+    token, _ = TokenCalendario.objects.get_or_create(usuario=request.user)
+    if request.method == 'POST':
+        token.token = gerar_token_calendario()
+        token.save(update_fields=['token'])
+        messages.success(request, 'Novo link gerado. O link anterior deixou de funcionar.')
+        return redirect('calendario_assinatura')
+
+    url_feed = request.build_absolute_uri(reverse('calendario_feed', args=[token.token]))
+    context = {
+        'url_feed': url_feed,
+        'url_webcal': 'webcal://' + url_feed.split('://', 1)[1],
+        'title': 'Assinar Calendário',
+    }
+    return render(request, 'agenda/calendario_assinatura.html', context)
+
+
 # --- Views de Tarefas e Provas (Restante) ---
 @login_required
 def tarefa_concluir(request, pk):
     tarefa = get_object_or_404(Tarefa, pk=pk, materia__usuario=request.user)
     if tarefa.status != 'C':
         tarefa.status = 'C'
-        tarefa.save()
+        tarefa.save(update_fields=['status', 'atualizado_em'])
         messages.success(request, f'Tarefa "{tarefa.titulo}" marcada como CONCLUÍDA! Bom trabalho!')
     else:
         messages.info(request, f'Tarefa "{tarefa.titulo}" já estava concluída.')
     return redirect('tarefa_list')
 
+@login_required
+@require_POST
+def tarefa_lote(request):
+    form = TarefaLoteForm(request.POST, user=request.user)
+    quer_json = request.headers.get('Accept', '').startswith('application/json')
+
+    if not form.is_valid():
+        erros = [erro for lista in form.errors.values() for erro in lista]
+        if quer_json:
+            return JsonResponse({'erros': erros}, status=400)
+        for erro in erros:
+            messages.error(request, erro)
+        return redirect(_url_retorno_lista(request))
+
+    dados = form.cleaned_data
+    try:
+        resultados = executar_lote_tarefas(
+            request.user, dados['acao'], dados['ids'],
+            prioridade=dados.get('prioridade'), materia=dados.get('materia'),
+        )
+    except ErroOperacaoLote as erro:
+        if quer_json:
+            return JsonResponse({'erros': [str(erro)]}, status=400)
+        messages.error(request, str(erro))
+        return redirect(_url_retorno_lista(request))
+
+    if quer_json:
+        return JsonResponse({'resultados': resultados})
+
+    total_ok = sum(1 for r in resultados.values() if r == 'ok')
+    messages.success(request, f'{dict(ACOES_LOTE)[dados["acao"]]}: {total_ok} tarefa(s) atualizada(s).')
+    if total_ok < len(resultados):
+        messages.warning(request, f'{len(resultados) - total_ok} tarefa(s) não encontrada(s).')
+    return redirect(_url_retorno_lista(request))
+
+
+def _url_retorno_lista(request):
+    # Volta para a lista com os mesmos filtros, se o próximo endereço for interno
+    proximo = request.POST.get('next', '')
+    if proximo and url_has_allowed_host_and_scheme(proximo, allowed_hosts={request.get_host()}):
+        return proximo
+    return reverse('tarefa_list')
+
+# --- Busca ---
+
+@login_required
+def busca(request):
+    termo = request.GET.get('q', '').strip()
+    resultados = buscar(request.user, termo) if termo else []
+    if request.headers.get('Accept', '').startswith('application/json'):
+        return JsonResponse({'termo': termo, 'resultados': resultados})
+    return render(request, 'agenda/busca.html', {'termo': termo, 'resultados': resultados, 'title': 'Buscar'})
+
+
+# --- Importação em massa ---
+
+@login_required
+def importar(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            materia = form.cleaned_data.get('materia')
+            try:
+                resultado = importar_arquivo(
+                    request.user, arquivo, arquivo.name,
+                    tipo_padrao=form.cleaned_data['tipo'],
+                    materia_padrao=materia.pk if materia else None,
+                )
+            except ErroArquivo as erro:
+                form.add_error('arquivo', str(erro))
+            else:
+                if resultado.total_criados:
+                    messages.success(request, f'{resultado.total_criados} registro(s) importado(s).')
+                if resultado.total_erros:
+                    messages.warning(request, f'{resultado.total_erros} linha(s) com erro foram ignoradas.')
+    else:
+        form = ImportacaoForm(user=request.user)
+
+    return render(request, 'agenda/importacao.html', {'form': form, 'resultado': resultado, 'title': 'Importar Dados'})
+
 @login_required
 def tarefa_foco(request, pk):
     tarefa = get_object_or_404(Tarefa, pk=pk, materia__usuario=request.user)
@@ -266,31 +499,16 @@ def tarefa_foco(request, pk):
     return render(request, 'agenda/tarefa_foco.html', context)
 
 @login_required
+@resposta_condicional(balde='minuto')
 def tarefa_list(request):
-    # ... (código existente) ...
-    tarefas = Tarefa.objects.filter(materia__usuario=request.user)
-    materia_id = request.GET.get('materia')
-    status = request.GET.get('status')
-    prioridade = request.GET.get('prioridade')
-    if materia_id:
-        tarefas = tarefas.filter(materia__id=materia_id)
-    if status:
-        tarefas = tarefas.filter(status=status)
-    if prioridade:
-        tarefas = tarefas.filter(prioridade=prioridade)
-    tarefas = tarefas.order_by('data_inicio')
-
-    context = {
-        'tarefas': tarefas,
-        'all_materias': Materia.objects.filter(usuario=request.user), 
-        'status_choices': Tarefa.STATUS_CHOICES,
-        'prioridade_choices': Tarefa.PRIORIDADE_CHOICES,
-        'current_filters': {
-            'materia': int(materia_id) if materia_id else None,
-            'status': status,
-            'prioridade': prioridade,
-        }
-    }
+    filtros = filtros_tarefas(request.GET)
+    tarefas = tarefas_filtradas(request.user, filtros)
+    pagina = paginar_por_chave(tarefas, 'data_inicio', request.GET.get('cursor'), TAREFAS_POR_PAGINA)
+    # Tempo restante de todas as linhas de uma vez, contra o "agora" da requisição
+    anotar_tempo_restante(pagina)
+    anexar_metadados(pagina)
+
+    context = contexto_tarefas(request.user, pagina, materias_do_filtro(request.user), filtros)
     return render(request, 'agenda/tarefa_list.html', context)
 
 @login_required
@@ -329,17 +547,14 @@ def tarefa_delete(request, pk):
 
 
 @login_required
+@resposta_condicional(balde='dia')
 def prova_list(request):
-    provas = Prova.objects.filter(materia__usuario=request.user).order_by('data_prova')
-    materia_id = request.GET.get('materia')
-    if materia_id:
-        provas = provas.filter(materia__id=materia_id)
+    materia_id = materia_escolhida(request.GET)
+    provas = provas_filtradas(request.user, materia_id)
+    pagina = paginar_por_chave(provas, 'data_prova', request.GET.get('cursor'), PROVAS_POR_PAGINA)
+    anexar_metadados(links_das_provas(pagina))
 
-    context = {
-        'provas': provas,
-        'all_materias': Materia.objects.filter(usuario=request.user),
-        'current_materia': int(materia_id) if materia_id else None
-    }
+    context = contexto_provas(pagina, materias_do_filtro(request.user), materia_id)
     return render(request, 'agenda/prova_list.html', context)
 
 @login_required
@@ -387,9 +602,10 @@ def prova_delete(request, pk):
 
 
 @login_required
+@resposta_condicional()
 def material_list(request, prova_pk):
     prova = get_object_or_404(Prova, pk=prova_pk, materia__usuario=request.user)
-    materiais = MaterialDeApoio.objects.filter(prova=prova)
+    materiais = anexar_metadados(materiais_da_prova(request.user, prova.pk))
 
     context = {
         'prova': prova,
@@ -433,4 +649,12 @@ def material_delete(request, pk):
         material.delete()
         messages.success(request, 'Material de apoio removido.')
         return redirect('material_list', prova_pk=prova_pk)
-    return render(request, 'agenda/material_confirm_delete.html', {'material': material})
\ No newline at end of file
+    return render(request, 'agenda/material_confirm_delete.html', {'material': material})
+
+# --- Instrumentação (somente equipe) ---
+
+@staff_member_required
+def instrumentacao_resumo(request):
+    if request.method == 'POST':
+        resumo_rotas.limpar()
+    return JsonResponse({'rotas': resumo_rotas.resumo()}, json_dumps_params={'indent': 2})
@@ -0,0 +1,116 @@
+# Em agenda/views_async.py
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import render
+
+from .condicional import resposta_condicional
+from .contadores import amaterias_com_contadores
+from .estatisticas import apainel_em_cache
+from .links import aanexar_metadados
+from .listagens import (
+    anotar_percentual_concluido, contexto_provas, contexto_tarefas, filtros_tarefas, links_das_provas,
+    materia_escolhida, materiais_da_prova, materias_do_filtro, materias_do_usuario, provas_filtradas,
+    tarefas_filtradas,
+)
+from .models import Prova
+from .paginacao import apaginar_por_chave
+from .tempo import anotar_tempo_restante
+from .views import PROVAS_POR_PAGINA, TAREFAS_POR_PAGINA
+
+# Versões assíncronas das páginas de leitura (rotas em async/..., mesmos templates).
+# Sob um servidor ASGI (ex: uvicorn agendaestudos.asgi:application) as consultas independentes
+# de cada página são aguardadas juntas com asyncio.gather, e o worker atende outras requisições
+# enquanto esta espera o banco. Sob WSGI elas continuam funcionando, mas sem esse ganho.
+
+
+async def _usuario(request):
+    # request.user é resolvido de forma síncrona na primeira leitura (context processor auth);
+    # trocando pelo usuário já carregado por auser() o template não repete a consulta
+    request.user = await request.auser()
+    return request.user
+
+
+async def _lista(queryset):
+    return [objeto async for objeto in queryset]
+
+
+async def _renderizar(request, template, context=None):
+    # A renderização roda na thread da requisição: o template ainda pode avaliar querysets
+    # preguiçosos (ex: choices de ModelChoiceField), e o ORM recusa consultas síncronas no loop
+    return await sync_to_async(render)(request, template, context)
+
+
+# --- Dashboard e Agenda ---
+
+@login_required
+async def dashboard(request):
+    context = await apainel_em_cache(await _usuario(request))
+    return await _renderizar(request, 'agenda/dashboard.html', context)
+
+
+@login_required
+@resposta_condicional()
+async def agenda(request):
+    await _usuario(request)
+    return await _renderizar(request, 'agenda/agenda.html')
+
+
+# --- Listagens ---
+
+@login_required
+@resposta_condicional()
+async def materia_list(request):
+    usuario = await _usuario(request)
+    materias = anotar_percentual_concluido(await amaterias_com_contadores(materias_do_usuario(usuario)))
+    await aanexar_metadados(materias)
+    return await _renderizar(request, 'agenda/materia_list.html', {'materias': materias})
+
+
+@login_required
+@resposta_condicional(balde='minuto')
+async def tarefa_list(request):
+    usuario = await _usuario(request)
+    filtros = filtros_tarefas(request.GET)
+    pagina, materias = await asyncio.gather(
+        apaginar_por_chave(tarefas_filtradas(usuario, filtros), 'data_inicio', request.GET.get('cursor'),
+                           TAREFAS_POR_PAGINA),
+        _lista(materias_do_filtro(usuario)),
+    )
+    anotar_tempo_restante(pagina)
+    await aanexar_metadados(pagina)
+    context = contexto_tarefas(usuario, pagina, materias, filtros)
+    return await _renderizar(request, 'agenda/tarefa_list.html', context)
+
+
+@login_required
+@resposta_condicional(balde='dia')
+async def prova_list(request):
+    usuario = await _usuario(request)
+    materia_id = materia_escolhida(request.GET)
+    pagina, materias = await asyncio.gather(
+        apaginar_por_chave(provas_filtradas(usuario, materia_id), 'data_prova', request.GET.get('cursor'),
+                           PROVAS_POR_PAGINA),
+        _lista(materias_do_filtro(usuario)),
+    )
+    await aanexar_metadados(links_das_provas(pagina))
+    context = contexto_provas(pagina, materias, materia_id)
+    return await _renderizar(request, 'agenda/prova_list.html', context)
+
+
+@login_required
+@resposta_condicional()
+async def material_list(request, prova_pk):
+    usuario = await _usuario(request)
+    # A prova e seus materiais não dependem um do outro: os dois já filtram pelo dono
+    prova, materiais = await asyncio.gather(
+        Prova.objects.filter(pk=prova_pk, materia__usuario=usuario).afirst(),
+        _lista(materiais_da_prova(usuario, prova_pk)),
+    )
+    if prova is None:
+        raise Http404('Prova não encontrada.')
+    await aanexar_metadados(materiais)
+    return await _renderizar(request, 'agenda/material_list.html', {'prova': prova, 'materiais': materiais})
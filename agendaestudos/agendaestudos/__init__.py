@@ -0,0 +1,8 @@
+import os
+
+
+def modulo_settings():
+    """Módulo de settings do perfil escolhido em AGENDA_PERFIL ('producao' ou desenvolvimento)."""
+    if os.environ.get('AGENDA_PERFIL') == 'producao':
+        return 'agendaestudos.settings_producao'
+    return 'agendaestudos.settings'
@@ -9,8 +9,9 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from agendaestudos import modulo_settings
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agendaestudos.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', modulo_settings())
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'agenda.middleware.InstrumentacaoMiddleware',
+    'agenda.middleware.AgoraRequisicaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,15 +75,49 @@ WSGI_APPLICATION = 'agendaestudos.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Perfil de produção (conexões persistentes, WAL): AGENDA_PERFIL=producao, ver settings_producao.py
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('AGENDA_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
 
+# Cache
+# LocMem por padrão; AGENDA_CACHE=arquivo usa cache em disco (compartilhado entre processos)
+
+if os.environ.get('AGENDA_CACHE') == 'arquivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('AGENDA_CACHE_DIR', str(BASE_DIR / 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'agenda',
+        }
+    }
+
+# Tempo de vida (segundos) dos dados e fragmentos cacheados do dashboard
+AGENDA_CACHE_TIMEOUT = 600
+
+# Lembretes por e-mail (manage.py enviar_lembretes): em desenvolvimento os e-mails saem no console
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Agenda de Estudos <nao-responda@localhost>'
+
+# O atualizar_links (título/ícone dos links cadastrados) recusa endereços da rede interna;
+# ligue só em desenvolvimento, para testar com um servidor local
+AGENDA_LINKS_PERMITIR_REDE_LOCAL = False
+
+# Instrumentação por requisição (Server-Timing + resumo em /instrumentacao/), desligada por padrão
+AGENDA_INSTRUMENTACAO = os.environ.get('AGENDA_INSTRUMENTACAO') == '1'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,128 @@
+"""
+Perfil de produção da Agenda de Estudos.
+
+Selecionado com AGENDA_PERFIL=producao (manage.py, wsgi.py e asgi.py leem a variável).
+Parte de settings.py e troca só o que muda em produção: DEBUG desligado, conexões
+persistentes, SQLite em modo WAL e loader de templates com cache.
+
+Variáveis de ambiente:
+    DJANGO_SECRET_KEY       obrigatória
+    AGENDA_ALLOWED_HOSTS    hosts separados por vírgula (padrão: localhost,127.0.0.1)
+    AGENDA_CONN_MAX_AGE     segundos de vida das conexões (padrão: 600)
+    AGENDA_HTTPS            1 para cookies seguros e HSTS (atrás de HTTPS)
+    AGENDA_CACHE            'arquivo' (padrão) ou outro valor para o LocMem de settings.py
+    AGENDA_EMAIL_HOST, AGENDA_EMAIL_PORT, AGENDA_EMAIL_USUARIO, AGENDA_EMAIL_SENHA,
+    AGENDA_EMAIL_TLS (1 para STARTTLS), AGENDA_EMAIL_REMETENTE
+                            SMTP dos lembretes (manage.py enviar_lembretes)
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Defina DJANGO_SECRET_KEY para usar o perfil de produção.')
+
+ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get('AGENDA_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',') if host.strip()
+]
+
+
+# Banco de dados
+# Conexões persistentes (reaproveitadas entre requisições, verificadas antes do reuso).
+# Pragmas do SQLite, aplicados uma vez por conexão:
+#   journal_mode=WAL     leitores não bloqueiam o escritor (e vice-versa)
+#   synchronous=NORMAL   seguro com WAL; fsync só nos checkpoints
+#   busy_timeout         espera pelo lock em vez de falhar com "database is locked"
+#   mmap_size            leituras direto do page cache do sistema (128 MB)
+# transaction_mode=IMMEDIATE pega o lock de escrita já no BEGIN dos atomic(): transações que
+# começam lendo e depois escrevem não falham na promoção do lock, esperam o busy_timeout.
+
+DATABASES = {'default': {
+    **DATABASES['default'],
+    'CONN_MAX_AGE': int(os.environ.get('AGENDA_CONN_MAX_AGE', 600)),
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA busy_timeout=5000;'
+            'PRAGMA mmap_size=134217728;'
+            'PRAGMA temp_store=MEMORY'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+    },
+}}
+
+
+# Cache
+# Com vários processos (workers do gunicorn/uvicorn), um LocMem por processo não veria as
+# invalidações feitas pelos outros: em produção o padrão é o cache em disco, compartilhado
+
+if os.environ.get('AGENDA_CACHE', 'arquivo') == 'arquivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('AGENDA_CACHE_DIR', str(BASE_DIR / 'cache')),
+        }
+    }
+
+
+# Templates compilados uma vez por processo
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+
+# Arquivos estáticos servidos pelo servidor web depois do collectstatic
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+
+# Arquivos dos materiais: nunca servidos direto de /media/ (o download confere o dono).
+# Com o nginx na frente, AGENDA_SENDFILE_PREFIXO=/protegido/ faz a view responder só com
+# X-Accel-Redirect, e o nginx envia o arquivo (com Range) de uma location interna:
+#   location /protegido/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_ROOT = os.environ.get('AGENDA_MEDIA_ROOT', str(BASE_DIR / 'media'))
+AGENDA_SENDFILE_PREFIXO = os.environ.get('AGENDA_SENDFILE_PREFIXO') or None
+
+
+# E-mail dos lembretes (enviar_lembretes) por SMTP
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('AGENDA_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('AGENDA_EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('AGENDA_EMAIL_USUARIO', '')
+EMAIL_HOST_PASSWORD = os.environ.get('AGENDA_EMAIL_SENHA', '')
+EMAIL_USE_TLS = os.environ.get('AGENDA_EMAIL_TLS') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('AGENDA_EMAIL_REMETENTE', 'Agenda de Estudos <nao-responda@localhost>')
+
+
+# Segurança
+if os.environ.get('AGENDA_HTTPS') == '1':
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
+    SECURE_HSTS_SECONDS = 60 * 60 * 24 * 30
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+}
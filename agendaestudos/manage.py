@@ -3,10 +3,12 @@
 import os
 import sys
 
+from agendaestudos import modulo_settings
+
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agendaestudos.settings')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', modulo_settings())
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: